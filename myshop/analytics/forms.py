@@ -0,0 +1,15 @@
+from django import forms
+
+
+class SalesPeriodForm(forms.Form):
+    start = forms.DateField(label='З', required=False,
+                            widget=forms.DateInput(attrs={'type': 'date'}))
+    end = forms.DateField(label='По', required=False,
+                          widget=forms.DateInput(attrs={'type': 'date'}))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get('start'), cleaned_data.get('end')
+        if start and end and start > end:
+            raise forms.ValidationError('Початок періоду має бути не пізніше за його кінець.')
+        return cleaned_data
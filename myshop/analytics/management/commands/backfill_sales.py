@@ -0,0 +1,41 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from analytics.sales import backfill_day
+from orders.models import Order
+
+
+class Command(BaseCommand):
+    help = ('Recompute the daily sales tables from paid orders, one day per transaction. Orders '
+            'are counted on the day they were placed.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=date.fromisoformat,
+                            help='First day (YYYY-MM-DD); the day of the first order by default.')
+        parser.add_argument('--until', type=date.fromisoformat,
+                            help='Last day (YYYY-MM-DD); today by default.')
+
+    def handle(self, *args, **options):
+        until = options['until'] or timezone.localdate()
+        since = options['since']
+        if since is None:
+            first = Order.objects.order_by('created').values_list('created', flat=True).first()
+            if first is None:
+                self.stdout.write('There are no orders.')
+                return
+            since = timezone.localdate(first)
+        if since > until:
+            raise CommandError('--since must not be after --until.')
+
+        day = since
+        orders = 0
+        while day <= until:
+            count = backfill_day(day)
+            orders += count
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{day}: {count} paid orders')
+            day += timedelta(days=1)
+        self.stdout.write(self.style.SUCCESS(
+            f'Recomputed {(until - since).days + 1} days with {orders} paid orders.'))
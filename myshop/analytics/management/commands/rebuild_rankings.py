@@ -0,0 +1,26 @@
+from typing import Dict, Optional
+
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+
+from analytics.models import DailyProductSales
+from myshop.routers import get_replica_alias
+from shop import rankings
+
+
+class Command(BaseCommand):
+    help = ('Recount the best-seller rankings from the daily sales tables and refresh the '
+            'trending ones. Run backfill_sales first on a new installation.')
+
+    def handle(self, *args, **options):
+        units: Dict[Optional[int], Dict[int, int]] = {None: {}}
+        rows = (DailyProductSales.objects.using(get_replica_alias())
+                .values_list('product_id', 'category_id').annotate(Sum('quantity')).order_by())
+        for product_id, category_id, quantity in rows.iterator():
+            units[None][product_id] = units[None].get(product_id, 0) + quantity
+            category = units.setdefault(category_id, {})
+            category[product_id] = category.get(product_id, 0) + quantity
+        rankings.replace_bestsellers(units)
+        rankings.refresh_trending()
+        self.stdout.write(self.style.SUCCESS(
+            f'Ranked {len(units[None])} products in {len(units) - 1} categories.'))
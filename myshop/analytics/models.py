@@ -0,0 +1,75 @@
+from django.db import models
+
+from orders.models import Order
+from shop.models import Category, Product
+
+
+class DailySales(models.Model):
+    """Stores the paid orders, units and revenue of one day."""
+    date = models.DateField(unique=True)
+    orders = models.PositiveIntegerField(default=0)
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name = 'Продажі за день'
+        verbose_name_plural = 'Продажі за днями'
+
+    def __str__(self) -> str:
+        return str(self.date)
+
+
+class DailyProductSales(models.Model):
+    """Stores the paid orders, units and revenue of one product on one day."""
+    date = models.DateField()
+    product = models.ForeignKey(Product, related_name='daily_sales', on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, related_name='daily_product_sales',
+                                 on_delete=models.CASCADE)
+    orders = models.PositiveIntegerField(default=0)
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'product'], name='unique_daily_product_sales'),
+        ]
+        indexes = [models.Index(fields=['date'])]
+        verbose_name = 'Продажі товару за день'
+        verbose_name_plural = 'Продажі товарів за днями'
+
+    def __str__(self) -> str:
+        return f'{self.product_id} {self.date}'
+
+
+class DailyCategorySales(models.Model):
+    """Stores the paid orders, units and revenue of one category on one day."""
+    date = models.DateField()
+    category = models.ForeignKey(Category, related_name='daily_sales', on_delete=models.CASCADE)
+    orders = models.PositiveIntegerField(default=0)
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'category'],
+                                    name='unique_daily_category_sales'),
+        ]
+        indexes = [models.Index(fields=['date'])]
+        verbose_name = 'Продажі категорії за день'
+        verbose_name_plural = 'Продажі категорій за днями'
+
+    def __str__(self) -> str:
+        return f'{self.category_id} {self.date}'
+
+
+class RecordedOrder(models.Model):
+    """Marks a paid order as counted in the daily sales, so it is never counted twice."""
+    order = models.OneToOneField(Order, primary_key=True, related_name='sales_record',
+                                 on_delete=models.CASCADE)
+    recorded = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f'Order {self.order_id}'
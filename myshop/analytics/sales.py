@@ -0,0 +1,173 @@
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Type
+
+from django.db import connection, models, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Round
+from django.utils import timezone
+
+from orders.models import Order, OrderItem
+from shop import rankings
+
+from .models import DailyCategorySales, DailyProductSales, DailySales, RecordedOrder
+
+# Key of the advisory lock that keeps a backfill from interleaving with orders being recorded.
+SALES_LOCK_ID = 480048
+COUNTERS = ['orders', 'quantity', 'revenue']
+
+# Revenue of an order line after the coupon discount of its order. Aggregate it before annotating
+# a `quantity` sum, which would shadow the field.
+LINE_REVENUE = Round(F('price') * F('quantity') * (100 - F('order__discount')) / 100, 2,
+                     output_field=models.DecimalField(max_digits=14, decimal_places=2))
+
+
+def lock_sales(exclusive: bool) -> None:
+    """
+    Take the sales advisory lock until the end of the current transaction.
+
+    Recording orders takes it shared, so they run concurrently; a backfill takes it exclusively.
+
+    Args:
+        exclusive (bool): Whether to wait for and block every other holder.
+
+    """
+    function = 'pg_advisory_xact_lock' if exclusive else 'pg_advisory_xact_lock_shared'
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT {function}(%s)', [SALES_LOCK_ID])
+
+
+def add_sales(model: Type[models.Model], unique: List[str], rows: List[Dict[str, Any]]) -> None:
+    """
+    Add to the counters of summary rows in one ``INSERT ... ON CONFLICT DO UPDATE`` statement.
+
+    Args:
+        model (Type[models.Model]): The summary table.
+        unique (List[str]): The columns identifying a row, e.g. date and product_id.
+        rows (List[Dict[str, Any]]): The values by column; rows that are missing are created.
+
+    """
+    if not rows:
+        return
+    quote = connection.ops.quote_name
+    columns = list(rows[0])
+    placeholders = ', '.join(['(' + ', '.join(['%s'] * len(columns)) + ')'] * len(rows))
+    updates = ', '.join(f'{quote(c)} = s.{quote(c)} + EXCLUDED.{quote(c)}' for c in COUNTERS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(model._meta.db_table)} AS s '
+            f'({", ".join(quote(c) for c in columns)}) VALUES {placeholders} '
+            f'ON CONFLICT ({", ".join(quote(c) for c in unique)}) DO UPDATE SET {updates}',
+            [row[column] for row in rows for column in columns])
+
+
+def record_order(order_id: int) -> bool:
+    """
+    Add a paid order to the daily sales of the day it was placed and to the product rankings.
+
+    The order is marked as recorded in the same transaction, so repeated payment notifications
+    count it once. Rows are updated in key order to keep concurrent orders from deadlocking.
+
+    Args:
+        order_id (int): The ID of the order.
+
+    Returns:
+        bool: True if the order was recorded, False if it is unpaid or was recorded before.
+
+    """
+    with transaction.atomic():
+        lock_sales(exclusive=False)
+        order = Order.objects.filter(id=order_id, paid=True).first()
+        if order is None:
+            return False
+        _, created = RecordedOrder.objects.get_or_create(order=order)
+        if not created:
+            return False
+
+        day = timezone.localdate(order.created)
+        items = (OrderItem.objects.filter(order=order)
+                 .values('product_id', category_id=F('product__category_id'))
+                 .annotate(revenue=Sum(LINE_REVENUE), quantity=Sum('quantity'))
+                 .order_by('product_id'))
+        products = [{'date': day, 'orders': 1, **item} for item in items]
+        categories: Dict[int, Dict[str, Any]] = {}
+        for item in products:
+            row = categories.setdefault(item['category_id'], {
+                'date': day, 'category_id': item['category_id'],
+                'orders': 1, 'quantity': 0, 'revenue': Decimal(0),
+            })
+            row['quantity'] += item['quantity']
+            row['revenue'] += item['revenue']
+
+        add_sales(DailyProductSales, ['date', 'product_id'], products)
+        add_sales(DailyCategorySales, ['date', 'category_id'],
+                  [categories[id] for id in sorted(categories)])
+        add_sales(DailySales, ['date'], [{
+            'date': day, 'orders': 1,
+            'quantity': sum(item['quantity'] for item in products),
+            'revenue': sum((item['revenue'] for item in products), Decimal(0)),
+        }])
+    rankings.record_sales({item['product_id']: (item['category_id'], item['quantity'])
+                           for item in products})
+    return True
+
+
+def record_missed_orders(days: int = 2) -> int:
+    """
+    Record the recently paid orders whose recording task was lost.
+
+    Args:
+        days (int, optional): How far back to look for orders.
+
+    Returns:
+        int: The number of recorded orders.
+
+    """
+    order_ids = Order.objects.filter(paid=True, sales_record__isnull=True,
+                                     created__gte=timezone.now() - timedelta(days=days))
+    return sum(record_order(order_id) for order_id in order_ids.values_list('id', flat=True))
+
+
+def backfill_day(day: date) -> int:
+    """
+    Recompute the daily sales of one day from its paid orders.
+
+    The summary rows of the day are replaced in one transaction that holds the sales lock
+    exclusively, so orders recorded meanwhile wait for it and are then skipped as recorded.
+
+    Args:
+        day (date): The day, in the current time zone.
+
+    Returns:
+        int: The number of paid orders placed that day.
+
+    """
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+    with transaction.atomic():
+        lock_sales(exclusive=True)
+        orders = Order.objects.filter(created__gte=start, created__lt=end)
+        for model in (DailySales, DailyProductSales, DailyCategorySales):
+            model.objects.filter(date=day).delete()
+        RecordedOrder.objects.filter(order__in=orders).delete()
+        paid = orders.filter(paid=True)
+        RecordedOrder.objects.bulk_create(
+            [RecordedOrder(order_id=id) for id in paid.values_list('id', flat=True)],
+            batch_size=1000)
+
+        items = OrderItem.objects.filter(order__in=paid)
+        counters = {'revenue': Sum(LINE_REVENUE), 'orders': Count('order_id', distinct=True),
+                    'quantity': Sum('quantity')}
+        DailyProductSales.objects.bulk_create(
+            [DailyProductSales(date=day, **row) for row in
+             items.values('product_id', category_id=F('product__category_id'))
+             .annotate(**counters).order_by()],
+            batch_size=1000)
+        DailyCategorySales.objects.bulk_create(
+            [DailyCategorySales(date=day, **row) for row in
+             items.values(category_id=F('product__category_id')).annotate(**counters).order_by()],
+            batch_size=1000)
+        totals = items.aggregate(**counters)
+        if totals['orders']:
+            DailySales.objects.create(date=day, **totals)
+    return totals['orders']
@@ -0,0 +1,30 @@
+from celery import shared_task
+
+from . import sales
+
+
+@shared_task
+def record_order_sales(order_id: int) -> bool:
+    """
+    Add a paid order to the daily sales tables.
+
+    Args:
+        order_id (int): The ID of the order.
+
+    Returns:
+        bool: True if the order was recorded, False if it was recorded before.
+
+    """
+    return sales.record_order(order_id)
+
+
+@shared_task
+def record_missed_orders() -> int:
+    """
+    Record the recently paid orders whose recording task was lost.
+
+    Returns:
+        int: The number of recorded orders.
+
+    """
+    return sales.record_missed_orders()
@@ -0,0 +1,62 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+
+from benchmarks.stubs import StandInTestCase
+from orders.models import Order, OrderItem
+from shop import rankings
+from shop.models import Category, Product
+
+from .models import DailyCategorySales, DailyProductSales, DailySales
+from .sales import record_missed_orders, record_order
+
+
+class RecordOrderTests(StandInTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        category = Category.objects.create(name='Акумулятори', slug='batteries')
+        self.agm = Product.objects.create(category=category, name='AGM 12V', slug='agm-12v',
+                                          price=Decimal('50'))
+        self.gel = Product.objects.create(category=category, name='GEL 12V', slug='gel-12v',
+                                          price=Decimal('70'))
+        self.profile = User.objects.create_user('customer').profile
+
+    def create_order(self, paid: bool = True) -> Order:
+        order = Order.objects.create(profile=self.profile, first_name='Іван',
+                                     last_name='Петренко', email='ivan@example.com',
+                                     address='вул. Хрещатик, 1', postal_code='01001',
+                                     city='Київ', discount=10, paid=paid)
+        OrderItem.objects.create(order=order, product=self.agm, price=self.agm.price,
+                                 quantity=2)
+        OrderItem.objects.create(order=order, product=self.gel, price=self.gel.price,
+                                 quantity=1)
+        return order
+
+    def test_paid_order_is_recorded_once(self) -> None:
+        order = self.create_order()
+        self.assertTrue(record_order(order.id))
+        self.assertFalse(record_order(order.id))
+        day = DailySales.objects.get()
+        self.assertEqual((day.orders, day.quantity, day.revenue), (1, 3, Decimal('153.00')))
+        self.assertEqual(DailyProductSales.objects.get(product=self.agm).quantity, 2)
+        self.assertEqual(DailyCategorySales.objects.get().revenue, Decimal('153.00'))
+        self.assertEqual(self.redis.zscore(rankings.get_ranking_key(rankings.BESTSELLERS),
+                                           self.agm.id), 2)
+
+    def test_orders_of_the_same_day_add_up(self) -> None:
+        record_order(self.create_order().id)
+        record_order(self.create_order().id)
+        day = DailySales.objects.get()
+        self.assertEqual((day.orders, day.quantity), (2, 6))
+
+    def test_unpaid_order_is_not_recorded(self) -> None:
+        self.assertFalse(record_order(self.create_order(paid=False).id))
+        self.assertFalse(DailySales.objects.exists())
+
+    def test_missed_orders_are_recorded(self) -> None:
+        recorded = self.create_order()
+        record_order(recorded.id)
+        self.create_order()
+        self.create_order(paid=False)
+        self.assertEqual(record_missed_orders(), 1)
+        self.assertEqual(DailySales.objects.get().orders, 2)
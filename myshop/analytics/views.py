@@ -0,0 +1,63 @@
+from datetime import timedelta
+
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db.models import F, Sum
+from django.http import HttpRequest, HttpResponse
+from django.shortcuts import render
+from django.utils import timezone
+
+from myshop.routers import get_replica_alias
+
+from .forms import SalesPeriodForm
+from .models import DailyCategorySales, DailyProductSales, DailySales
+
+# Days shown when no period is chosen.
+DEFAULT_PERIOD_DAYS = 30
+TOP_PRODUCTS = 20
+
+
+@staff_member_required
+def dashboard(request: HttpRequest) -> HttpResponse:
+    """
+    Display the revenue of a period by day, category and best-selling product.
+
+    Only the daily summary tables are read, on a replica, so the cost depends on the number of
+    days and never on the number of orders.
+
+    Args:
+        request (HttpRequest): The HTTP request object, optionally with start and end dates.
+
+    Returns:
+        HttpResponse: The HTTP response object containing the rendered dashboard.
+
+    """
+    form = SalesPeriodForm(request.GET or None)
+    start, end = None, timezone.localdate()
+    if form.is_valid():
+        start, end = form.cleaned_data['start'], form.cleaned_data['end'] or end
+    start = start or end - timedelta(days=DEFAULT_PERIOD_DAYS - 1)
+
+    using = get_replica_alias()
+    counters = {'orders': Sum('orders'), 'quantity': Sum('quantity'), 'revenue': Sum('revenue')}
+    days = list(DailySales.objects.using(using).filter(date__range=(start, end)).order_by('date'))
+    totals = {
+        'orders': sum(day.orders for day in days),
+        'quantity': sum(day.quantity for day in days),
+        'revenue': sum(day.revenue for day in days),
+    }
+    totals['average'] = totals['revenue'] / totals['orders'] if totals['orders'] else 0
+    categories = (DailyCategorySales.objects.using(using).filter(date__range=(start, end))
+                  .values('category_id', name=F('category__name')).annotate(**counters)
+                  .order_by('-revenue'))
+    products = (DailyProductSales.objects.using(using).filter(date__range=(start, end))
+                .values('product_id', name=F('product__name')).annotate(**counters)
+                .order_by('-revenue')[:TOP_PRODUCTS])
+    return render(request, 'admin/analytics/dashboard.html', {
+        'form': form,
+        'start': start,
+        'end': end,
+        'days': days,
+        'totals': totals,
+        'categories': categories,
+        'products': products,
+    })
@@ -0,0 +1,52 @@
+from decimal import Decimal
+from typing import Any, Dict
+
+from django.urls import reverse
+
+from benchmarks.stubs import StandInTestCase
+from shop.models import Category, Product
+
+from .views import ApiError, decode_cursor, encode_cursor
+
+
+class ProductListTests(StandInTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        category = Category.objects.create(name='Акумулятори', slug='batteries')
+        self.ids = [Product.objects.create(category=category, name=f'Battery {i}',
+                                           slug=f'battery-{i}', price=Decimal(10 + i),
+                                           available=i != 2).id
+                    for i in range(7)]
+
+    def get(self, **params: Any) -> Dict[str, Any]:
+        response = self.client.get(reverse('api:product_list'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_cursor_round_trip(self) -> None:
+        for last_id in (1, 42, 10 ** 12):
+            self.assertEqual(decode_cursor(encode_cursor(last_id)), last_id)
+
+    def test_malformed_cursors_are_rejected(self) -> None:
+        for cursor in ('', '!!!', encode_cursor(1) + '*', 'YWJj'):
+            with self.subTest(cursor=cursor), self.assertRaises(ApiError):
+                decode_cursor(cursor)
+
+    def test_pages_follow_the_cursor_without_gaps_or_repeats(self) -> None:
+        seen = []
+        page = self.get(limit=2, fields='id')
+        while True:
+            seen += [product['id'] for product in page['results']]
+            if page['next_cursor'] is None:
+                break
+            page = self.get(limit=2, fields='id', cursor=page['next_cursor'])
+        self.assertEqual(seen, [id for i, id in enumerate(self.ids) if i != 2])
+
+    def test_invalid_cursor_is_a_bad_request(self) -> None:
+        response = self.client.get(reverse('api:product_list'), {'cursor': '!!!'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Invalid cursor.'})
+
+    def test_sparse_fieldset(self) -> None:
+        page = self.get(limit=1, fields='id,price')
+        self.assertEqual(page['results'], [{'id': self.ids[0], 'price': '10.00'}])
@@ -0,0 +1,252 @@
+import base64
+import binascii
+import hashlib
+from datetime import datetime
+from functools import wraps
+from typing import Any, Dict, List, Optional
+
+import orjson
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET
+
+from shop.catalog import get_catalog_last_modified, get_catalog_version, get_category_nav
+from shop.forms import AVAILABILITY_IN_STOCK
+from shop.models import Product
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Public field name -> column selected with values_list().
+PRODUCT_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'slug': 'slug',
+    'category': 'category_id',
+    'description': 'description',
+    'price': 'price',
+    'available': 'available',
+    'image': 'image',
+    'attributes': 'attributes',
+    'created': 'created',
+    'updated': 'updated',
+}
+DEFAULT_PRODUCT_FIELDS = ['id', 'name', 'slug', 'category', 'price', 'image']
+
+
+class OrjsonResponse(HttpResponse):
+    """An HTTP response that serializes its data with orjson."""
+    def __init__(self, data: Any, **kwargs: Any) -> None:
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=orjson.dumps(data, default=str), **kwargs)
+
+
+class ApiError(Exception):
+    """Raised for invalid query parameters; rendered as a 400 JSON response."""
+
+
+def api_etag(request: HttpRequest, *args: Any, **kwargs: Any) -> str:
+    """
+    Compute the ETag of an API response from the cached catalog version and the full request
+    path, so unchanged pages are revalidated without querying the database.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        str: The ETag for the requested resource.
+
+    """
+    variance = f'{get_catalog_version()}:{request.get_full_path()}'
+    return hashlib.md5(variance.encode('utf-8')).hexdigest()
+
+
+def api_last_modified(request: HttpRequest, *args: Any, **kwargs: Any) -> datetime:
+    """Return the Last-Modified time of an API response from the cached catalog version."""
+    return get_catalog_last_modified()
+
+
+def encode_cursor(last_id: int) -> str:
+    """Encode the ID of the last returned product as an opaque cursor."""
+    return base64.urlsafe_b64encode(str(last_id).encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Decode a cursor produced by `encode_cursor`.
+
+    Args:
+        cursor (str): The opaque cursor from the ``cursor`` query parameter.
+
+    Returns:
+        int: The ID of the last product of the previous page.
+
+    Raises:
+        ApiError: If the cursor is malformed.
+
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ApiError('Invalid cursor.')
+
+
+def parse_fields(request: HttpRequest) -> List[str]:
+    """
+    Parse the sparse fieldset requested with ``?fields=id,name,price``.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        List[str]: The requested public field names.
+
+    Raises:
+        ApiError: If an unknown field is requested.
+
+    """
+    fields = request.GET.get('fields')
+    if not fields:
+        return DEFAULT_PRODUCT_FIELDS
+    fields = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in PRODUCT_FIELDS]
+    if unknown or not fields:
+        raise ApiError(f'Unknown fields: {", ".join(unknown)}.')
+    return fields
+
+
+def parse_limit(request: HttpRequest) -> int:
+    """Parse the ``limit`` query parameter, clamped to `MAX_PAGE_SIZE`."""
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ApiError('Invalid limit.')
+    if limit < 1:
+        raise ApiError('Invalid limit.')
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def serialize_products(rows: List[tuple], fields: List[str]) -> List[Dict[str, Any]]:
+    """
+    Turn rows fetched with values_list() into dictionaries with public field names.
+
+    Args:
+        rows (List[tuple]): Rows whose columns follow the order of `fields`.
+        fields (List[str]): The public field names.
+
+    Returns:
+        List[Dict[str, Any]]: The serialized products.
+
+    """
+    products = [dict(zip(fields, row)) for row in rows]
+    if 'image' in fields:
+        for product in products:
+            product['image'] = f"{settings.MEDIA_URL}{product['image']}" \
+                if product['image'] else None
+    return products
+
+
+def api_view(view):
+    """Decorate a catalog API view with GET-only access, validators and error handling."""
+    @wraps(view)
+    @require_GET
+    @cache_control(public=True, max_age=60)
+    @condition(etag_func=api_etag, last_modified_func=api_last_modified)
+    def wrapper(request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as e:
+            return OrjsonResponse({'error': str(e)}, status=400)
+    return wrapper
+
+
+@api_view
+def category_list(request: HttpRequest) -> HttpResponse:
+    """
+    Return all categories with their available product counts.
+
+    The data comes from the cached category navigation, so the response needs no database query.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        HttpResponse: A JSON response with the list of categories.
+
+    """
+    nav = get_category_nav()
+    results = [{'id': c.id,
+                'name': c.name,
+                'slug': c.slug,
+                'product_count': nav['facets'].get(c.id, {}).get(AVAILABILITY_IN_STOCK, 0)}
+               for c in nav['categories']]
+    return OrjsonResponse({'results': results})
+
+
+@api_view
+def product_list(request: HttpRequest) -> HttpResponse:
+    """
+    Return a page of available products ordered by ID.
+
+    Query parameters:
+        cursor: The ``next_cursor`` of the previous page.
+        limit: The page size, up to `MAX_PAGE_SIZE`.
+        fields: A comma-separated sparse fieldset, e.g. ``id,name,price``.
+        category: The slug of a category to filter by.
+
+    The page is fetched with a keyset query on the primary key and values_list(), so no model
+    instances are created and deep pages cost the same as the first one.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        HttpResponse: A JSON response with the products and the cursor of the next page.
+
+    """
+    fields = parse_fields(request)
+    limit = parse_limit(request)
+    products = Product.objects.filter(available=True)
+
+    category_slug = request.GET.get('category')
+    if category_slug:
+        category = get_category_nav()['by_slug'].get(category_slug)
+        if category is None:
+            raise ApiError('Unknown category.')
+        products = products.filter(category_id=category.id)
+
+    cursor = request.GET.get('cursor')
+    if cursor:
+        products = products.filter(id__gt=decode_cursor(cursor))
+
+    columns = [PRODUCT_FIELDS[field] for field in fields]
+    rows = list(products.order_by('id').values_list('id', *columns)[:limit + 1])
+    next_cursor: Optional[str] = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][0])
+    results = serialize_products([row[1:] for row in rows], fields)
+    return OrjsonResponse({'results': results, 'next_cursor': next_cursor})
+
+
+@api_view
+def product_detail(request: HttpRequest, id: int) -> HttpResponse:
+    """
+    Return a single available product.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        id (int): The ID of the product.
+
+    Returns:
+        HttpResponse: A JSON response with the product, or 404 if it is not available.
+
+    """
+    fields = parse_fields(request)
+    columns = [PRODUCT_FIELDS[field] for field in fields]
+    row = Product.objects.filter(id=id, available=True).values_list(*columns).first()
+    if row is None:
+        return OrjsonResponse({'error': 'Not found.'}, status=404)
+    return OrjsonResponse(serialize_products([row], fields)[0])
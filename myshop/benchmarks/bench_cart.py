@@ -0,0 +1,10 @@
+from cart.cart import Cart
+
+
+def bench_cart_iter(benchmark, cart: Cart):
+    items = benchmark(lambda: list(cart))
+    assert len(items) == len(cart.cart)
+
+
+def bench_cart_get_total_price(benchmark, cart: Cart):
+    assert benchmark(cart.get_total_price) > 0
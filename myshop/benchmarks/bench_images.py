@@ -0,0 +1,26 @@
+from io import BytesIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+
+from shop.models import Product
+
+
+@pytest.fixture
+def upload() -> bytes:
+    """Return a JPEG the size of a typical supplier photo."""
+    output = BytesIO()
+    Image.new('RGB', (1600, 1200), (40, 120, 200)).save(output, format='JPEG')
+    return output.getvalue()
+
+
+def bench_product_save_with_image(benchmark, settings, tmp_path, products, upload: bytes):
+    settings.MEDIA_ROOT = tmp_path
+    product = products[0]
+
+    def save():
+        product.image = SimpleUploadedFile('photo.jpg', upload, 'image/jpeg')
+        product.save()
+
+    benchmark(save)
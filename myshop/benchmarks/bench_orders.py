@@ -0,0 +1,27 @@
+from typing import List
+
+import pytest
+
+from orders.models import Order, OrderItem
+from shop.models import Product
+
+from .fixtures import create_shoppers
+
+ORDER_SIZE = 20
+
+
+@pytest.fixture
+def order(products: List[Product]) -> Order:
+    """Return an order with `ORDER_SIZE` items and a coupon discount."""
+    profile = create_shoppers(1)[0].profile
+    order = Order.objects.create(profile=profile, first_name='Тест', last_name='Покупець',
+                                 email=profile.user.email, address='вул. Тестова, 1',
+                                 postal_code='01001', city='Київ', discount=10)
+    OrderItem.objects.bulk_create(
+        OrderItem(order=order, product=product, price=product.price, quantity=quantity)
+        for quantity, product in enumerate(products[:ORDER_SIZE], start=1))
+    return order
+
+
+def bench_order_get_total_cost(benchmark, order: Order):
+    assert benchmark(order.get_total_cost) > 0
@@ -0,0 +1,19 @@
+from payment.wayforpay import WayForPay
+
+INVOICE = ('merchant;shop.example.com;DH1234567890;1720000000;12345.67;UAH;'
+           + ';'.join(f'Акумулятор {i}' for i in range(20)) + ';'
+           + ';'.join(str(i) for i in range(1, 21)) + ';'
+           + ';'.join(f'{i * 100}.00' for i in range(1, 21)))
+
+WEBHOOK = ['merchant', 'DH1234567890', '12345.67', 'UAH', '123456', '41****1111', 'Approved',
+           '1100']
+
+
+def bench_hash_md5(benchmark):
+    wayforpay = WayForPay(key='benchmark', domain_name='shop.example.com')
+    assert len(benchmark(wayforpay.hash_md5, INVOICE)) == 32
+
+
+def bench_generate_signature(benchmark):
+    wayforpay = WayForPay(key='benchmark', domain_name='shop.example.com')
+    assert len(benchmark(wayforpay.generate_signature, WEBHOOK)) == 32
@@ -0,0 +1,31 @@
+import random
+from typing import List
+
+import pytest
+
+from shop.models import Product
+from shop.recommender import Recommender
+
+
+@pytest.fixture
+def recommender(redis_server, products: List[Product]) -> Recommender:
+    """Return a recommender whose sorted sets hold a few hundred recorded baskets."""
+    recommender = Recommender()
+    rng = random.Random(42)
+    for _ in range(500):
+        recommender.products_bought(rng.sample(products, rng.randint(2, 4)))
+    return recommender
+
+
+def bench_products_bought(benchmark, recommender: Recommender, products: List[Product]):
+    benchmark(recommender.products_bought, products[:4])
+
+
+def bench_suggest_products_for_one(benchmark, recommender: Recommender,
+                                   products: List[Product]):
+    benchmark(recommender.suggest_products_for, products[:1], 4)
+
+
+def bench_suggest_products_for_cart(benchmark, recommender: Recommender,
+                                    products: List[Product]):
+    benchmark(recommender.suggest_products_for, products[:5], 4)
@@ -0,0 +1,53 @@
+"""
+Micro-benchmarks for the hot paths of the shop.
+
+Run them from the repository root with::
+
+    pytest --benchmark-compare --benchmark-compare-fail=median:20%
+
+Every run is saved under ``myshop/benchmarks/.results`` (see ``[tool.pytest.ini_options]`` in
+pyproject.toml). ``--benchmark-compare`` compares a run with the latest saved run, and
+``--benchmark-compare-fail`` makes the session fail when a benchmark is slower than the given
+threshold. Benchmarks that touch the database use the PostgreSQL test database created by
+pytest-django; Redis is replaced with fakeredis, so the recommender benchmarks measure the client
+side of each call rather than network round trips.
+"""
+import random
+from typing import Iterator, List
+
+import fakeredis
+import pytest
+from django.contrib.sessions.backends.db import SessionStore
+from django.test import RequestFactory
+
+from cart.cart import Cart
+from shop.models import Product
+
+from .fixtures import seed_catalog
+from .stubs import StubWayForPay, use_stand_ins
+
+CART_SIZE = 20
+
+
+@pytest.fixture
+def redis_server() -> Iterator[fakeredis.FakeServer]:
+    """Replace Redis and WayForPay with the in-process stand-ins used by the load test."""
+    with use_stand_ins(StubWayForPay()) as server:
+        yield server
+
+
+@pytest.fixture
+def products(db) -> List[Product]:
+    """Return the available products of a small seeded catalog."""
+    return seed_catalog(categories=5, products=200, rng=random.Random(42))
+
+
+@pytest.fixture
+def cart(products: List[Product]) -> Cart:
+    """Return a cart holding `CART_SIZE` different products."""
+    request = RequestFactory().get('/')
+    request.session = SessionStore()
+    cart = Cart(request)
+    for quantity, product in enumerate(products[:CART_SIZE], start=1):
+        cart.add(product, quantity=quantity)
+    return cart
@@ -0,0 +1,90 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+from typing import List
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from coupons.models import Coupon
+from shop.models import CHEMISTRY_CHOICES, Category, Product
+from shop.recommender import Recommender
+
+LOADTEST_COUPON_CODE = 'LOADTEST10'
+SHOPPER_PASSWORD = 'loadtest'
+
+
+def seed_catalog(categories: int, products: int, rng: random.Random) -> List[Product]:
+    """
+    Fill the database with a synthetic catalog.
+
+    Products are inserted with bulk_create and carry no images, so seeding does not go through
+    the image processing in `Product.save`. About one product in ten is out of stock.
+
+    Args:
+        categories (int): The number of categories to create.
+        products (int): The number of products to create.
+        rng (random.Random): The random generator, seeded for reproducible runs.
+
+    Returns:
+        List[Product]: The products that are available for sale.
+
+    """
+    category_objs = Category.objects.bulk_create(
+        Category(name=f'Категорія {i}', slug=f'category-{i}') for i in range(categories))
+    chemistries = [value for value, _ in CHEMISTRY_CHOICES]
+    Product.objects.bulk_create(
+        Product(category=category_objs[i % categories],
+                name=f'Акумулятор {i}',
+                slug=f'battery-{i}',
+                description='Акумулятор для навантажувального тестування.',
+                price=Decimal(rng.randint(500, 50000)) / 100,
+                available=rng.random() > 0.1,
+                stock=rng.randint(100, 1000),
+                attributes={'capacity': rng.choice([50, 100, 150, 200, 280]),
+                            'voltage': rng.choice([12.8, 25.6, 51.2]),
+                            'chemistry': rng.choice(chemistries)})
+        for i in range(products))
+    return list(Product.objects.filter(available=True))
+
+
+def seed_purchases(products: List[Product], orders: int, rng: random.Random) -> None:
+    """
+    Record co-purchases with the recommender, so product and cart pages have suggestions.
+
+    Args:
+        products (List[Product]): The products to draw baskets from.
+        orders (int): The number of baskets to record.
+        rng (random.Random): The random generator, seeded for reproducible runs.
+
+    """
+    recommender = Recommender()
+    for _ in range(orders):
+        recommender.products_bought(rng.sample(products, min(len(products), rng.randint(2, 4))))
+
+
+def create_coupon() -> Coupon:
+    """Create an active coupon accepted by `coupon_apply` for the whole run."""
+    now = timezone.now()
+    return Coupon.objects.create(code=LOADTEST_COUPON_CODE,
+                                 valid_from=now - timedelta(days=1),
+                                 valid_to=now + timedelta(days=1),
+                                 discount=10,
+                                 active=True)
+
+
+def create_shoppers(count: int) -> List[User]:
+    """
+    Create customer accounts; the profile of each one is created by the users app signal.
+
+    Args:
+        count (int): The number of customers to create.
+
+    Returns:
+        List[User]: The created users.
+
+    """
+    return [User.objects.create_user(username=f'shopper{i}',
+                                     email=f'shopper{i}@example.com',
+                                     password=SHOPPER_PASSWORD)
+            for i in range(count)]
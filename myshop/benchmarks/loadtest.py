@@ -0,0 +1,205 @@
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from orders.models import Order
+from shop.models import Product
+
+from .fixtures import LOADTEST_COUPON_CODE
+from .stubs import STUB_MERCHANT_ACCOUNT, StubWayForPay
+
+logger = logging.getLogger(__name__)
+
+JOURNEY_STEPS = ['product_list', 'product_detail', 'cart_add', 'cart_detail', 'coupon_apply',
+                 'order_create', 'payment_process', 'payment_completed']
+
+
+class Sample(NamedTuple):
+    step: str
+    seconds: float
+    queries: int
+    ok: bool
+
+
+class QueryCounter:
+    """Database execute wrapper that counts the queries run on one connection."""
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, execute: Callable, sql: str, params: Any, many: bool,
+                 context: Dict[str, Any]) -> Any:
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """
+    Return the nearest-rank percentile of the values.
+
+    Args:
+        values (Sequence[float]): The measured values.
+        pct (float): The percentile, from 0 to 100.
+
+    Returns:
+        float: The smallest value that at least `pct` percent of the values do not exceed.
+
+    """
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class Journey:
+    """
+    One customer going from the catalog to a paid order, timed request by request.
+
+    Every request is sent through the Django test client, so it passes the full middleware stack
+    and the URL resolver. The queries of each request are counted with an execute wrapper on the
+    connection of the worker thread.
+
+    """
+    def __init__(self, shopper: User, product: Product, gateway: StubWayForPay) -> None:
+        self.client = Client()
+        self.client.force_login(shopper)
+        self.shopper = shopper
+        self.product = product
+        self.gateway = gateway
+        self.samples: List[Sample] = []
+
+    def request(self, step: str, method: str, path: str,
+                data: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Send one request and record its latency and query count.
+
+        Args:
+            step (str): The name of the step in `JOURNEY_STEPS`.
+            method (str): ``get`` or ``post``.
+            path (str): The URL path.
+            data (Optional[Dict[str, Any]]): The query or form data.
+
+        Returns:
+            bool: True if the view answered with a success or redirect status.
+
+        """
+        counter = QueryCounter()
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(counter):
+                response = getattr(self.client, method)(path, data or {})
+            ok = response.status_code < 400
+        except Exception:
+            logger.exception('Load test step %s failed', step)
+            ok = False
+        self.samples.append(Sample(step, time.perf_counter() - start, counter.count, ok))
+        return ok
+
+    def webhook_data(self) -> Dict[str, str]:
+        """Build the signed payment notification WayForPay sends for the current order."""
+        order = Order.objects.get(id=self.client.session['order_id'])
+        data = {'merchantAccount': STUB_MERCHANT_ACCOUNT,
+                'orderReference': order.order_reference,
+                'amount': str(order.get_total_cost()),
+                'currency': 'UAH',
+                'authCode': '123456',
+                'cardPan': '41****1111',
+                'transactionStatus': 'Approved',
+                'reasonCode': '1100'}
+        data['merchantSignature'] = self.gateway.generate_signature(list(data.values()))
+        return data
+
+    def run(self) -> List[Sample]:
+        """
+        Walk through the journey, stopping at the first failed step.
+
+        Returns:
+            List[Sample]: One sample per request sent.
+
+        """
+        steps = [
+            ('product_list', 'get', reverse('shop:product_list'), None),
+            ('product_detail', 'get', self.product.get_absolute_url(), None),
+            ('cart_add', 'post', reverse('cart:cart_add', args=[self.product.id]),
+             {'quantity': 1, 'override': False}),
+            ('cart_detail', 'get', reverse('cart:cart_detail'), None),
+            ('coupon_apply', 'post', reverse('coupons:apply'), {'code': LOADTEST_COUPON_CODE}),
+            ('order_create', 'post', reverse('orders:order_create'),
+             {'first_name': 'Тест', 'last_name': 'Покупець', 'email': self.shopper.email,
+              'address': 'вул. Тестова, 1', 'postal_code': '01001', 'city': 'Київ'}),
+            ('payment_process', 'post', reverse('payment:process'), None),
+        ]
+        for step, method, path, data in steps:
+            if not self.request(step, method, path, data):
+                return self.samples
+        self.request('payment_completed', 'post', reverse('payment:completed'),
+                     self.webhook_data())
+        return self.samples
+
+
+def run_load(shoppers: List[User], products: List[Product], gateway: StubWayForPay,
+             concurrency: int) -> Dict[str, Any]:
+    """
+    Run one journey per shopper on a pool of worker threads.
+
+    Args:
+        shoppers (List[User]): The customers; each one walks through a single journey.
+        products (List[Product]): The product bought in each journey, one per shopper.
+        gateway (StubWayForPay): The payment gateway stub installed in the payment views.
+        concurrency (int): The number of journeys running at the same time.
+
+    Returns:
+        Dict[str, Any]: The samples of every journey and the wall-clock duration of the run.
+
+    """
+    def run_journey(shopper: User, product: Product) -> List[Sample]:
+        try:
+            return Journey(shopper, product, gateway).run()
+        finally:
+            connection.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        journeys = list(executor.map(run_journey, shoppers, products))
+    return {'samples': [sample for samples in journeys for sample in samples],
+            'journeys': len(journeys),
+            'completed': sum(1 for samples in journeys
+                             if len(samples) == len(JOURNEY_STEPS) and samples[-1].ok),
+            'seconds': time.perf_counter() - start}
+
+
+def summarize(run: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Aggregate the samples of a run into per-step latency percentiles and query counts.
+
+    Args:
+        run (Dict[str, Any]): The result of `run_load`.
+
+    Returns:
+        Dict[str, Any]: Per-step statistics with latencies in milliseconds, plus the overall
+            request and journey throughput per second.
+
+    """
+    steps = {}
+    for step in JOURNEY_STEPS:
+        samples = [s for s in run['samples'] if s.step == step]
+        if not samples:
+            continue
+        latencies = [s.seconds * 1000 for s in samples]
+        steps[step] = {'requests': len(samples),
+                       'errors': sum(1 for s in samples if not s.ok),
+                       'p50_ms': percentile(latencies, 50),
+                       'p95_ms': percentile(latencies, 95),
+                       'p99_ms': percentile(latencies, 99),
+                       'queries_per_request': sum(s.queries for s in samples) / len(samples)}
+    return {'steps': steps,
+            'requests': len(run['samples']),
+            'journeys': run['journeys'],
+            'completed_journeys': run['completed'],
+            'seconds': run['seconds'],
+            'requests_per_second': len(run['samples']) / run['seconds'],
+            'journeys_per_second': run['completed'] / run['seconds']}
@@ -0,0 +1,105 @@
+import json
+import random
+from typing import Any, Dict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from benchmarks.fixtures import (create_coupon, create_shoppers, seed_catalog,
+                                 seed_purchases)
+from benchmarks.loadtest import JOURNEY_STEPS, run_load, summarize
+from benchmarks.stubs import StubWayForPay, use_stand_ins
+
+
+class Command(BaseCommand):
+    help = ('Replay browse → cart → checkout → webhook journeys against a throwaway database and '
+            'report p50/p95/p99 latency, throughput and queries per request.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--journeys', type=int, default=100,
+                            help='Number of customer journeys to run.')
+        parser.add_argument('--concurrency', type=int, default=4,
+                            help='Number of journeys running at the same time.')
+        parser.add_argument('--products', type=int, default=500,
+                            help='Number of products in the seeded catalog.')
+        parser.add_argument('--categories', type=int, default=10,
+                            help='Number of categories in the seeded catalog.')
+        parser.add_argument('--gateway-latency', type=float, default=0.0,
+                            help='Milliseconds the WayForPay stub waits when creating an invoice.')
+        parser.add_argument('--seed', type=int, default=42,
+                            help='Random seed, so repeated runs replay the same journeys.')
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Keep the load-test database between runs.')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+        parser.add_argument('--baseline', help='Compare the results with a previous --output file.')
+
+    def handle(self, *args, **options):
+        if not getattr(settings, 'CELERY_TASK_ALWAYS_EAGER', False):
+            raise CommandError('Run the load test with --settings=myshop.settings_loadtest.')
+
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True,
+                                                      keepdb=options['keepdb'], serialize=False)
+        try:
+            rng = random.Random(options['seed'])
+            gateway = StubWayForPay(latency=options['gateway_latency'] / 1000)
+            with use_stand_ins(gateway):
+                self.stdout.write('Seeding the catalog...')
+                products = seed_catalog(options['categories'], options['products'], rng)
+                seed_purchases(products, options['products'] * 2, rng)
+                create_coupon()
+                shoppers = create_shoppers(options['journeys'])
+                self.stdout.write(f"Running {options['journeys']} journeys with "
+                                  f"{options['concurrency']} workers...")
+                run = run_load(shoppers, [rng.choice(products) for _ in shoppers], gateway,
+                               options['concurrency'])
+        finally:
+            connection.close()
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+        results = summarize(run)
+        results['config'] = {key: options[key] for key in
+                             ('journeys', 'concurrency', 'products', 'categories',
+                              'gateway_latency', 'seed')}
+        results['config']['database'] = connection.vendor
+
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+        self.report(results, baseline)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+
+    def report(self, results: Dict[str, Any], baseline: Dict[str, Any] = None) -> None:
+        """
+        Print the per-step statistics, with the change against the baseline when one is given.
+
+        Args:
+            results (Dict[str, Any]): The summary returned by `summarize`.
+            baseline (Dict[str, Any], optional): The summary of a previous run.
+
+        """
+        self.stdout.write(f"\n{'step':<18}{'requests':>9}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}"
+                          f"{'p99 ms':>9}{'queries':>9}{'p95 Δ':>9}")
+        for step in JOURNEY_STEPS:
+            stats = results['steps'].get(step)
+            if stats is None:
+                continue
+            delta = ''
+            previous = (baseline or {}).get('steps', {}).get(step)
+            if previous and previous['p95_ms']:
+                delta = f"{(stats['p95_ms'] / previous['p95_ms'] - 1) * 100:+.0f}%"
+            line = (f"{step:<18}{stats['requests']:>9}{stats['errors']:>8}"
+                    f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}"
+                    f"{stats['queries_per_request']:>9.1f}{delta:>9}")
+            self.stdout.write(self.style.ERROR(line) if stats['errors'] else line)
+
+        self.stdout.write(
+            f"\n{results['completed_journeys']}/{results['journeys']} journeys completed in "
+            f"{results['seconds']:.1f}s: {results['requests_per_second']:.1f} requests/s, "
+            f"{results['journeys_per_second']:.2f} journeys/s.")
+        if baseline:
+            self.stdout.write(f"Baseline: {baseline['requests_per_second']:.1f} requests/s, "
+                              f"{baseline['journeys_per_second']:.2f} journeys/s.")
@@ -0,0 +1,103 @@
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+import fakeredis
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+import coupons.redemptions
+import orders.admission
+import payment.views
+import shop.inventory
+import shop.rankings
+import shop.ratelimit
+import shop.recommender
+from payment.wayforpay import InvoiceCreateResult, WayForPay
+
+STUB_MERCHANT_KEY = 'loadtest'
+STUB_MERCHANT_ACCOUNT = 'loadtest_merchant'
+
+
+class StubWayForPay(WayForPay):
+    """
+    WayForPay client that creates invoices without calling the payment gateway.
+
+    Signatures are computed with the real code, so webhooks signed with `generate_signature` pass
+    the check in `payment_completed`.
+
+    """
+    def __init__(self, latency: float = 0.0) -> None:
+        """
+        Initializes the stub with a fixed merchant key.
+
+        Args:
+            latency (float): Seconds to sleep in `create_invoice`, imitating the gateway round trip.
+
+        """
+        super().__init__(key=STUB_MERCHANT_KEY, domain_name='testserver')
+        self.latency = latency
+        self.invoices_created = 0
+
+    def create_invoice(self, merchantAccount: str, merchantAuthType: str, amount: str,
+                       currency: str, *args: Any, **kwargs: Any) -> Optional[InvoiceCreateResult]:
+        """Return an invoice pointing at the payment page of the stub merchant."""
+        if self.latency:
+            time.sleep(self.latency)
+        self.invoices_created += 1
+        order_reference = f'LT{time.time_ns()}{self.invoices_created}'
+        return InvoiceCreateResult(f'https://secure.wayforpay.com/invoice/{order_reference}',
+                                   'Ok', 1100, None, order_reference)
+
+
+@contextmanager
+def use_stand_ins(gateway: StubWayForPay) -> Iterator[fakeredis.FakeServer]:
+    """
+    Replace Redis and WayForPay with in-process stand-ins for the duration of the block.
+
+    Args:
+        gateway (StubWayForPay): The payment gateway stub used by the payment views.
+
+    Yields:
+        fakeredis.FakeServer: The in-memory Redis server shared by the sync and async clients.
+
+    """
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeRedis(server=server)
+    patched = [
+        (shop.recommender, 'r', client),
+        (shop.inventory, 'r', client),
+        (shop.rankings, 'r', client),
+        (shop.ratelimit, 'r', client),
+        (coupons.redemptions, 'r', client),
+        (orders.admission, 'r', client),
+        (shop.recommender, 'get_async_redis', lambda: fakeredis.FakeAsyncRedis(server=server)),
+        (payment.views, 'wayforpay', gateway),
+    ]
+    originals = [(module, name, getattr(module, name)) for module, name, _ in patched]
+    for module, name, stand_in in patched:
+        setattr(module, name, stand_in)
+    try:
+        yield server
+    finally:
+        for module, name, original in originals:
+            setattr(module, name, original)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class StandInTestCase(TestCase):
+    """
+    Test case running every test against an empty in-process Redis and cache.
+
+    The modules talking to Redis share `redis` for assertions, and WayForPay is replaced with
+    `gateway`, so tests need neither a Redis server nor the payment gateway.
+
+    """
+    def setUp(self) -> None:
+        super().setUp()
+        self.gateway = StubWayForPay()
+        stand_ins = use_stand_ins(self.gateway)
+        stand_ins.__enter__()
+        self.addCleanup(stand_ins.__exit__, None, None, None)
+        self.redis = shop.inventory.r
+        cache.clear()
@@ -21,7 +21,7 @@ class Cart:
     def __init__(self, request: HttpRequest) -> None:
         self.session = request.session
         cart = self.session.get(settings.CART_SESSION_ID)
-        if not cart:
+        if cart is None:
             cart = self.session[settings.CART_SESSION_ID] = {}
         self.cart = cart
         self.coupon_id = self.session.get('coupon_id')
@@ -1,16 +1,21 @@
-from django.http import HttpRequest, HttpResponseRedirect
-from django.shortcuts import get_object_or_404, redirect, render
+from asgiref.sync import sync_to_async
+from django.http import HttpRequest, HttpResponse, HttpResponseRedirect
+from django.shortcuts import get_object_or_404, redirect
+from django.template.response import TemplateResponse
 from django.views.decorators.http import require_POST
 
 from coupons.forms import CouponApplyForm
 from coupons.views import coupon_apply
 from shop.models import Product
+from shop.ratelimit import rate_limit
+from shop.recently_viewed import aget_ids, aget_products, get_history_key
 
 from .cart import Cart
 from .forms import CartAddProductForm
 from shop.recommender import Recommender
 
 
+@rate_limit('cart_add', key=['ip', 'session'])
 @require_POST
 def cart_add(request: HttpRequest, product_id: int) -> HttpResponseRedirect:
     """
@@ -53,10 +58,14 @@ def cart_remove(request: HttpRequest, product_id: int) -> HttpResponseRedirect:
     return redirect('cart:cart_detail')
 
 
-def cart_detail(request: HttpRequest) -> HttpResponseRedirect:
+async def cart_detail(request: HttpRequest) -> HttpResponse:
     """
     Renders the cart detail page.
 
+    Recommendations are fetched with the asyncio Redis client from the product IDs stored in the
+    session, weighted by quantity. The recently viewed products that are not in the cart are
+    loaded with one query. The cart products themselves are loaded while the template is rendered.
+
     Args:
         request (HttpRequest): The request object, used to access session data.
 
@@ -64,21 +73,27 @@ def cart_detail(request: HttpRequest) -> HttpResponseRedirect:
         HttpResponse: The rendered cart detail page.
 
     """
-    cart = Cart(request)
-    for item in cart:
+    cart = await sync_to_async(Cart)(request)
+    for item in cart.cart.values():
         item['update_quantity_form'] = CartAddProductForm(initial={
             'quantity': item['quantity'],
             'override': True})
     coupon_apply_form = CouponApplyForm()
 
     r = Recommender()
-    cart_products = [item['product'] for item in cart]
+    quantities = {int(id): item['quantity'] for id, item in cart.cart.items()}
 
-    if cart_products:
-        recommended_products = r.suggest_products_for(cart_products, max_results=2)
+    if quantities:
+        recommended_products = await r.asuggest_products_for(list(quantities), max_results=2,
+                                                             weights=quantities)
     else:
         recommended_products = []
 
-    return render(request, 'cart/detail.html', {'cart': cart,
-                                                'coupon_apply_form': coupon_apply_form,
-                                                'recommended_products': recommended_products})
+    viewed_ids = await aget_ids(await sync_to_async(get_history_key)(request))
+    recently_viewed = await aget_products(viewed_ids, exclude=list(quantities))
+
+    return TemplateResponse(request, 'cart/detail.html', {
+        'cart': cart,
+        'coupon_apply_form': coupon_apply_form,
+        'recommended_products': recommended_products,
+        'recently_viewed': recently_viewed})
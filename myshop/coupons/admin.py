@@ -5,6 +5,7 @@ from .models import Coupon
 
 @admin.register(Coupon)
 class CouponAdmin(admin.ModelAdmin):
-    list_display = ['code', 'valid_from', 'valid_to', 'discount', 'active']
+    list_display = ['code', 'valid_from', 'valid_to', 'discount', 'active', 'max_redemptions',
+                    'max_redemptions_per_profile']
     list_filter = ['active', 'valid_from', 'valid_to']
     search_fields = ['code']
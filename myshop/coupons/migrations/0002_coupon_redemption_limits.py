@@ -0,0 +1,23 @@
+# Generated by Django 5.0.14 on 2026-10-19 15:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coupons', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coupon',
+            name='max_redemptions',
+            field=models.PositiveIntegerField(blank=True, help_text='Total number of orders; leave empty for no limit', null=True),
+        ),
+        migrations.AddField(
+            model_name='coupon',
+            name='max_redemptions_per_profile',
+            field=models.PositiveIntegerField(blank=True, help_text='Orders per customer; leave empty for no limit', null=True),
+        ),
+    ]
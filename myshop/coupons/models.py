@@ -9,6 +9,10 @@ class Coupon(models.Model):
     discount = models.IntegerField(validators=[MinValueValidator(0),
                                                MaxValueValidator(100)])
     active = models.BooleanField()
+    max_redemptions = models.PositiveIntegerField(
+        null=True, blank=True, help_text="Total number of orders; leave empty for no limit")
+    max_redemptions_per_profile = models.PositiveIntegerField(
+        null=True, blank=True, help_text="Orders per customer; leave empty for no limit")
 
     def __str__(self):
         return self.code
@@ -0,0 +1,212 @@
+import time
+from datetime import timedelta
+from typing import List, Optional
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+from shop.recommender import get_redis
+
+from .models import Coupon
+
+# Unpaid orders stop counting against the limits after this many seconds, like the stock they
+# reserved in shop.inventory.
+REDEMPTION_TIMEOUT = 60 * 30
+# Redemptions not yet visible in the database are counted by the reconciliation for this long,
+# which covers orders whose transaction is still open.
+PENDING_TIMEOUT = 60
+
+r = get_redis()
+
+# KEYS: the total counter, the per-profile counters and the pending redemptions. ARGV: the total
+# limit, the per-profile limit (empty for no limit), the profile ID, the pending member and the
+# time. Returns -1 if the counters are not loaded, 1 or 2 if the total or per-profile limit was
+# reached, or 0 after counting the redemption.
+REDEEM_SCRIPT = r.register_script('''
+local total = redis.call('GET', KEYS[1])
+if not total then
+    return -1
+end
+if ARGV[1] ~= '' and tonumber(total) >= tonumber(ARGV[1]) then
+    return 1
+end
+local used = tonumber(redis.call('HGET', KEYS[2], ARGV[3]) or '0')
+if ARGV[2] ~= '' and used >= tonumber(ARGV[2]) then
+    return 2
+end
+redis.call('INCR', KEYS[1])
+redis.call('HINCRBY', KEYS[2], ARGV[3], 1)
+redis.call('ZADD', KEYS[3], ARGV[5], ARGV[4])
+return 0
+''')
+
+# KEYS: as for REDEEM_SCRIPT. ARGV: the profile ID and the pending member. Returns 1 if the
+# redemption was still pending and is no longer counted.
+RELEASE_SCRIPT = r.register_script('''
+if redis.call('ZREM', KEYS[3], ARGV[2]) == 0 then
+    return 0
+end
+redis.call('DECR', KEYS[1])
+redis.call('HINCRBY', KEYS[2], ARGV[1], -1)
+return 1
+''')
+
+# KEYS: as for REDEEM_SCRIPT. ARGV: the time before which pending redemptions are dropped, the
+# number n of pending members whose order is in the database, those n members, the total counted
+# in the database, then profile ID and count pairs. Returns the new total.
+RECONCILE_SCRIPT = r.register_script('''
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', ARGV[1])
+local n = tonumber(ARGV[2])
+local committed = {}
+for i = 1, n do
+    committed[ARGV[2 + i]] = true
+end
+local total = tonumber(ARGV[3 + n])
+local counts = {}
+for i = 4 + n, #ARGV, 2 do
+    counts[ARGV[i]] = tonumber(ARGV[i + 1])
+end
+for _, member in ipairs(redis.call('ZRANGE', KEYS[3], 0, -1)) do
+    if not committed[member] then
+        local profile = string.match(member, ':(%d+)$')
+        total = total + 1
+        counts[profile] = (counts[profile] or 0) + 1
+    end
+end
+redis.call('DEL', KEYS[2])
+for profile, count in pairs(counts) do
+    redis.call('HSET', KEYS[2], profile, count)
+end
+redis.call('SET', KEYS[1], total)
+return total
+''')
+
+
+class RedemptionLimitReached(Exception):
+    """Raised when a coupon cannot be redeemed for another order."""
+    def __init__(self, coupon: Coupon, per_profile: bool) -> None:
+        limit = 'per-profile' if per_profile else 'total'
+        super().__init__(f'Coupon {coupon.code} reached its {limit} redemption limit.')
+        self.coupon = coupon
+        self.per_profile = per_profile
+
+
+def get_keys(coupon_id: int) -> List[str]:
+    """Generate the Redis keys of the total, per-profile and pending redemptions of a coupon."""
+    return [f'coupon:{coupon_id}:redeemed',
+            f'coupon:{coupon_id}:profiles',
+            f'coupon:{coupon_id}:pending']
+
+
+def is_limited(coupon: Coupon) -> bool:
+    """Check whether the redemptions of a coupon are capped at all."""
+    return coupon.max_redemptions is not None or coupon.max_redemptions_per_profile is not None
+
+
+def is_exhausted(coupon: Coupon) -> bool:
+    """Check whether a coupon reached its total limit, without counting a redemption."""
+    if coupon.max_redemptions is None:
+        return False
+    total = r.get(get_keys(coupon.id)[0])
+    return total is not None and int(total) >= coupon.max_redemptions
+
+
+def redeem(coupon: Coupon, profile_id: int, order_id: int) -> None:
+    """
+    Count an order against the redemption limits of its coupon.
+
+    The check and the increments run in one Lua script, so a burst of orders never goes over the
+    limits and never waits on a lock of the coupon row. Missing counters are loaded from the
+    database first. Coupons without limits are not counted.
+
+    Args:
+        coupon (Coupon): The coupon applied to the order.
+        profile_id (int): The ID of the profile placing the order.
+        order_id (int): The ID of the order.
+
+    Raises:
+        RedemptionLimitReached: If the coupon was used up, in total or by this profile.
+
+    """
+    if not is_limited(coupon):
+        return
+    limits = [coupon.max_redemptions, coupon.max_redemptions_per_profile]
+    args = ['' if limit is None else limit for limit in limits]
+    args += [profile_id, f'{order_id}:{profile_id}', time.time()]
+    result = REDEEM_SCRIPT(keys=get_keys(coupon.id), args=args, client=r)
+    if result == -1:
+        # The order is already visible to this transaction and is counted by the script.
+        reconcile(coupon, exclude_order_id=order_id)
+        result = REDEEM_SCRIPT(keys=get_keys(coupon.id), args=args, client=r)
+    if result:
+        raise RedemptionLimitReached(coupon, per_profile=result == 2)
+
+
+def release(coupon: Coupon, profile_id: int, order_id: int) -> None:
+    """
+    Stop counting an order whose creation was rolled back.
+
+    Args:
+        coupon (Coupon): The coupon applied to the order.
+        profile_id (int): The ID of the profile that placed the order.
+        order_id (int): The ID of the order.
+
+    """
+    if is_limited(coupon):
+        RELEASE_SCRIPT(keys=get_keys(coupon.id), args=[profile_id, f'{order_id}:{profile_id}'],
+                       client=r)
+
+
+def reconcile(coupon: Coupon, exclude_order_id: Optional[int] = None) -> int:
+    """
+    Recount the redemptions of a coupon from ``Order.coupon`` and overwrite its counters.
+
+    Paid orders and unpaid orders younger than ``REDEMPTION_TIMEOUT`` count, so abandoned orders
+    give their redemption back. Redemptions whose order is not visible in the database yet are
+    kept for ``PENDING_TIMEOUT`` seconds. They may be counted twice until the next run, which
+    errs on the side of the limits.
+
+    Args:
+        coupon (Coupon): The coupon to reconcile.
+        exclude_order_id (Optional[int], optional): An order being redeemed, not to be counted.
+
+    Returns:
+        int: The number of redemptions counted.
+
+    """
+    from orders.models import Order
+
+    keys = get_keys(coupon.id)
+    pending = [member.decode() for member in r.zrange(keys[2], 0, -1)]
+    visible = set(Order.objects.filter(id__in=[int(member.split(':')[0]) for member in pending])
+                  .values_list('id', flat=True))
+    committed = [member for member in pending if int(member.split(':')[0]) in visible]
+
+    since = timezone.now() - timedelta(seconds=REDEMPTION_TIMEOUT)
+    counts = (Order.objects.filter(Q(paid=True) | Q(created__gte=since), coupon=coupon)
+              .exclude(id=exclude_order_id)
+              .values_list('profile_id').annotate(count=Count('id')).order_by())
+    args: List = [time.time() - PENDING_TIMEOUT, len(committed), *committed,
+                  sum(count for _, count in counts)]
+    for profile_id, count in counts:
+        args += [profile_id, count]
+    return RECONCILE_SCRIPT(keys=keys, args=args, client=r)
+
+
+def reconcile_all() -> int:
+    """
+    Reconcile the counters of every limited coupon that can still be redeemed or released.
+
+    Returns:
+        int: The number of reconciled coupons.
+
+    """
+    since = timezone.now() - timedelta(seconds=REDEMPTION_TIMEOUT)
+    coupons = Coupon.objects.filter(Q(max_redemptions__isnull=False)
+                                    | Q(max_redemptions_per_profile__isnull=False),
+                                    valid_to__gte=since)
+    reconciled = 0
+    for coupon in coupons:
+        reconcile(coupon)
+        reconciled += 1
+    return reconciled
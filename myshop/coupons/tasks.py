@@ -0,0 +1,15 @@
+from celery import shared_task
+
+from . import redemptions
+
+
+@shared_task
+def reconcile_redemptions() -> int:
+    """
+    Recount the redemptions of limited coupons from their orders.
+
+    Returns:
+        int: The number of reconciled coupons.
+
+    """
+    return redemptions.reconcile_all()
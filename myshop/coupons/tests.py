@@ -1,3 +1,90 @@
-from django.test import TestCase
+from datetime import timedelta
+from typing import Optional
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from benchmarks.stubs import StandInTestCase
+from orders.models import Order
+from users.models import Profile
+
+from . import redemptions
+from .models import Coupon
+
+
+class RedemptionTests(StandInTestCase):
+    def create_coupon(self, total: Optional[int] = None,
+                      per_profile: Optional[int] = None) -> Coupon:
+        now = timezone.now()
+        return Coupon.objects.create(code=f'SALE{Coupon.objects.count()}', discount=10,
+                                     active=True, valid_from=now - timedelta(days=1),
+                                     valid_to=now + timedelta(days=1), max_redemptions=total,
+                                     max_redemptions_per_profile=per_profile)
+
+    def create_profile(self) -> Profile:
+        return User.objects.create_user(f'customer{User.objects.count()}').profile
+
+    def create_order(self, profile: Profile, coupon: Coupon, paid: bool = False) -> Order:
+        return Order.objects.create(profile=profile, first_name='Іван', last_name='Петренко',
+                                    email='ivan@example.com', address='вул. Хрещатик, 1',
+                                    postal_code='01001', city='Київ', coupon=coupon,
+                                    discount=coupon.discount, paid=paid)
+
+    def redeem(self, profile: Profile, coupon: Coupon) -> Order:
+        order = self.create_order(profile, coupon)
+        redemptions.redeem(coupon, profile.id, order.id)
+        return order
+
+    def test_total_limit(self) -> None:
+        coupon = self.create_coupon(total=2)
+        self.redeem(self.create_profile(), coupon)
+        self.redeem(self.create_profile(), coupon)
+        self.assertTrue(redemptions.is_exhausted(coupon))
+        with self.assertRaises(redemptions.RedemptionLimitReached) as raised:
+            self.redeem(self.create_profile(), coupon)
+        self.assertFalse(raised.exception.per_profile)
+
+    def test_per_profile_limit(self) -> None:
+        coupon = self.create_coupon(per_profile=1)
+        profile = self.create_profile()
+        self.redeem(profile, coupon)
+        with self.assertRaises(redemptions.RedemptionLimitReached) as raised:
+            self.redeem(profile, coupon)
+        self.assertTrue(raised.exception.per_profile)
+        self.redeem(self.create_profile(), coupon)
+
+    def test_counters_are_loaded_from_existing_orders(self) -> None:
+        coupon = self.create_coupon(total=2)
+        self.create_order(self.create_profile(), coupon, paid=True)
+        self.redeem(self.create_profile(), coupon)
+        with self.assertRaises(redemptions.RedemptionLimitReached):
+            self.redeem(self.create_profile(), coupon)
+
+    def test_release_gives_the_redemption_back(self) -> None:
+        coupon = self.create_coupon(total=1)
+        profile = self.create_profile()
+        order = self.redeem(profile, coupon)
+        redemptions.release(coupon, profile.id, order.id)
+        self.assertFalse(redemptions.is_exhausted(coupon))
+        # Releasing twice must not free a second slot.
+        redemptions.release(coupon, profile.id, order.id)
+        self.redeem(self.create_profile(), coupon)
+        self.assertTrue(redemptions.is_exhausted(coupon))
+
+    def test_reconcile_counts_paid_and_recent_orders(self) -> None:
+        coupon = self.create_coupon(total=10)
+        profile = self.create_profile()
+        paid = self.create_order(profile, coupon, paid=True)
+        self.create_order(profile, coupon)
+        abandoned = self.create_order(profile, coupon)
+        Order.objects.filter(id__in=[paid.id, abandoned.id]).update(
+            created=timezone.now() - timedelta(days=1))
+        self.assertEqual(redemptions.reconcile(coupon), 2)
+        total, profiles, _ = redemptions.get_keys(coupon.id)
+        self.assertEqual(int(self.redis.get(total)), 2)
+        self.assertEqual(int(self.redis.hget(profiles, profile.id)), 2)
+
+    def test_unlimited_coupons_are_not_counted(self) -> None:
+        coupon = self.create_coupon()
+        self.redeem(self.create_profile(), coupon)
+        self.assertFalse(any(self.redis.exists(key) for key in redemptions.get_keys(coupon.id)))
@@ -2,16 +2,22 @@ from django.http import HttpResponse, HttpRequest
 from django.shortcuts import redirect, render
 from django.utils import timezone
 from django.views.decorators.http import require_POST
+from shop.ratelimit import rate_limit
 
 from .forms import CouponApplyForm
 from .models import Coupon
+from .redemptions import is_exhausted
 
 
+@rate_limit('coupon_apply', key=['ip', 'session'])
 @require_POST
 def coupon_apply(request: HttpRequest) -> HttpResponse:
     """
     Apply a coupon to the current cart session.
 
+    Coupons that reached their total redemption limit are not applied. The limits are enforced
+    when the order is created.
+
     Args:
         request (HttpRequest): The HTTP request object containing POST data with the coupon code.
 
@@ -28,7 +34,7 @@ def coupon_apply(request: HttpRequest) -> HttpResponse:
                                         valid_from__lte=now,
                                         valid_to__gte=now,
                                         active=True)
-            request.session['coupon_id'] = coupon.id
+            request.session['coupon_id'] = None if is_exhausted(coupon) else coupon.id
         except Coupon.DoesNotExist:
             request.session['coupon_id'] = None
     return redirect('cart:cart_detail')
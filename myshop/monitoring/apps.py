@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+
+
+class MonitoringConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'monitoring'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from .instrumentation import install_db_hook, instrument_redis
+
+        connection_created.connect(install_db_hook)
+        instrument_redis()
@@ -0,0 +1,127 @@
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+
+import redis
+import redis.asyncio
+
+from .metrics import OUTBOUND_HTTP_LATENCY
+
+
+class RequestStats:
+    """Counters collected by the hooks while a single request is being served."""
+    def __init__(self) -> None:
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.redis_calls = 0
+        self.redis_time = 0.0
+        self.http_calls = 0
+        self.http_time = 0.0
+
+
+# Set by MetricsMiddleware. sync_to_async and async_to_sync copy the context, so the hooks see the
+# stats of the current request in worker threads too. Outside a request it stays None and the
+# hooks only pay for one lookup.
+current_stats: ContextVar[Optional[RequestStats]] = ContextVar('current_stats', default=None)
+
+
+def db_hook(execute: Callable, sql: str, params: Any, many: bool,
+            context: Dict[str, Any]) -> Any:
+    """Database execute wrapper adding the query and its duration to the current request."""
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_queries += 1
+        stats.db_time += time.perf_counter() - start
+
+
+def install_db_hook(sender: Any, connection: Any, **kwargs: Any) -> None:
+    """
+    Install `db_hook` on a new database connection.
+
+    Connected to the ``connection_created`` signal, so every connection in every thread is
+    instrumented, including the ones used by sync_to_async in async views.
+
+    Args:
+        sender (Any): The database wrapper class.
+        connection (Any): The database connection that was opened.
+        **kwargs (Any): Additional keyword arguments.
+
+    """
+    if db_hook not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, db_hook)
+
+
+def _timed(method: Callable) -> Callable:
+    """Wrap a Redis client method so that each call counts as one round trip."""
+    @wraps(method)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        stats = current_stats.get()
+        if stats is None:
+            return method(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            stats.redis_calls += 1
+            stats.redis_time += time.perf_counter() - start
+    wrapper._instrumented = True
+    return wrapper
+
+
+def _atimed(method: Callable) -> Callable:
+    """Asynchronous counterpart of `_timed` for the asyncio Redis client."""
+    @wraps(method)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        stats = current_stats.get()
+        if stats is None:
+            return await method(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            stats.redis_calls += 1
+            stats.redis_time += time.perf_counter() - start
+    wrapper._instrumented = True
+    return wrapper
+
+
+def instrument_redis() -> None:
+    """
+    Count Redis round trips made by any client, including the Django cache backend.
+
+    A command sent on its own and a whole pipeline each count as one round trip.
+
+    """
+    targets = [(redis.client.Redis, 'execute_command', _timed),
+               (redis.client.Pipeline, 'execute', _timed),
+               (redis.asyncio.client.Redis, 'execute_command', _atimed),
+               (redis.asyncio.client.Pipeline, 'execute', _atimed)]
+    for cls, name, decorator in targets:
+        method = getattr(cls, name)
+        if not getattr(method, '_instrumented', False):
+            setattr(cls, name, decorator(method))
+
+
+def record_outbound_request(service: str, operation: str, outcome: str,
+                            duration: float) -> None:
+    """
+    Record a call to an external HTTP service.
+
+    Args:
+        service (str): The name of the service, e.g. ``wayforpay``.
+        operation (str): The API operation that was called.
+        outcome (str): The HTTP status code, or ``error`` if no response was received.
+        duration (float): The time the call took, in seconds.
+
+    """
+    OUTBOUND_HTTP_LATENCY.labels(service, operation, outcome).observe(duration)
+    stats = current_stats.get()
+    if stats is not None:
+        stats.http_calls += 1
+        stats.http_time += duration
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from monitoring.profiling import PROFILE_HEADER, make_profile_token
+
+
+class Command(BaseCommand):
+    help = 'Issue a signed token that makes requests carrying it be profiled.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='The staff user the token is issued to.')
+
+    def handle(self, *args, **options):
+        if not User.objects.filter(username=options['username'], is_staff=True).exists():
+            raise CommandError(f"{options['username']} is not a staff user.")
+        token = make_profile_token(options['username'])
+        minutes = settings.PROFILER_TOKEN_MAX_AGE // 60
+        self.stdout.write(f'{PROFILE_HEADER}: {token}')
+        self.stdout.write(f'The token is valid for {minutes} minutes. The path of each profile is '
+                          f'returned in the X-Profile-Path response header.')
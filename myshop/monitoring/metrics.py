@@ -0,0 +1,23 @@
+from prometheus_client import Histogram
+
+LATENCY_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+REQUEST_LATENCY = Histogram(
+    'myshop_request_duration_seconds', 'Time spent serving a request.',
+    ['view', 'method', 'status'], buckets=LATENCY_BUCKETS)
+REQUEST_DB_QUERIES = Histogram(
+    'myshop_request_db_queries', 'Database queries run while serving a request.',
+    ['view'], buckets=COUNT_BUCKETS)
+REQUEST_DB_TIME = Histogram(
+    'myshop_request_db_duration_seconds', 'Time spent in database queries per request.',
+    ['view'], buckets=LATENCY_BUCKETS)
+REQUEST_REDIS_CALLS = Histogram(
+    'myshop_request_redis_round_trips', 'Redis round trips made while serving a request.',
+    ['view'], buckets=COUNT_BUCKETS)
+REQUEST_REDIS_TIME = Histogram(
+    'myshop_request_redis_duration_seconds', 'Time spent waiting for Redis per request.',
+    ['view'], buckets=LATENCY_BUCKETS)
+OUTBOUND_HTTP_LATENCY = Histogram(
+    'myshop_outbound_http_duration_seconds', 'Latency of calls to external HTTP services.',
+    ['service', 'operation', 'outcome'], buckets=LATENCY_BUCKETS)
@@ -0,0 +1,221 @@
+import asyncio
+import cProfile
+import os
+import pstats
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.http import HttpRequest, HttpResponse
+
+from .middleware import get_view_name
+
+PROFILE_HEADER = 'X-Profile-Token'
+PROFILE_TOKEN_SALT = 'monitoring.profile'
+
+# cProfile can only be active once per interpreter on Python 3.12+, and one capture at a time
+# keeps the overhead bounded on older versions too.
+_capture_lock = threading.Lock()
+_last_sample = 0.0
+
+
+def make_profile_token(username: str) -> str:
+    """Return a signed token that makes requests carrying it in `PROFILE_HEADER` be profiled."""
+    return signing.TimestampSigner(salt=PROFILE_TOKEN_SALT).sign(username)
+
+
+def has_valid_token(request: HttpRequest) -> bool:
+    """
+    Check whether the request carries an unexpired token from `make_profile_token`.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        bool: True if the request asks for a profile and is allowed to.
+
+    """
+    token = request.headers.get(PROFILE_HEADER)
+    if not token:
+        return False
+    try:
+        signing.TimestampSigner(salt=PROFILE_TOKEN_SALT).unsign(
+            token, max_age=settings.PROFILER_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def should_sample() -> bool:
+    """Draw a request for sampling, at most once per ``PROFILER_MIN_INTERVAL`` seconds."""
+    global _last_sample
+    if not settings.PROFILER_SAMPLE_RATE or random.random() >= settings.PROFILER_SAMPLE_RATE:
+        return False
+    now = time.monotonic()
+    if now - _last_sample < settings.PROFILER_MIN_INTERVAL:
+        return False
+    _last_sample = now
+    return True
+
+
+def save_profile(profiles: List[cProfile.Profile], view: str, duration: float) -> Path:
+    """
+    Write the captured profiles as one pstats file in a directory per view.
+
+    Only the newest ``PROFILER_MAX_FILES`` files of each view are kept. The files can be read with
+    ``python -m pstats`` or turned into a flame graph with tools such as flameprof or snakeviz.
+
+    Args:
+        profiles (List[cProfile.Profile]): The finished profiles of the threads that ran the
+            request.
+        view (str): The URL name of the profiled view.
+        duration (float): The time the request took, in seconds.
+
+    Returns:
+        Path: The written file.
+
+    """
+    directory = Path(settings.PROFILER_OUTPUT_DIR) / view.replace(':', '.').strip('<>')
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f'{time.time_ns() // 1000000}-{os.getpid()}-{duration * 1000:.0f}ms.prof'
+    pstats.Stats(*profiles).dump_stats(path)
+    for old in sorted(directory.glob('*.prof'))[:-settings.PROFILER_MAX_FILES]:
+        old.unlink(missing_ok=True)
+    return path
+
+
+class ProfilerMiddleware:
+    """
+    Profile a sample of live requests with cProfile and save the stats per view.
+
+    A request is profiled when it carries a valid `PROFILE_HEADER` token, or when it is drawn
+    with probability ``PROFILER_SAMPLE_RATE``. At most one request per process is profiled at a
+    time; requests arriving meanwhile are served normally. Samples are also taken no more than
+    once per ``PROFILER_MIN_INTERVAL`` seconds, so the middleware can stay enabled under load.
+
+    cProfile only sees the thread it is enabled in. Under WSGI that is the thread serving the
+    whole request. Under ASGI the profiler is enabled from `process_view` in the worker thread of
+    the request, which runs sync views, the ORM calls of async views and template rendering. An
+    async view is run on an event loop of its own in another profiled thread, so the requests
+    sharing the server loop stay out of its profile; since it is called from `process_view`,
+    exception middleware does not see its errors. The profiles of the threads are merged into one
+    file. The middleware must come last in ``MIDDLEWARE``, so the checks of the other middleware
+    run before a view is called.
+
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            # Django awaits an async process_view directly; a sync one would cost every request a
+            # hop to a worker thread.
+            self.process_view = self.aprocess_view
+
+    def select(self, request: HttpRequest) -> bool:
+        """Pick the request for a profile if it is selected and no other capture is running."""
+        requested = has_valid_token(request)
+        if not (requested or should_sample()):
+            return False
+        if not _capture_lock.acquire(blocking=False):
+            return False
+        request._profile_requested = requested
+        request._profiles = []
+        return True
+
+    def enable(self, request: HttpRequest) -> Optional[cProfile.Profile]:
+        """Start profiling the current thread for the request."""
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler, e.g. a debugger, is already active.
+            return None
+        request._profiles.append(profile)
+        return profile
+
+    def finish(self, request: HttpRequest, response: HttpResponse, duration: float) -> None:
+        """Save the capture and point staff to the file."""
+        if not request._profiles:
+            return
+        path = save_profile(request._profiles, get_view_name(request), duration)
+        if request._profile_requested:
+            response.headers['X-Profile-Path'] = str(path)
+
+    async def afinish(self, request: HttpRequest, response: HttpResponse,
+                      duration: float) -> None:
+        """Like `finish`, but write the file in a worker thread to keep the event loop free."""
+        await sync_to_async(self.finish)(request, response, duration)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.select(request):
+            return self.get_response(request)
+        profile = self.enable(request)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            if profile:
+                profile.disable()
+            _capture_lock.release()
+        self.finish(request, response, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        if not self.select(request):
+            return await self.get_response(request)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profile = getattr(request, '_thread_profile', None)
+            if profile:
+                # cProfile must be stopped in the thread it was started in.
+                await sync_to_async(profile.disable)()
+            _capture_lock.release()
+        await self.afinish(request, response, time.perf_counter() - start)
+        return response
+
+    async def aprocess_view(self, request: HttpRequest, view_func: Callable,
+                            view_args: Tuple, view_kwargs: Dict[str, Any]) -> Optional[HttpResponse]:
+        """
+        Start the profiler in the threads that run the view of a selected request.
+
+        Args:
+            request (HttpRequest): The HTTP request object.
+            view_func (Callable): The resolved view.
+            view_args (Tuple): The positional arguments of the view.
+            view_kwargs (Dict[str, Any]): The keyword arguments of the view.
+
+        Returns:
+            Optional[HttpResponse]: The response of an async view, or None to let Django call a
+                sync view in the worker thread the profiler was started in.
+
+        """
+        if not hasattr(request, '_profiles'):
+            return None
+        request._thread_profile = await sync_to_async(self.enable)(request)
+        if not iscoroutinefunction(view_func):
+            return None
+        return await sync_to_async(self.run_on_own_loop, thread_sensitive=False)(
+            request, view_func, view_args, view_kwargs)
+
+    def run_on_own_loop(self, request: HttpRequest, view_func: Callable, view_args: Tuple,
+                        view_kwargs: Dict[str, Any]) -> HttpResponse:
+        """Run an async view on a new event loop in the current thread and profile the thread."""
+        profile = self.enable(request)
+        try:
+            return asyncio.run(view_func(request, *view_args, **view_kwargs))
+        finally:
+            if profile:
+                profile.disable()
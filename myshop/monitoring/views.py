@@ -0,0 +1,36 @@
+import hmac
+import os
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse, HttpResponseForbidden
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+from prometheus_client import multiprocess
+
+
+def metrics(request: HttpRequest) -> HttpResponse:
+    """
+    Expose the collected metrics in the Prometheus text format.
+
+    Scrapers authenticate with ``Authorization: Bearer <METRICS_TOKEN>``; staff users can open
+    the page in a browser. When gunicorn runs several workers, ``PROMETHEUS_MULTIPROC_DIR`` is
+    set and the histograms of all workers are merged from their files.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        HttpResponse: The metrics, or 403 if the request is not authorized.
+
+    """
+    token = settings.METRICS_TOKEN
+    authorization = request.headers.get('Authorization', '')
+    if not (token and hmac.compare_digest(authorization, f'Bearer {token}')
+            or request.user.is_staff):
+        return HttpResponseForbidden()
+
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,144 @@
+import random
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Model
+from django.http import HttpRequest, HttpResponse
+
+# Set by ReplicaPinMiddleware. Reads are only sent to replicas while a request is being served,
+# so management commands and Celery tasks read what they just wrote unless they ask for a
+# replica with `get_replica_alias`.
+current_pin: ContextVar[Optional['ReplicaPin']] = ContextVar('current_pin', default=None)
+
+
+class ReplicaPin:
+    """Whether the client of the current request must read from the primary."""
+    def __init__(self, pinned: bool) -> None:
+        self.pinned = pinned
+        self.wrote = False
+        self.catalog_changed: Optional[bool] = None
+
+
+def catalog_recently_changed(pin: ReplicaPin) -> bool:
+    """
+    Tell whether the catalog changed too recently for the replicas to have caught up.
+
+    Page validators are computed from the catalog version, so pages built right after a change
+    must not be read from a replica still holding the old rows, or browsers would keep the stale
+    copy under the new ETag. The version is read once per request.
+
+    Args:
+        pin (ReplicaPin): The pin of the current request.
+
+    Returns:
+        bool: True if the catalog changed in the last ``REPLICA_PIN_SECONDS``.
+
+    """
+    if pin.catalog_changed is None:
+        from shop.catalog import get_catalog_version
+
+        pin.catalog_changed = time.time() - get_catalog_version() < settings.REPLICA_PIN_SECONDS
+    return pin.catalog_changed
+
+
+def get_replica_aliases() -> list[str]:
+    """Return the aliases of the configured read replicas."""
+    return [alias for alias in settings.DATABASES if alias.startswith('replica')]
+
+
+def get_replica_alias() -> str:
+    """
+    Pick a read replica for reads that can lag behind, such as reports and exports.
+
+    Returns:
+        str: The alias of a random replica, or of the primary if there are none.
+
+    """
+    aliases = get_replica_aliases()
+    return random.choice(aliases) if aliases else DEFAULT_DB_ALIAS
+
+
+class ReplicaRouter:
+    """
+    Send catalog reads to the read replicas and everything else to the primary.
+
+    Only models of ``REPLICA_READ_APPS`` are read from replicas, and only while serving a request
+    whose client did not write in the last ``REPLICA_PIN_SECONDS``, outside transactions. Carts
+    live in the session, so adding to the cart or placing an order pins the client to the primary
+    and it reads its own writes. For ``REPLICA_PIN_SECONDS`` after a catalog change every client
+    reads from the primary, so pages tagged with the new catalog version hold the new data.
+
+    """
+    def db_for_read(self, model: type[Model], **hints: Any) -> Optional[str]:
+        pin = current_pin.get()
+        if (pin is None or pin.pinned or pin.wrote
+                or model._meta.app_label not in settings.REPLICA_READ_APPS
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block
+                or catalog_recently_changed(pin)):
+            return DEFAULT_DB_ALIAS
+        aliases = get_replica_aliases()
+        return random.choice(aliases) if aliases else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model: type[Model], **hints: Any) -> Optional[str]:
+        pin = current_pin.get()
+        if pin is not None:
+            pin.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1: Model, obj2: Model, **hints: Any) -> Optional[bool]:
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db: str, app_label: str, model_name: Optional[str] = None,
+                      **hints: Any) -> Optional[bool]:
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaPinMiddleware:
+    """
+    Pin clients that wrote to the database to the primary for ``REPLICA_PIN_SECONDS``.
+
+    The pin is kept in a cookie, so it holds across workers without a lookup. The middleware must
+    come before ``SessionMiddleware``, so session writes made on the way out are seen.
+
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if self.async_mode:
+            return self.__acall__(request)
+        pin = ReplicaPin(settings.REPLICA_PIN_COOKIE in request.COOKIES)
+        token = current_pin.set(pin)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_pin.reset(token)
+        return self.pin(response, pin)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        pin = ReplicaPin(settings.REPLICA_PIN_COOKIE in request.COOKIES)
+        token = current_pin.set(pin)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_pin.reset(token)
+        return self.pin(response, pin)
+
+    def pin(self, response: HttpResponse, pin: ReplicaPin) -> HttpResponse:
+        """Set the pin cookie if the request wrote to the database."""
+        if pin.wrote:
+            response.set_cookie(settings.REPLICA_PIN_COOKIE, '1',
+                                max_age=settings.REPLICA_PIN_SECONDS, httponly=True,
+                                samesite='Lax')
+        return response
@@ -0,0 +1,40 @@
+"""
+Load-test settings for myshop project.
+
+Used by ``python manage.py loadtest --settings=myshop.settings_loadtest``. The command creates a
+throwaway ``test_<POSTGRES_DB>`` database on the configured PostgreSQL server, so runs never
+touch real data, and replaces Redis and WayForPay with in-process stand-ins. The catalog relies
+on PostgreSQL-only JSONB indexes, so SQLite is not supported.
+"""
+
+from .settings import *  # noqa: F401, F403
+from .settings import INSTALLED_APPS, MIDDLEWARE
+
+# Measure the request path as production runs it: no SQL logging, cached templates.
+DEBUG = False
+
+ALLOWED_HOSTS = ['testserver']
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app != 'livereload']
+INSTALLED_APPS += ['benchmarks.apps.BenchmarksConfig']
+
+MIDDLEWARE = [m for m in MIDDLEWARE if m != 'livereload.middleware.LiveReloadScript']
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Celery tasks run inside the request that queues them, so their cost shows up in the latency of
+# order_create and payment_completed.
+CELERY_TASK_ALWAYS_EAGER = True
+CELERY_TASK_EAGER_PROPAGATES = True
+
+# Every simulated shopper comes from the same address.
+RATE_LIMIT_ENABLED = False
+
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+
+# Shoppers are created for every run; a slow password hasher would dominate the seeding time.
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
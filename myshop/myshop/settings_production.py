@@ -0,0 +1,63 @@
+"""
+Production settings for myshop project.
+
+Selected with DJANGO_ENV=production in start_web.sh, which exports
+DJANGO_SETTINGS_MODULE=myshop.settings_production and serves the ASGI application with
+gunicorn and uvicorn workers instead of runserver.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.0/howto/deployment/checklist/
+"""
+
+from .settings import *  # noqa: F401, F403
+from .settings import DATABASES, INSTALLED_APPS, MIDDLEWARE, os
+
+SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+
+# DEBUG = False also stops Django from recording every SQL query in connection.queries and
+# enables the cached template loader.
+DEBUG = False
+
+ALLOWED_HOSTS = os.getenv('DJANGO_ALLOWED_HOSTS', 'mywebsite,localhost,127.0.0.1').split(',')
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app != 'livereload']
+
+# WhiteNoise serves the collected static files right after SecurityMiddleware, before sessions
+# or authentication are touched.
+MIDDLEWARE = [m for m in MIDDLEWARE if m != 'livereload.middleware.LiveReloadScript']
+MIDDLEWARE.insert(MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+                  'whitenoise.middleware.WhiteNoiseMiddleware')
+
+# collectstatic writes content-hashed file names plus .gz and .br copies of every file.
+# WhiteNoise serves the hashed names with a one-year "immutable" Cache-Control header.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Under ASGI the queries of each request run in a fresh thread, so persistent connections would
+# pile up instead of being reused. Web workers connect through PgBouncer (POSTGRES_HOST=pgbouncer)
+# and close their connections after each request; Celery keeps its own open.
+for database in DATABASES.values():
+    database['CONN_MAX_AGE'] = int(os.getenv('POSTGRES_CONN_MAX_AGE', '0'))
+
+# Uploaded product images are served by Django unless a reverse proxy takes over /media/.
+SERVE_MEDIA = os.getenv('DJANGO_SERVE_MEDIA', 'true').lower() == 'true'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': 'WARNING',
+    },
+}
@@ -6,6 +6,7 @@ from django.db.models import QuerySet
 from django.http import HttpResponse
 from django.urls import reverse
 from django.utils.safestring import mark_safe
+from myshop.routers import get_replica_alias
 
 from .models import Order, OrderItem
 
@@ -27,7 +28,7 @@ def order_detail(obj: Order) -> str:
 
 def export_to_csv(modeladmin: admin.ModelAdmin, request, queryset: QuerySet) -> HttpResponse:
     """
-    Export selected orders to a CSV file.
+    Export selected orders to a CSV file, reading them from a replica.
 
     Args:
         modeladmin (ModelAdmin): The current ModelAdmin instance.
@@ -47,7 +48,7 @@ def export_to_csv(modeladmin: admin.ModelAdmin, request, queryset: QuerySet) ->
               if not field.many_to_many and not field.one_to_many]
     writer.writerow([field.verbose_name for field in fields])
 
-    for obj in queryset:
+    for obj in queryset.using(get_replica_alias()):
         data_row = []
         for field in fields:
             value = getattr(obj, field.name)
@@ -77,7 +78,7 @@ order_pdf.short_descriptiption = 'Invoice'
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ['id', 'first_name', 'last_name', 'email', 'address', 'postal_code', 'city',
-                    'paid', 'created', 'updated', order_detail, order_pdf]
-    list_filter = ['paid', 'created', 'updated']
+                    'paid', 'needs_review', 'created', 'updated', order_detail, order_pdf]
+    list_filter = ['paid', 'needs_review', 'created', 'updated']
     inlines = [OrderItemInline]
     actions = [export_to_csv]
@@ -0,0 +1,156 @@
+import time
+from functools import wraps
+from typing import Callable, Optional, Tuple
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.shortcuts import render
+from django.utils.cache import add_never_cache_headers
+from shop.recommender import get_redis
+
+# The number of concurrent checkouts is switched at runtime through CAPACITY_KEY; the queue is
+# off while the key is missing. Admitted sessions hold a slot in ACTIVE_KEY until they are sent
+# to the payment gateway or their lease runs out, the others wait in WAITING_KEY by ticket.
+CAPACITY_KEY = 'checkout:queue:capacity'
+ACTIVE_KEY = 'checkout:queue:active'
+WAITING_KEY = 'checkout:queue:waiting'
+SEEN_KEY = 'checkout:queue:seen'
+TICKETS_KEY = 'checkout:queue:tickets'
+# Seconds a process may keep using the capacity it read, so a switch takes effect within that.
+CAPACITY_CACHE_TTL = 5
+
+_capacity: Tuple[float, int] = (0.0, 0)
+
+r = get_redis()
+
+# KEYS: ACTIVE_KEY, WAITING_KEY, SEEN_KEY and TICKETS_KEY. ARGV: the session key, the time, the
+# capacity, the lease, the time before which waiting sessions are given up, and 1 to join the
+# queue or 0 to only check the place. Returns 0 if the session may check out, its place in the
+# queue, or -1 if it is not queued.
+ADMIT_SCRIPT = r.register_script('''
+local now = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+    return 0
+end
+local stale = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', ARGV[5], 'LIMIT', 0, 100)
+if #stale > 0 then
+    redis.call('ZREM', KEYS[2], unpack(stale))
+    redis.call('ZREM', KEYS[3], unpack(stale))
+end
+if not redis.call('ZSCORE', KEYS[2], ARGV[1]) then
+    if ARGV[6] == '0' then
+        return -1
+    end
+    redis.call('ZADD', KEYS[2], redis.call('INCR', KEYS[4]), ARGV[1])
+end
+local place = redis.call('ZRANK', KEYS[2], ARGV[1])
+if place < tonumber(ARGV[3]) - redis.call('ZCARD', KEYS[1]) then
+    redis.call('ZREM', KEYS[2], ARGV[1])
+    redis.call('ZREM', KEYS[3], ARGV[1])
+    redis.call('ZADD', KEYS[1], now + tonumber(ARGV[4]), ARGV[1])
+    return 0
+end
+redis.call('ZADD', KEYS[3], now, ARGV[1])
+return place + 1
+''')
+
+
+def get_capacity() -> int:
+    """
+    Return the number of concurrent checkouts allowed, or 0 while the queue is off.
+
+    The value is cached in the process for `CAPACITY_CACHE_TTL` seconds, so checkouts outside a
+    sale cost no Redis round trip.
+
+    Returns:
+        int: The capacity of the checkout.
+
+    """
+    global _capacity
+    expires, capacity = _capacity
+    if time.monotonic() < expires:
+        return capacity
+    capacity = int(r.get(CAPACITY_KEY) or 0)
+    _capacity = (time.monotonic() + CAPACITY_CACHE_TTL, capacity)
+    return capacity
+
+
+def set_capacity(capacity: int) -> None:
+    """
+    Switch the checkout queue on with the given capacity, or off with 0.
+
+    Args:
+        capacity (int): The number of sessions allowed to check out at the same time.
+
+    """
+    if capacity:
+        r.set(CAPACITY_KEY, capacity)
+    else:
+        r.delete(CAPACITY_KEY)
+
+
+def admit(session_key: str, capacity: int, join: bool = True) -> Optional[int]:
+    """
+    Let a session check out if a slot is free and nobody queued before it.
+
+    Sessions are served strictly by ticket. A session that stops polling for
+    ``CHECKOUT_QUEUE_TIMEOUT`` seconds loses its place.
+
+    Args:
+        session_key (str): The session key of the visitor.
+        capacity (int): The number of concurrent checkouts allowed.
+        join (bool, optional): Whether to queue the session if it is not queued yet.
+
+    Returns:
+        Optional[int]: 0 if the session may check out, its place in the queue otherwise, or None
+            if it is not queued and `join` is False.
+
+    """
+    now = time.time()
+    place = ADMIT_SCRIPT(keys=[ACTIVE_KEY, WAITING_KEY, SEEN_KEY, TICKETS_KEY],
+                         args=[session_key, now, capacity, settings.CHECKOUT_QUEUE_LEASE,
+                               now - settings.CHECKOUT_QUEUE_TIMEOUT, int(join)],
+                         client=r)
+    return None if place == -1 else place
+
+
+def leave(session_key: str) -> None:
+    """Free the checkout slot of a session, e.g. once it was sent to the payment gateway."""
+    if get_capacity():
+        r.zrem(ACTIVE_KEY, session_key)
+
+
+def admission_control(view: Callable) -> Callable:
+    """
+    Decorator queueing checkouts while the checkout queue is on.
+
+    Only POST requests are queued, so opening the checkout form takes no slot. Sessions
+    submitting without a free slot get a lightweight page with their place in line, which polls
+    `queue_status` and opens the form again once the session was given a slot.
+
+    Args:
+        view (Callable): The checkout view to protect.
+
+    Returns:
+        Callable: The wrapped view.
+
+    """
+    @wraps(view)
+    def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        if request.method != 'POST':
+            return view(request, *args, **kwargs)
+        capacity = get_capacity()
+        if not capacity:
+            return view(request, *args, **kwargs)
+        if request.session.session_key is None:
+            request.session.save()
+        place = admit(request.session.session_key, capacity)
+        if not place:
+            return view(request, *args, **kwargs)
+        response = render(request, 'orders/order/queue.html',
+                          {'place': place, 'next': request.path,
+                           'poll_interval': settings.CHECKOUT_QUEUE_POLL_INTERVAL})
+        add_never_cache_headers(response)
+        return response
+    return wrapper
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from orders import admission
+
+
+class Command(BaseCommand):
+    help = ('Switch the flash-sale checkout queue on or off, or show its state. Running processes '
+            'pick up the change within a few seconds.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['on', 'off', 'status'])
+        parser.add_argument('--capacity', type=int, default=50,
+                            help='Number of sessions allowed to check out at the same time.')
+
+    def handle(self, *args, **options):
+        if options['action'] == 'on':
+            if options['capacity'] < 1:
+                raise CommandError('The capacity must be at least 1.')
+            admission.set_capacity(options['capacity'])
+        elif options['action'] == 'off':
+            admission.set_capacity(0)
+
+        capacity = int(admission.r.get(admission.CAPACITY_KEY) or 0)
+        if not capacity:
+            self.stdout.write('The checkout queue is off.')
+            return
+        with admission.r.pipeline(transaction=False) as pipe:
+            pipe.zcard(admission.ACTIVE_KEY)
+            pipe.zcard(admission.WAITING_KEY)
+            active, waiting = pipe.execute()
+        self.stdout.write(self.style.SUCCESS(
+            f'The checkout queue is on: {active} of {capacity} slots taken, {waiting} waiting.'))
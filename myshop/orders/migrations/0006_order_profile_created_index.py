@@ -0,0 +1,19 @@
+# Generated by Django 5.0.14 on 2026-10-19 15:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coupons', '0001_initial'),
+        ('orders', '0005_order_profile'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['profile', '-created'], name='orders_orde_profile_18d9ed_idx'),
+        ),
+    ]
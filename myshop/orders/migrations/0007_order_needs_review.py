@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-19 16:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_order_profile_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='needs_review',
+            field=models.BooleanField(default=False, verbose_name='Потребує перевірки'),
+        ),
+    ]
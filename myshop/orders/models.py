@@ -21,6 +21,8 @@ class Order(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
     paid = models.BooleanField(default=False)
+    # Set when a payment arrived after the reserved units were released and sold again.
+    needs_review = models.BooleanField('Потребує перевірки', default=False)
     order_reference = models.CharField(null=True, blank=True)
     coupon = models.ForeignKey(Coupon, related_name='orders', null=True, blank=True,
                                on_delete=models.SET_NULL)
@@ -30,7 +32,8 @@ class Order(models.Model):
     class Meta:
         ordering = ['-created']
         indexes = [
-            models.Index(fields=['-created'])
+            models.Index(fields=['-created']),
+            models.Index(fields=['profile', '-created']),
         ]
         verbose_name = 'Замовлення'
         verbose_name_plural = 'Замовлення'
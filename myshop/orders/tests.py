@@ -1,3 +1,66 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.urls import reverse
 
-# Create your tests here.
+from benchmarks.stubs import StandInTestCase
+
+from . import admission
+
+
+@override_settings(CHECKOUT_QUEUE_LEASE=600, CHECKOUT_QUEUE_TIMEOUT=30)
+class AdmissionTests(StandInTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        admission.set_capacity(2)
+        admission._capacity = (0.0, 0)
+
+    def test_sessions_are_admitted_by_ticket(self) -> None:
+        self.assertEqual([admission.admit(session, 2) for session in 'abcd'], [0, 0, 1, 2])
+        # Polling keeps the place without joining again.
+        self.assertEqual(admission.admit('d', 2, join=False), 2)
+        self.assertIsNone(admission.admit('e', 2, join=False))
+
+    def test_freed_slot_goes_to_the_first_in_line(self) -> None:
+        for session in 'abcd':
+            admission.admit(session, 2)
+        admission.leave('a')
+        self.assertEqual(admission.admit('d', 2, join=False), 2)
+        self.assertEqual(admission.admit('c', 2, join=False), 0)
+        self.assertEqual(admission.admit('d', 2, join=False), 1)
+
+    def test_admitted_session_keeps_its_slot(self) -> None:
+        admission.admit('a', 2)
+        self.assertEqual(admission.admit('a', 2), 0)
+        self.assertEqual(self.redis.zcard(admission.ACTIVE_KEY), 1)
+
+    def test_waiting_sessions_that_stop_polling_lose_their_place(self) -> None:
+        for session in 'abcd':
+            admission.admit(session, 2)
+        self.redis.zadd(admission.SEEN_KEY, {'c': 0})
+        self.assertEqual(admission.admit('d', 2, join=False), 1)
+        self.assertIsNone(admission.admit('c', 2, join=False))
+
+    def test_checkout_form_takes_no_slot(self) -> None:
+        for session in 'ab':
+            admission.admit(session, 2)
+        self.client.force_login(User.objects.create_user('customer'))
+        response = self.client.get(reverse('orders:order_create'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'queue-place')
+        self.assertEqual(self.redis.zcard(admission.ACTIVE_KEY), 2)
+
+    def test_submission_waits_for_a_slot(self) -> None:
+        for session in 'ab':
+            admission.admit(session, 2)
+        self.client.force_login(User.objects.create_user('customer'))
+        response = self.client.post(reverse('orders:order_create'))
+        self.assertContains(response, 'queue-place')
+        self.assertEqual(self.client.get(reverse('orders:queue_status')).json(), {'place': 1})
+
+    def test_queue_is_skipped_while_off(self) -> None:
+        admission.set_capacity(0)
+        admission._capacity = (0.0, 0)
+        self.client.force_login(User.objects.create_user('customer'))
+        response = self.client.post(reverse('orders:order_create'))
+        self.assertNotContains(response, 'queue-place')
+        self.assertEqual(self.redis.zcard(admission.WAITING_KEY), 0)
@@ -1,24 +1,34 @@
 from cart.cart import Cart
+from coupons import redemptions
 from django.conf import settings
 from django.contrib.admin.views.decorators import staff_member_required
 from django.db import transaction
-from django.http import HttpRequest, HttpResponse
+from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.template.loader import render_to_string
 from django.urls import reverse
+from django.utils.cache import add_never_cache_headers
 import weasyprint
 
+from .admission import admission_control, admit, get_capacity
 from .forms import OrderCreateForm
 from .models import Order, OrderItem
 from .tasks import order_created
 
+from shop import inventory
 from users.models import Profile
 
 
+@admission_control
 def order_create(request: HttpRequest) -> HttpResponse:
     """
     This view handles the creation of an order from the items in the cart.
 
+    While the checkout queue is on, submitting the form waits for a free slot first. The ordered
+    units and the coupon redemption are counted atomically in Redis. If a product ran out of
+    stock or the coupon was used up, the order is rolled back and the form is shown again with
+    an error.
+
     Args:
         request (HttpRequest): The HTTP request object.
 
@@ -31,28 +41,76 @@ def order_create(request: HttpRequest) -> HttpResponse:
         form = OrderCreateForm(request.POST)
         if form.is_valid():
             profile = Profile.objects.get(user=request.user)
-            with transaction.atomic():
-                order = form.save(commit=False)
-                order.profile = profile
-                order.save()
-                if cart.coupon:
-                    order.coupon = cart.coupon
-                    order.discount = cart.coupon.discount
-                order.save()
-                for item in cart:
-                    OrderItem.objects.create(order=order,
-                                             product=item['product'],
-                                             price=item['price'],
-                                             quantity=item['quantity'])
-                cart.clear()
-                order_created.delay(order.id)
-            request.session['order_id'] = order.id
-            return redirect(reverse('payment:process'))
+            reserved = redeemed = False
+            try:
+                with transaction.atomic():
+                    order = form.save(commit=False)
+                    order.profile = profile
+                    order.save()
+                    if cart.coupon:
+                        order.coupon = cart.coupon
+                        order.discount = cart.coupon.discount
+                    order.save()
+                    products = {}
+                    for item in cart:
+                        products[item['product'].id] = item['product']
+                        OrderItem.objects.create(order=order,
+                                                 product=item['product'],
+                                                 price=item['price'],
+                                                 quantity=item['quantity'])
+                    inventory.reserve(order.id, {int(id): item['quantity']
+                                                 for id, item in cart.cart.items()})
+                    reserved = True
+                    if order.coupon:
+                        redemptions.redeem(order.coupon, profile.id, order.id)
+                        redeemed = True
+                    cart.clear()
+                    order_created.delay(order.id)
+            except Exception as e:
+                # The order was rolled back, so give back what Redis counted for it.
+                if reserved:
+                    inventory.release(order.id)
+                if redeemed:
+                    redemptions.release(order.coupon, profile.id, order.id)
+                if isinstance(e, inventory.OutOfStock):
+                    form.add_error(None, f'На жаль, товару «{products[e.product_id].name}» '
+                                         f'немає в потрібній кількості.')
+                elif isinstance(e, redemptions.RedemptionLimitReached):
+                    request.session['coupon_id'] = cart.coupon_id = None
+                    form.add_error(None, f'На жаль, купон «{e.coupon.code}» більше не діє. '
+                                         f'Замовлення можна оформити без знижки.')
+                else:
+                    raise
+            else:
+                request.session['order_id'] = order.id
+                return redirect(reverse('payment:process'))
     else:
         form = OrderCreateForm()
     return render(request, 'orders/order/create.html', {'cart': cart, 'form': form})
 
 
+def queue_status(request: HttpRequest) -> JsonResponse:
+    """
+    Report the place of the session in the checkout queue to the polling waiting page.
+
+    The session is identified by its cookie without being loaded, so polling costs one Redis
+    round trip and no queries. A place of 0 or null sends the page back to the checkout.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        JsonResponse: The place of the session in the queue.
+
+    """
+    capacity = get_capacity()
+    session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    place = admit(session_key, capacity, join=False) if capacity and session_key else None
+    response = JsonResponse({'place': place})
+    add_never_cache_headers(response)
+    return response
+
+
 @staff_member_required
 def admin_order_detail(request: HttpRequest, order_id: int) -> HttpResponse:
     """
@@ -1,26 +1,36 @@
+import logging
 import os
 import time
 from decimal import Decimal
 
+from analytics.tasks import record_order_sales
 from django.conf import settings
 from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render, reverse
 from django.views.decorators.csrf import csrf_exempt
+from orders.admission import admission_control, leave
 from orders.models import Order
+from shop import inventory
+from shop.ratelimit import rate_limit
 
 from .tasks import send_invoice_email
 from .wayforpay import WayForPay
 
+logger = logging.getLogger(__name__)
+
 wayforpay = WayForPay(key=os.getenv('SECRET_WAYFORPAY_KEY'),
                       domain_name=os.getenv('DOMAIN_NAME'))
 
 
+@rate_limit('payment_process', key=['ip', 'user'])
+@admission_control
 def payment_process(request: HttpRequest) -> HttpResponse:
     """
     Handle the payment process for an order.
 
     This view retrieves the order from the session, creates an invoice using the WayForPay payment
-    gateway, and redirects the user to the payment URL.
+    gateway, and redirects the user to the payment URL. The checkout slot of the session is freed
+    once it leaves for the gateway.
 
     Args:
         request (HttpRequest): The HTTP request object.
@@ -47,6 +57,7 @@ def payment_process(request: HttpRequest) -> HttpResponse:
 
         order.order_reference = order_reference
         order.save()
+        leave(request.session.session_key)
 
         if invoice_result and invoice_result.invoiceUrl:
             return redirect(invoice_result.invoiceUrl)
@@ -89,7 +100,12 @@ def payment_completed(request: HttpRequest) -> HttpResponse:
             order = Order.objects.get(order_reference=order_reference)
             if transaction_status == 'Approved':
                 order.paid = True
+                if not inventory.confirm(order.id):
+                    # The reservation expired and its units were sold again before the payment.
+                    order.needs_review = True
+                    logger.warning('Order %s was paid after its stock was sold out.', order.id)
                 order.save()
+                record_order_sales.delay(order.id)
                 send_invoice_email.delay(order.id)
             else:
                 order.paid = False
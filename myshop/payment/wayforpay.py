@@ -1,14 +1,19 @@
 import hashlib
 import hmac
 import json
+import logging
 import time
 from random import randint
 from typing import Any, Dict, List, Optional
 
 import requests
 
+from monitoring.instrumentation import record_outbound_request
+
 API_URL = 'https://api.wayforpay.com/api'
 
+logger = logging.getLogger(__name__)
+
 
 class InvoiceCreateResult:
     def __init__(self, invoice_url, reason, reason_code, qr_code, orderReference):
@@ -112,6 +117,27 @@ class WayForPay:
 
         return hash_result
 
+    def _post(self, params: Dict[str, Any]) -> requests.Response:
+        """
+        Sends a request to the WayForPay API and records its latency.
+
+        Args:
+            params (Dict[str, Any]): The request body; its transactionType names the operation.
+
+        Returns:
+            requests.Response: The response of the API.
+
+        """
+        outcome = 'error'
+        start = time.perf_counter()
+        try:
+            result = requests.post(url=API_URL, json=params)
+            outcome = str(result.status_code)
+            return result
+        finally:
+            record_outbound_request('wayforpay', params['transactionType'], outcome,
+                                    time.perf_counter() - start)
+
     def create_invoice(self, merchantAccount: str, merchantAuthType: str, amount: str,
                        currency: str, *args: Any, **kwargs: Any) -> Optional['InvoiceCreateResult']:
         """
@@ -159,7 +185,7 @@ class WayForPay:
         }
 
         try:
-            result = requests.post(url=API_URL, json=params)
+            result = self._post(params)
             response_dict = json.loads(result.text)
 
             invoice_url = response_dict["invoiceUrl"]
@@ -169,9 +195,8 @@ class WayForPay:
 
             return InvoiceCreateResult(invoice_url, reason, reason_code, qr_code, orderReference)
 
-        # TODO: Create logger
-        except Exception as e:
-            print(f'Error: {e}')
+        except Exception:
+            logger.exception('WayForPay invoice %s could not be created', orderReference)
             return False
 
     def check_invoice(self, merchantAccount: str,
@@ -200,7 +225,7 @@ class WayForPay:
         }
 
         try:
-            result = requests.post(url=API_URL, json=params)
+            result = self._post(params)
 
             if result.status_code == 200:
                 response_dict = json.loads(result.text)
@@ -225,8 +250,8 @@ class WayForPay:
 
                 return InvoiceStatusResult(response_dict, reason, reasonCode, orderReference, amount, currency, authCode, createdDate, processingDate, cardPan, cardType, issuerBankCountry, issuerBankName, transactionStatus, refundAmount, settlementDate, settlementAmount, fee, merchantSignature)
 
-        except Exception as e:
-            print(f'Error: {e}')
+        except Exception:
+            logger.exception('WayForPay invoice %s status could not be checked', orderReference)
             return None
 
     def delete_invoice(self, merchantAccount: str, orderReference: str) -> bool:
@@ -252,13 +277,13 @@ class WayForPay:
                 "merchantSignature": self.hash_md5(string),
                 "apiVersion": apiVersion
             }
-            result = requests.post(url=API_URL, json=params)
+            result = self._post(params)
 
             if result.status_code == 200:
                 return True
 
-        except Exception as e:
-            print(f'Error: {e}')
+        except Exception:
+            logger.exception('WayForPay invoice %s could not be deleted', orderReference)
             return None
 
     def generate_signature(self, data: List[str]) -> str:
@@ -1,17 +1,122 @@
-from django.contrib import admin
+from typing import Optional
 
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.db import DataError
+from django.db.models import QuerySet
+from django.http import HttpRequest, HttpResponse
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+
+from .forms import PriceChangeForm, PriceListUploadForm, ProductAdminForm
 from .models import Category, Product
+from .pricing import apply_price_list, change_prices, read_price_list
+
+
+def change_prices_action(modeladmin: admin.ModelAdmin, request: HttpRequest,
+                         queryset: QuerySet) -> Optional[HttpResponse]:
+    """
+    Change the prices of the selected products, or of all products in the selected categories,
+    by a percentage in one UPDATE statement.
+
+    The first request shows a form for the percentage; submitting it applies the change.
+
+    Args:
+        modeladmin (ModelAdmin): The current ModelAdmin instance.
+        request (HttpRequest): The current HttpRequest instance.
+        queryset (QuerySet): The selected products or categories.
+
+    Returns:
+        Optional[HttpResponse]: The form page, or None to return to the change list.
+
+    """
+    form = PriceChangeForm(request.POST if 'apply' in request.POST else None)
+    if form.is_valid():
+        products = queryset
+        if queryset.model is Category:
+            products = Product.objects.filter(category__in=queryset)
+        try:
+            count = change_prices(products, form.cleaned_data['percent'])
+        except DataError:
+            modeladmin.message_user(request, 'Нова ціна завелика для деяких товарів.',
+                                    messages.ERROR)
+            return None
+        modeladmin.message_user(request, f'Ціни змінено для {count} товарів.', messages.SUCCESS)
+        return None
+    return TemplateResponse(request, 'admin/shop/change_prices.html', {
+        **modeladmin.admin_site.each_context(request),
+        'title': 'Зміна цін',
+        'opts': modeladmin.model._meta,
+        'form': form,
+        'queryset': queryset,
+        'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+    })
+
+
+change_prices_action.short_description = 'Змінити ціни на відсоток'
 
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ['name', 'slug']
     prepopulated_fields = {'slug': ('name',)}
+    actions = [change_prices_action]
 
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ['name', 'slug', 'price', 'available', 'created', 'updated']
-    list_filter = ['available', 'created', 'updated']
-    list_editable = ['price', 'available']
+    form = ProductAdminForm
+    list_display = ['name', 'slug', 'price', 'stock', 'available', 'created', 'updated']
+    list_filter = ['available', 'category', 'created', 'updated']
+    list_editable = ['price', 'stock', 'available']
     prepopulated_fields = {'slug': ('name',)}
+    actions = [change_prices_action]
+    change_list_template = 'admin/shop/product/change_list.html'
+
+    def get_urls(self):
+        urls = [path('upload-prices/', self.admin_site.admin_view(self.upload_prices),
+                     name='shop_product_upload_prices')]
+        return urls + super().get_urls()
+
+    def upload_prices(self, request: HttpRequest) -> HttpResponse:
+        """
+        Apply an uploaded CSV price list with set-based UPDATE statements.
+
+        Args:
+            request (HttpRequest): The current HttpRequest instance.
+
+        Returns:
+            HttpResponse: The upload form, or a redirect to the change list once applied.
+
+        """
+        if not self.has_change_permission(request):
+            return redirect('admin:shop_product_changelist')
+        form = PriceListUploadForm(request.POST or None, request.FILES or None)
+        if form.is_valid():
+            prices, errors = read_price_list(form.cleaned_data['file'])
+            if not prices:
+                for error in errors[:20] or ['У прайс-листі немає жодного рядка.']:
+                    self.message_user(request, error, messages.ERROR)
+                return redirect('admin:shop_product_upload_prices')
+            for error in errors[:20]:
+                self.message_user(request, error, messages.WARNING)
+            try:
+                changed, unknown = apply_price_list(prices)
+            except DataError:
+                self.message_user(request, 'Ціна завелика для деяких товарів, прайс-лист не '
+                                           'застосовано.', messages.ERROR)
+                return redirect('admin:shop_product_changelist')
+            if unknown:
+                self.message_user(request, f'Не знайдено товарів: {", ".join(unknown[:20])}'
+                                           f'{"…" if len(unknown) > 20 else ""}',
+                                  messages.WARNING)
+            self.message_user(request, f'Прайс-лист застосовано: змінено {changed} товарів.',
+                              messages.SUCCESS)
+            return redirect('admin:shop_product_changelist')
+        return TemplateResponse(request, 'admin/shop/upload_prices.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Завантаження прайс-листа',
+            'opts': self.model._meta,
+            'form': form,
+        })
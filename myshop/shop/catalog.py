@@ -0,0 +1,135 @@
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, Q, QuerySet
+from django.http import Http404
+
+from .forms import AVAILABILITY_ALL, AVAILABILITY_IN_STOCK, AVAILABILITY_OUT_OF_STOCK
+from .models import Category, Product
+
+CATEGORY_NAV_CACHE_KEY = 'shop:category_nav'
+CATEGORY_NAV_TIMEOUT = 60 * 60 * 24
+CATALOG_VERSION_CACHE_KEY = 'shop:catalog_version'
+
+
+def get_facet_counts(products: QuerySet) -> Dict[Optional[int], Dict[str, int]]:
+    """
+    Count products per category and availability in a single grouped query.
+
+    Args:
+        products (QuerySet): Product queryset with every filter applied except the category and
+            availability facets.
+
+    Returns:
+        Dict[Optional[int], Dict[str, int]]: Counts of in-stock and out-of-stock products keyed
+            by category ID. The ``None`` key holds the totals across all categories.
+
+    """
+    counts = {None: {AVAILABILITY_IN_STOCK: 0, AVAILABILITY_OUT_OF_STOCK: 0}}
+    rows = products.order_by().values('category_id').annotate(
+        in_stock=Count('id', filter=Q(available=True)),
+        out_of_stock=Count('id', filter=Q(available=False)))
+    for row in rows:
+        counts[row['category_id']] = {AVAILABILITY_IN_STOCK: row['in_stock'],
+                                      AVAILABILITY_OUT_OF_STOCK: row['out_of_stock']}
+        counts[None][AVAILABILITY_IN_STOCK] += row['in_stock']
+        counts[None][AVAILABILITY_OUT_OF_STOCK] += row['out_of_stock']
+    for facet in counts.values():
+        facet[AVAILABILITY_ALL] = facet[AVAILABILITY_IN_STOCK] + facet[AVAILABILITY_OUT_OF_STOCK]
+    return counts
+
+
+def get_category_nav() -> Dict[str, Any]:
+    """
+    Return the category navigation, building and caching it on a miss.
+
+    The cached entry holds the ordered category list, a slug to category mapping and the
+    unfiltered facet counts, so drawing the sidebar and resolving a category page cost a single
+    cache read. It is rebuilt only after `invalidate_category_nav` is called, from the primary:
+    the entry is shared by every client for a day, and a lagging replica could still hold the
+    rows from before the change that invalidated it.
+
+    Returns:
+        Dict[str, Any]: A dictionary with ``categories``, ``by_slug`` and ``facets`` keys.
+
+    """
+    nav = cache.get(CATEGORY_NAV_CACHE_KEY)
+    if nav is None:
+        categories = list(Category.objects.using(DEFAULT_DB_ALIAS))
+        nav = {'categories': categories,
+               'by_slug': {c.slug: c for c in categories},
+               'facets': get_facet_counts(Product.objects.using(DEFAULT_DB_ALIAS))}
+        cache.set(CATEGORY_NAV_CACHE_KEY, nav, CATEGORY_NAV_TIMEOUT)
+    return nav
+
+
+async def aget_category_nav() -> Dict[str, Any]:
+    """Asynchronous counterpart of `get_category_nav` for async views."""
+    nav = await cache.aget(CATEGORY_NAV_CACHE_KEY)
+    if nav is None:
+        nav = await sync_to_async(get_category_nav)()
+    return nav
+
+
+def get_category_or_404(nav: Dict[str, Any], slug: str) -> Category:
+    """
+    Resolve a category slug through the cached navigation.
+
+    Args:
+        nav (Dict[str, Any]): The navigation returned by `get_category_nav`.
+        slug (str): The slug of the category.
+
+    Returns:
+        Category: The matching category.
+
+    Raises:
+        Http404: If no category has the given slug.
+
+    """
+    try:
+        return nav['by_slug'][slug]
+    except KeyError:
+        raise Http404('No Category matches the given query.')
+
+
+def invalidate_category_nav() -> None:
+    """Drop the cached category navigation, once the current transaction commits."""
+    transaction.on_commit(lambda: cache.delete(CATEGORY_NAV_CACHE_KEY))
+
+
+def get_catalog_version() -> float:
+    """
+    Return the timestamp of the last catalog change.
+
+    The version is kept in the cache without expiry. When it is missing, the current time is
+    stored, which only makes clients revalidate their copies once.
+
+    Returns:
+        float: The UNIX timestamp of the last change to a product or category.
+
+    """
+    version = cache.get(CATALOG_VERSION_CACHE_KEY)
+    if version is None:
+        version = time.time()
+        cache.add(CATALOG_VERSION_CACHE_KEY, version, None)
+    return version
+
+
+def get_catalog_last_modified() -> datetime:
+    """Return the catalog version as an aware datetime for the Last-Modified header."""
+    return datetime.fromtimestamp(get_catalog_version(), tz=timezone.utc)
+
+
+def bump_catalog_version() -> None:
+    """
+    Mark the catalog as changed, so every page validator computed from it changes.
+
+    The version is only moved once the current transaction commits, so no page can be tagged
+    with it while the change is still invisible to other connections.
+
+    """
+    transaction.on_commit(lambda: cache.set(CATALOG_VERSION_CACHE_KEY, time.time(), None))
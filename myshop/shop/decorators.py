@@ -0,0 +1,52 @@
+import datetime
+from functools import wraps
+from typing import Any, Callable, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.http import HttpRequest, HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def async_condition(etag_func: Callable, last_modified_func: Callable) -> Callable:
+    """
+    Async counterpart of ``django.views.decorators.http.condition``.
+
+    Django's decorator calls the validator functions inside the event loop, where they cannot load
+    the session or the user from the database. This one runs them in a worker thread, which also
+    leaves ``request.user`` and ``request.session`` loaded for the view and its templates.
+
+    Args:
+        etag_func (Callable): Computes the ETag from the view arguments.
+        last_modified_func (Callable): Computes the Last-Modified datetime from the view arguments.
+
+    Returns:
+        Callable: A decorator for async views.
+
+    """
+    def validators(request: HttpRequest, *args: Any,
+                   **kwargs: Any) -> Tuple[Optional[str], Optional[int]]:
+        last_modified = last_modified_func(request, *args, **kwargs)
+        if last_modified is not None:
+            if not timezone.is_aware(last_modified):
+                last_modified = timezone.make_aware(last_modified, datetime.timezone.utc)
+            last_modified = int(last_modified.timestamp())
+        etag = etag_func(request, *args, **kwargs)
+        return (quote_etag(etag) if etag is not None else None), last_modified
+
+    def decorator(view: Callable) -> Callable:
+        @wraps(view)
+        async def inner(request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+            etag, last_modified = await sync_to_async(validators)(request, *args, **kwargs)
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                if last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(last_modified)
+                if etag:
+                    response.headers.setdefault('ETag', etag)
+            return response
+        return inner
+    return decorator
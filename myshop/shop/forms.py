@@ -0,0 +1,106 @@
+from typing import Any, Dict
+
+from django import forms
+
+from .models import CHEMISTRY_CHOICES, Product
+
+AVAILABILITY_IN_STOCK = 'in_stock'
+AVAILABILITY_OUT_OF_STOCK = 'out_of_stock'
+AVAILABILITY_ALL = 'all'
+
+AVAILABILITY_CHOICES = [
+    (AVAILABILITY_IN_STOCK, 'В наявності'),
+    (AVAILABILITY_OUT_OF_STOCK, 'Немає в наявності'),
+    (AVAILABILITY_ALL, 'Всі товари'),
+]
+
+SORT_ORDERING = {
+    'name': ('name', 'id'),
+    'price': ('price', 'id'),
+    '-price': ('-price', '-id'),
+    'newest': ('-created', '-id'),
+}
+
+SORT_CHOICES = [
+    ('name', 'За назвою'),
+    ('price', 'Спочатку дешевші'),
+    ('-price', 'Спочатку дорожчі'),
+    ('newest', 'Спочатку новинки'),
+]
+
+
+class ProductFilterForm(forms.Form):
+    """Form for filtering and sorting the product catalog through GET parameters."""
+    min_price = forms.DecimalField(required=False, min_value=0, decimal_places=2,
+                                   label='Ціна від')
+    max_price = forms.DecimalField(required=False, min_value=0, decimal_places=2,
+                                   label='Ціна до')
+    availability = forms.ChoiceField(choices=AVAILABILITY_CHOICES, required=False,
+                                     label='Наявність')
+    sort = forms.ChoiceField(choices=SORT_CHOICES, required=False, label='Сортування')
+    min_capacity = forms.IntegerField(required=False, min_value=0, label='Ємність від, Вт·год')
+    max_capacity = forms.IntegerField(required=False, min_value=0, label='Ємність до, Вт·год')
+    voltage = forms.DecimalField(required=False, min_value=0, decimal_places=1,
+                                 label='Напруга, В')
+    chemistry = forms.ChoiceField(choices=[('', 'Будь-який')] + CHEMISTRY_CHOICES,
+                                  required=False, label='Тип акумулятора')
+
+    def clean_availability(self) -> str:
+        return self.cleaned_data['availability'] or AVAILABILITY_IN_STOCK
+
+    def clean_sort(self) -> str:
+        return self.cleaned_data['sort'] or 'name'
+
+
+class ProductAdminForm(forms.ModelForm):
+    """Admin form that edits the typed technical specifications stored in Product.attributes."""
+    capacity = forms.IntegerField(required=False, min_value=0, label='Ємність, Вт·год')
+    voltage = forms.DecimalField(required=False, min_value=0, decimal_places=1,
+                                 label='Напруга, В')
+    chemistry = forms.ChoiceField(choices=[('', '---------')] + CHEMISTRY_CHOICES,
+                                  required=False, label='Тип акумулятора')
+
+    attribute_fields = ['capacity', 'voltage', 'chemistry']
+
+    class Meta:
+        model = Product
+        exclude = ['attributes']
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        for name in self.attribute_fields:
+            self.fields[name].initial = self.instance.attributes.get(name)
+
+    def get_attributes(self) -> Dict[str, Any]:
+        """
+        Merge the cleaned specification fields into the product's existing attributes.
+
+        Returns:
+            Dict[str, Any]: JSON-serializable attributes with empty specifications removed.
+
+        """
+        attributes = dict(self.instance.attributes)
+        for name in self.attribute_fields:
+            value = self.cleaned_data.get(name)
+            if value in (None, ''):
+                attributes.pop(name, None)
+            else:
+                attributes[name] = float(value) if name == 'voltage' else value
+        return attributes
+
+    def save(self, commit: bool = True) -> Product:
+        self.instance.attributes = self.get_attributes()
+        return super().save(commit)
+
+
+class PriceChangeForm(forms.Form):
+    """Admin form for changing the prices of the selected products or categories at once."""
+    percent = forms.DecimalField(min_value=-99, max_value=1000, decimal_places=2,
+                                 label='Зміна ціни, %',
+                                 help_text='Наприклад, 10 підвищує ціни на 10%, -15 знижує на 15%.')
+
+
+class PriceListUploadForm(forms.Form):
+    """Admin form for uploading a CSV price list with the columns slug, price and available."""
+    file = forms.FileField(label='CSV-файл',
+                           help_text='Стовпці: slug, price і, за бажанням, available.')
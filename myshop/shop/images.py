@@ -0,0 +1,30 @@
+from io import BytesIO
+from typing import IO
+
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from PIL import Image
+
+PRODUCT_IMAGE_SIZE = (480, 334)
+
+
+def resize_product_image(source: IO, name: str) -> InMemoryUploadedFile:
+    """
+    Resize a product photo to the catalog size and encode it as JPEG.
+
+    Args:
+        source (IO): The uploaded or downloaded image.
+        name (str): The original file name; the extension is replaced with ``.jpg``.
+
+    Returns:
+        InMemoryUploadedFile: The processed image, ready to be stored in ``Product.image``.
+
+    """
+    img = Image.open(source)
+    if img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+    img = img.resize(PRODUCT_IMAGE_SIZE, Image.Resampling.LANCZOS)
+    output = BytesIO()
+    img.save(output, format='JPEG', quality=100)
+    output.seek(0)
+    return InMemoryUploadedFile(output, 'ImageField', '%s.jpg' % name.split('.')[0],
+                                'image/jpeg', output.getbuffer().nbytes, None)
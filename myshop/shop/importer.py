@@ -0,0 +1,318 @@
+import csv
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from decimal import Decimal, InvalidOperation
+from io import BytesIO
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+
+from . import inventory
+from .catalog import bump_catalog_version, invalidate_category_nav
+from .images import resize_product_image
+from .models import Category, Product
+
+REQUIRED_FIELDS = ['slug', 'name', 'category', 'price']
+# Columns updated on existing products when the feed has them. Columns missing from the feed, and
+# empty cells or null values in a row, keep their current values.
+OPTIONAL_FIELDS = ['description', 'available', 'stock', 'video', 'attributes']
+# Downloaded photos larger than this are rejected.
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+
+ErrorCallback = Callable[[int, str, str], None]
+
+
+class ImportStats:
+    """Counters reported while a feed is being imported."""
+    def __init__(self) -> None:
+        self.rows = 0
+        self.upserted = 0
+        self.errors = 0
+        self.images_queued = 0
+        self.images_saved = 0
+
+
+def read_feed(stream: IO[str], format: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Stream the rows of a CSV or JSON Lines product feed.
+
+    Args:
+        stream (IO[str]): The open feed.
+        format (str): ``csv`` or ``jsonl``.
+
+    Yields:
+        Tuple[int, Dict[str, Any]]: The line number and the fields of each row. A JSON line that
+            is not an object is yielded as its error message.
+
+    """
+    if format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line, text in enumerate(stream, start=1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError as e:
+            row = f'Invalid JSON: {e}'
+        yield line, row if isinstance(row, (dict, str)) else 'Row is not a JSON object'
+
+
+def is_provided(value: Any) -> bool:
+    """Tell whether a feed cell holds a value, as opposed to being empty, blank or null."""
+    return value is not None and not (isinstance(value, str) and not value.strip())
+
+
+def parse_bool(value: Any) -> bool:
+    """Parse a feed flag such as ``true``, ``1``, ``yes`` or ``так``."""
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ('1', 'true', 'yes', 'y', 'так'):
+        return True
+    if text in ('0', 'false', 'no', 'n', 'ні'):
+        return False
+    raise ValueError(f'Invalid flag: {value!r}')
+
+
+def fetch_image(url: str, timeout: float) -> str:
+    """
+    Download a product photo, resize it and store it next to the uploaded ones.
+
+    Runs in the worker pool, so it must not touch the database.
+
+    Args:
+        url (str): The URL of the photo.
+        timeout (float): The seconds to wait for the supplier server.
+
+    Returns:
+        str: The name of the stored file, to be assigned to ``Product.image``.
+
+    """
+    with requests.get(url, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        data = BytesIO()
+        for chunk in response.iter_content(64 * 1024):
+            data.write(chunk)
+            if data.tell() > MAX_IMAGE_BYTES:
+                raise ValueError('Image is larger than 10 MB')
+    data.seek(0)
+    image = resize_product_image(data, os.path.basename(urlparse(url).path) or 'image')
+    field = Product._meta.get_field('image')
+    return field.storage.save(field.generate_filename(None, image.name), image)
+
+
+class ProductImporter:
+    """
+    Upsert products from a feed in batches, matching existing products by slug.
+
+    Each batch is written with one ``INSERT ... ON CONFLICT DO UPDATE`` statement per set of
+    columns, so a row only updates the fields it has values for and a JSON line may carry fewer
+    or more keys than the others. If a statement fails, its rows are retried one by one, so a bad
+    row only fails itself. Photos are downloaded and resized by a pool of threads while the next
+    batches are parsed; at most a few per worker are in flight, so memory stays bounded whatever
+    the size of the feed. Products bypass
+    ``Product.save`` and its signals, so the catalog caches are invalidated once at the end.
+
+    """
+    def __init__(self, batch_size: int = 1000, image_workers: int = 8,
+                 refresh_images: bool = False, image_timeout: float = 10.0,
+                 on_error: Optional[ErrorCallback] = None,
+                 on_progress: Optional[Callable[[ImportStats], None]] = None) -> None:
+        self.batch_size = batch_size
+        self.image_workers = image_workers
+        self.refresh_images = refresh_images
+        self.image_timeout = image_timeout
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.stats = ImportStats()
+        self.categories = dict(Category.objects.values_list('slug', 'id'))
+        self.pending: Dict[str, Tuple[int, Product, str, Tuple[str, ...]]] = {}
+        self.pool: Optional[ThreadPoolExecutor] = None
+        self.max_images_in_flight = image_workers * 4
+        self.images_in_flight: Dict[Future, Tuple[int, str, int]] = {}
+        self.images_done: List[Product] = []
+
+    def error(self, line: int, slug: str, message: str) -> None:
+        """Count a failed row and report it."""
+        self.stats.errors += 1
+        if self.on_error:
+            self.on_error(line, slug, message)
+
+    def get_category_id(self, slug: str, name: Optional[str]) -> int:
+        """Return the ID of a category by slug, creating the category if it is new."""
+        if slug not in self.categories:
+            category, _ = Category.objects.get_or_create(slug=slug,
+                                                         defaults={'name': name or slug})
+            self.categories[slug] = category.id
+        return self.categories[slug]
+
+    def build(self, row: Dict[str, Any]) -> Product:
+        """
+        Turn a feed row into an unsaved product and validate it.
+
+        Args:
+            row (Dict[str, Any]): The fields of the row.
+
+        Returns:
+            Product: The product to upsert.
+
+        Raises:
+            ValueError: If the row is invalid; the message says why.
+
+        """
+        missing = [field for field in REQUIRED_FIELDS if not is_provided(row.get(field))]
+        if missing:
+            raise ValueError(f'Missing {", ".join(missing)}')
+        try:
+            price = Decimal(str(row['price']).strip())
+        except InvalidOperation:
+            raise ValueError(f'Invalid price: {row["price"]!r}')
+        product = Product(slug=str(row['slug']).strip(), name=str(row['name']).strip(),
+                          price=price)
+        if is_provided(row.get('description')):
+            product.description = row['description']
+        if is_provided(row.get('available')):
+            product.available = parse_bool(row['available'])
+        if is_provided(row.get('stock')):
+            product.stock = int(row['stock'])
+        if is_provided(row.get('video')):
+            product.video = row['video']
+        attributes = row.get('attributes')
+        if is_provided(attributes):
+            if isinstance(attributes, str):
+                attributes = json.loads(attributes)
+            if not isinstance(attributes, dict):
+                raise ValueError('Attributes must be a JSON object')
+            product.attributes = attributes
+
+        try:
+            product.clean_fields(exclude=['category', 'image', 'created', 'updated'])
+        except ValidationError as e:
+            raise ValueError('; '.join(f'{field}: {" ".join(messages)}'
+                                       for field, messages in e.message_dict.items()))
+        product.category_id = self.get_category_id(str(row['category']).strip(),
+                                                   row.get('category_name'))
+        return product
+
+    def add(self, line: int, row: Any) -> None:
+        """Validate a feed row and queue it for the next batch."""
+        self.stats.rows += 1
+        if isinstance(row, str):
+            self.error(line, '', row)
+            return
+        try:
+            product = self.build(row)
+        except (ValueError, TypeError) as e:
+            self.error(line, str(row.get('slug', '')), str(e))
+            return
+        previous = self.pending.get(product.slug)
+        if previous:
+            self.error(previous[0], product.slug, f'Replaced by line {line} with the same slug')
+        fields = tuple(field for field in REQUIRED_FIELDS + OPTIONAL_FIELDS
+                       if field != 'slug' and is_provided(row.get(field)))
+        self.pending[product.slug] = (line, product, str(row.get('image_url') or '').strip(),
+                                      fields)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def upsert(self, products: List[Product], fields: Tuple[str, ...]) -> None:
+        """Insert or update products by slug in one statement, updating only `fields`."""
+        Product.objects.bulk_create(products, update_conflicts=True, unique_fields=['slug'],
+                                    update_fields=[*fields, 'updated'])
+
+    def write(self, batch: List[Tuple[int, Product, str]],
+              fields: Tuple[str, ...]) -> List[Tuple[int, Product, str]]:
+        """Upsert rows with the same columns, retrying them one by one if the batch fails."""
+        try:
+            with transaction.atomic():
+                self.upsert([product for _, product, _ in batch], fields)
+            return batch
+        except DatabaseError:
+            saved = []
+            for line, product, url in batch:
+                try:
+                    with transaction.atomic():
+                        self.upsert([product], fields)
+                    saved.append((line, product, url))
+                except DatabaseError as e:
+                    self.error(line, product.slug, str(e).strip())
+            return saved
+
+    def flush(self) -> None:
+        """Write the queued batch and hand its photos to the worker pool."""
+        groups: Dict[Tuple[str, ...], List[Tuple[int, Product, str]]] = {}
+        for line, product, url, fields in self.pending.values():
+            groups.setdefault(fields, []).append((line, product, url))
+        self.pending = {}
+        if not groups:
+            return
+        stocks = {}
+        images = []
+        for fields, batch in groups.items():
+            saved = self.write(batch, fields)
+            self.stats.upserted += len(saved)
+            if 'stock' in fields:
+                stocks.update({product.id: product.stock for _, product, _ in saved})
+            images += [(line, product, url) for line, product, url in saved if url]
+
+        if stocks:
+            inventory.set_stocks(stocks)
+        if images:
+            self.queue_images(images)
+        if self.on_progress:
+            self.on_progress(self.stats)
+
+    def queue_images(self, rows: List[Tuple[int, Product, str]]) -> None:
+        """Download the photos of products that have none, or of all with `refresh_images`."""
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(max_workers=self.image_workers)
+        if not self.refresh_images:
+            without = set(Product.objects.filter(id__in=[product.id for _, product, _ in rows],
+                                                 image='').values_list('id', flat=True))
+            rows = [row for row in rows if row[1].id in without]
+        for line, product, url in rows:
+            while len(self.images_in_flight) >= self.max_images_in_flight:
+                self.collect_images(FIRST_COMPLETED)
+            future = self.pool.submit(fetch_image, url, self.image_timeout)
+            self.images_in_flight[future] = (line, product.slug, product.id)
+            self.stats.images_queued += 1
+
+    def collect_images(self, return_when: str) -> None:
+        """Wait for downloads to finish and store the finished ones in batches."""
+        done, _ = wait(self.images_in_flight, return_when=return_when)
+        for future in done:
+            line, slug, product_id = self.images_in_flight.pop(future)
+            try:
+                self.images_done.append(Product(id=product_id, image=future.result()))
+            except Exception as e:
+                self.error(line, slug, f'Image not imported: {e}')
+        if len(self.images_done) >= self.batch_size or not self.images_in_flight:
+            Product.objects.bulk_update(self.images_done, ['image'])
+            self.stats.images_saved += len(self.images_done)
+            self.images_done = []
+
+    def finish(self) -> ImportStats:
+        """
+        Write the last batch, wait for the photos and invalidate the catalog caches.
+
+        Returns:
+            ImportStats: The final counters.
+
+        """
+        self.flush()
+        if self.pool:
+            while self.images_in_flight:
+                self.collect_images(FIRST_COMPLETED)
+            self.pool.shutdown()
+        bump_catalog_version()
+        invalidate_category_nav()
+        if self.on_progress:
+            self.on_progress(self.stats)
+        return self.stats
@@ -0,0 +1,282 @@
+import time
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+
+from .models import Product
+from .recommender import get_redis
+
+# Unpaid orders give their reserved units back after this many seconds.
+RESERVATION_TIMEOUT = 60 * 30
+# Seconds a confirmation is remembered, so repeated payment notifications change nothing.
+CONFIRMATION_TIMEOUT = 60 * 60 * 24 * 7
+
+STOCK_KEY_PREFIX = 'stock:product:'
+RESERVATION_KEY_PREFIX = 'stock:order:'
+RESERVATIONS_KEY = 'stock:reservations'
+DIRTY_KEY = 'stock:dirty'
+CONFIRMED_KEY_SUFFIX = ':confirmed'
+
+r = get_redis()
+
+# KEYS: the stock key of each product, then the reservation hash, the reservation expiry set and
+# the set of products to sync. ARGV: the order ID, the expiry time, then product ID and quantity
+# pairs. Returns the ID of the first product without enough stock, or 0 after reserving all.
+RESERVE_SCRIPT = r.register_script('''
+local n = #KEYS - 3
+for i = 1, n do
+    local available = tonumber(redis.call('GET', KEYS[i]) or '0')
+    if available < tonumber(ARGV[2 + i * 2]) then
+        return tonumber(ARGV[1 + i * 2])
+    end
+end
+for i = 1, n do
+    redis.call('DECRBY', KEYS[i], ARGV[2 + i * 2])
+    redis.call('HSET', KEYS[n + 1], ARGV[1 + i * 2], ARGV[2 + i * 2])
+    redis.call('SADD', KEYS[n + 3], ARGV[1 + i * 2])
+end
+redis.call('ZADD', KEYS[n + 2], ARGV[2], ARGV[1])
+return 0
+''')
+
+# KEYS: the reservation hash, the reservation expiry set and the set of products to sync.
+# ARGV: the order ID and the stock key prefix. Returns the number of released products.
+RELEASE_SCRIPT = r.register_script('''
+local items = redis.call('HGETALL', KEYS[1])
+for i = 1, #items, 2 do
+    redis.call('INCRBY', ARGV[2] .. items[i], items[i + 1])
+    redis.call('SADD', KEYS[3], items[i])
+end
+redis.call('DEL', KEYS[1])
+redis.call('ZREM', KEYS[2], ARGV[1])
+return #items / 2
+''')
+
+# KEYS: the reservation hash, the reservation expiry set, the set of products to sync, the
+# confirmation marker, then the stock key of each product. ARGV: the order ID, the seconds the
+# marker is kept, then product ID and quantity pairs. An order whose reservation was already
+# released takes its units again. Returns the ID of the first product without enough stock, or 0
+# after confirming.
+CONFIRM_SCRIPT = r.register_script('''
+if redis.call('EXISTS', KEYS[4]) == 1 then
+    return 0
+end
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    local n = #KEYS - 4
+    for i = 1, n do
+        local available = tonumber(redis.call('GET', KEYS[4 + i]) or '0')
+        if available < tonumber(ARGV[2 + i * 2]) then
+            return tonumber(ARGV[1 + i * 2])
+        end
+    end
+    for i = 1, n do
+        redis.call('DECRBY', KEYS[4 + i], ARGV[2 + i * 2])
+        redis.call('SADD', KEYS[3], ARGV[1 + i * 2])
+    end
+end
+redis.call('DEL', KEYS[1])
+redis.call('ZREM', KEYS[2], ARGV[1])
+redis.call('SET', KEYS[4], 1, 'EX', ARGV[2])
+return 0
+''')
+
+
+class OutOfStock(Exception):
+    """Raised when a product does not have enough units left to reserve."""
+    def __init__(self, product_id: int) -> None:
+        super().__init__(f'Product {product_id} is out of stock.')
+        self.product_id = product_id
+
+
+def get_stock_key(product_id: int) -> str:
+    """Generate the Redis key holding the units of a product that are still for sale."""
+    return f'{STOCK_KEY_PREFIX}{product_id}'
+
+
+def get_reservation_key(order_id: int) -> str:
+    """Generate the Redis key holding the units reserved by an order."""
+    return f'{RESERVATION_KEY_PREFIX}{order_id}'
+
+
+def seed_stocks(product_ids: Iterable[int]) -> List[int]:
+    """
+    Copy the stock of tracked products that are missing from Redis from the database.
+
+    Args:
+        product_ids (Iterable[int]): The IDs of the products.
+
+    Returns:
+        List[int]: The IDs of the products whose stock is tracked.
+
+    """
+    tracked = dict(Product.objects.filter(id__in=product_ids, stock__isnull=False)
+                   .values_list('id', 'stock'))
+    if tracked:
+        with r.pipeline(transaction=False) as pipe:
+            for product_id, stock in tracked.items():
+                pipe.set(get_stock_key(product_id), stock, nx=True)
+            pipe.execute()
+    return list(tracked)
+
+
+def set_stock(product_id: int, stock: Optional[int]) -> None:
+    """
+    Overwrite the live stock of a product, e.g. after it was edited in the admin.
+
+    Args:
+        product_id (int): The ID of the product.
+        stock (Optional[int]): The units for sale, or None to stop tracking the product.
+
+    """
+    set_stocks({product_id: stock})
+
+
+def set_stocks(stocks: Dict[int, Optional[int]]) -> None:
+    """
+    Overwrite the live stock of many products in one round trip, e.g. after an import.
+
+    Args:
+        stocks (Dict[int, Optional[int]]): The units for sale by product ID, None to stop
+            tracking a product.
+
+    """
+    with r.pipeline(transaction=False) as pipe:
+        for product_id, stock in stocks.items():
+            if stock is None:
+                pipe.delete(get_stock_key(product_id))
+            else:
+                pipe.set(get_stock_key(product_id), stock)
+        pipe.execute()
+
+
+def reserve(order_id: int, quantities: Dict[int, int]) -> None:
+    """
+    Atomically reserve units of every tracked product in an order.
+
+    The check and the decrements run in one Lua script, so concurrent checkouts of the same
+    product never oversell and never wait on a database lock. Products whose stock is not
+    tracked are skipped. Counters missing from Redis are seeded from the database first.
+
+    Args:
+        order_id (int): The ID of the order the units are reserved for.
+        quantities (Dict[int, int]): The quantity ordered by product ID.
+
+    Raises:
+        OutOfStock: If a product does not have enough units; nothing is reserved then.
+
+    """
+    tracked = seed_stocks(quantities)
+    if not tracked:
+        return
+
+    args: List = [order_id, time.time() + RESERVATION_TIMEOUT]
+    for product_id in tracked:
+        args += [product_id, quantities[product_id]]
+    keys = [get_stock_key(product_id) for product_id in tracked]
+    keys += [get_reservation_key(order_id), RESERVATIONS_KEY, DIRTY_KEY]
+    failed = RESERVE_SCRIPT(keys=keys, args=args, client=r)
+    if failed:
+        raise OutOfStock(failed)
+
+
+def release(order_id: int) -> int:
+    """
+    Give the units reserved by an unpaid order back to stock.
+
+    Args:
+        order_id (int): The ID of the order.
+
+    Returns:
+        int: The number of products whose units were released.
+
+    """
+    return RELEASE_SCRIPT(keys=[get_reservation_key(order_id), RESERVATIONS_KEY, DIRTY_KEY],
+                          args=[order_id, STOCK_KEY_PREFIX], client=r)
+
+
+def confirm(order_id: int) -> bool:
+    """
+    Keep the units of a paid order sold, so they are never released.
+
+    A payment can arrive after the reservation expired and its units went back to stock; they are
+    then taken again, as long as they have not been sold meanwhile. Confirming an order twice,
+    e.g. for a repeated payment notification, changes nothing.
+
+    Args:
+        order_id (int): The ID of the order.
+
+    Returns:
+        bool: False if the released units were sold to someone else, so the order cannot be
+            fulfilled from stock.
+
+    """
+    from orders.models import OrderItem
+
+    items = OrderItem.objects.filter(order_id=order_id).values_list('product_id', 'quantity')
+    quantities: Dict[int, int] = {}
+    for product_id, quantity in items:
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    tracked = seed_stocks(quantities)
+
+    args: List = [order_id, CONFIRMATION_TIMEOUT]
+    for product_id in tracked:
+        args += [product_id, quantities[product_id]]
+    keys = [get_reservation_key(order_id), RESERVATIONS_KEY, DIRTY_KEY,
+            get_reservation_key(order_id) + CONFIRMED_KEY_SUFFIX]
+    keys += [get_stock_key(product_id) for product_id in tracked]
+    return not CONFIRM_SCRIPT(keys=keys, args=args, client=r)
+
+
+def release_expired(batch_size: int = 500) -> int:
+    """
+    Release the reservations of orders that were not paid in time.
+
+    Args:
+        batch_size (int, optional): The number of orders handled per Redis query.
+
+    Returns:
+        int: The number of released orders.
+
+    """
+    from orders.models import Order
+
+    released = 0
+    while True:
+        order_ids = [int(id) for id in r.zrangebyscore(RESERVATIONS_KEY, '-inf', time.time(),
+                                                       start=0, num=batch_size)]
+        # A payment can be confirmed just as its reservation expires.
+        paid = set(Order.objects.filter(id__in=order_ids, paid=True).values_list('id', flat=True))
+        for order_id in order_ids:
+            if order_id in paid:
+                confirm(order_id)
+            else:
+                release(order_id)
+                released += 1
+        if len(order_ids) < batch_size:
+            return released
+
+
+def sync_stock(batch_size: int = 500) -> int:
+    """
+    Copy the live stock of recently changed products from Redis to the database.
+
+    Each batch costs one ``SPOP``, one ``MGET`` and one ``UPDATE`` statement, and no Product
+    signals are sent.
+
+    Args:
+        batch_size (int, optional): The number of products written per statement.
+
+    Returns:
+        int: The number of synced products.
+
+    """
+    synced = 0
+    while True:
+        product_ids = [int(id) for id in r.spop(DIRTY_KEY, batch_size)]
+        if not product_ids:
+            return synced
+        values = r.mget([get_stock_key(id) for id in product_ids])
+        products = [Product(id=id, stock=max(int(value), 0))
+                    for id, value in zip(product_ids, values) if value is not None]
+        Product.objects.bulk_update(products, ['stock'])
+        synced += len(products)
@@ -0,0 +1,83 @@
+import csv
+import sys
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from shop.importer import ImportStats, ProductImporter, read_feed
+
+
+class Command(BaseCommand):
+    help = ('Import products from a CSV or JSON Lines feed, creating new products and updating '
+            'existing ones by slug. Columns: slug, name, category (slug), price and optionally '
+            'category_name, description, available, stock, video, attributes (JSON) and '
+            'image_url.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('feed', help='Path of the feed, or - to read it from stdin.')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Feed format; guessed from the file extension by default.')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of products written per statement.')
+        parser.add_argument('--image-workers', type=int, default=8,
+                            help='Number of threads downloading and resizing photos.')
+        parser.add_argument('--image-timeout', type=float, default=10.0,
+                            help='Seconds to wait for a photo download.')
+        parser.add_argument('--refresh-images', action='store_true',
+                            help='Download photos for products that already have one too.')
+        parser.add_argument('--errors', help='Write the rows that failed to this CSV file.')
+
+    def handle(self, *args, **options):
+        path = options['feed']
+        format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        if path == '-':
+            stream = sys.stdin
+        elif not Path(path).is_file():
+            raise CommandError(f'Feed {path} does not exist.')
+        else:
+            stream = open(path, encoding='utf-8-sig', newline='')
+
+        error_file = open(options['errors'], 'w', newline='') if options['errors'] else None
+        error_writer = csv.writer(error_file) if error_file else None
+        if error_writer:
+            error_writer.writerow(['line', 'slug', 'error'])
+        start = time.monotonic()
+
+        def on_error(line: int, slug: str, message: str) -> None:
+            if error_writer:
+                error_writer.writerow([line, slug, message])
+            else:
+                self.stderr.write(f'Line {line} ({slug or "no slug"}): {message}')
+
+        def on_progress(stats: ImportStats) -> None:
+            elapsed = time.monotonic() - start
+            self.stdout.write(f'{stats.rows} rows in {elapsed:.0f}s '
+                              f'({stats.rows / max(elapsed, 0.001):.0f}/s): '
+                              f'{stats.upserted} imported, {stats.errors} errors, '
+                              f'{stats.images_saved} of {stats.images_queued} photos saved')
+
+        try:
+            # Each row updates only the fields it has, so the columns are not fixed up front.
+            importer = ProductImporter(batch_size=options['batch_size'],
+                                       image_workers=options['image_workers'],
+                                       refresh_images=options['refresh_images'],
+                                       image_timeout=options['image_timeout'],
+                                       on_error=on_error,
+                                       on_progress=on_progress)
+            for line, row in read_feed(stream, format):
+                importer.add(line, row)
+            stats = importer.finish()
+            if not stats.rows:
+                raise CommandError('The feed is empty.')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if error_file:
+                error_file.close()
+
+        message = f'Imported {stats.upserted} of {stats.rows} products.'
+        if stats.errors:
+            self.stdout.write(self.style.WARNING(f'{message} {stats.errors} rows failed.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,38 @@
+from itertools import groupby
+
+from django.core.management.base import BaseCommand
+
+from myshop.routers import get_replica_alias
+from orders.models import OrderItem
+from shop.recommender import Recommender
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the co-purchase recommendations from paid orders in a new generation and '
+            'switch to it atomically.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Number of order items fetched from the database at a time.')
+
+    def handle(self, *args, **options):
+        recommender = Recommender()
+        generation = recommender.start_generation()
+        self.stdout.write(f'Building generation {generation}...')
+
+        # Reading every paid order is a reporting query, so it goes to a replica.
+        items = (OrderItem.objects.using(get_replica_alias()).filter(order__paid=True)
+                 .order_by('order_id').values_list('order_id', 'order__created', 'product_id'))
+        baskets = 0
+        for _, rows in groupby(items.iterator(chunk_size=options['chunk_size']),
+                               key=lambda row: row[0]):
+            rows = list(rows)
+            product_ids = list({product_id for _, _, product_id in rows})
+            if len(product_ids) > 1:
+                recommender.record_purchase(product_ids, generation,
+                                            when=rows[0][1].timestamp())
+                baskets += 1
+
+        recommender.retire_generation(generation)
+        self.stdout.write(self.style.SUCCESS(
+            f'Generation {generation} built from {baskets} orders and published.'))
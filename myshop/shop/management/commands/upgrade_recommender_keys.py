@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from shop.recommender import Recommender
+
+
+class Command(BaseCommand):
+    help = ('Move the co-purchase sets stored before recommender generations existed into '
+            'generation 0 and delete the old keys. Does nothing once they are gone.')
+
+    def handle(self, *args, **options):
+        moved = Recommender().adopt_legacy_keys()
+        self.stdout.write(self.style.SUCCESS(f'Moved {moved} legacy co-purchase sets.'))
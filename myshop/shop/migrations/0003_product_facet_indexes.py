@@ -0,0 +1,21 @@
+# Generated by Django 5.0.14 on 2026-10-19 15:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0002_product_video'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['available', 'category', 'price'], name='shop_produc_availab_c5dd6b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['available', 'category', '-created'], name='shop_produc_availab_78247d_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.14 on 2026-10-19 15:24
+
+import django.contrib.postgres.indexes
+import django.db.models.fields.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0003_product_facet_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='attributes',
+            field=models.JSONField(blank=True, default=dict, help_text='Technical specifications, e.g. capacity, voltage'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['attributes'], name='shop_product_attrs_gin', opclasses=['jsonb_path_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(django.db.models.fields.json.KeyTransform('capacity', 'attributes'), name='shop_product_capacity_idx'),
+        ),
+    ]
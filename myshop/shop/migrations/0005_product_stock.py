@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-19 15:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0004_product_attributes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='stock',
+            field=models.PositiveIntegerField(blank=True, help_text='Units for sale; leave empty to not track stock', null=True),
+        ),
+    ]
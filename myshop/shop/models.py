@@ -1,10 +1,21 @@
-from io import BytesIO
 import re
 
-from django.core.files.uploadedfile import InMemoryUploadedFile
+from typing import List, Tuple
+
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
+from django.db.models.fields.json import KeyTransform
 from django.urls import reverse
-from PIL import Image
+
+from .images import resize_product_image
+
+CHEMISTRY_CHOICES = [
+    ('lifepo4', 'LiFePO4'),
+    ('li-ion', 'Li-ion'),
+    ('li-pol', 'Li-Pol'),
+    ('nimh', 'NiMH'),
+    ('lead-acid', 'Свинцево-кислотна'),
+]
 
 
 class Category(models.Model):
@@ -35,6 +46,10 @@ class Product(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
     video = models.URLField(blank=True, null=True, help_text="URL of the video for the product")
+    attributes = models.JSONField(default=dict, blank=True,
+                                  help_text="Technical specifications, e.g. capacity, voltage")
+    stock = models.PositiveIntegerField(null=True, blank=True,
+                                        help_text="Units for sale; leave empty to not track stock")
 
     class Meta:
         ordering = ['name']
@@ -42,6 +57,12 @@ class Product(models.Model):
             models.Index(fields=['id', 'slug']),
             models.Index(fields=['name']),
             models.Index(fields=['-created']),
+            models.Index(fields=['available', 'category', 'price']),
+            models.Index(fields=['available', 'category', '-created']),
+            GinIndex(fields=['attributes'], name='shop_product_attrs_gin',
+                     opclasses=['jsonb_path_ops']),
+            models.Index(KeyTransform('capacity', 'attributes'),
+                         name='shop_product_capacity_idx'),
         ]
 
     def __str__(self):
@@ -51,21 +72,24 @@ class Product(models.Model):
         return reverse("shop:product_detail", args=(self.id, self.slug))
 
     def save(self, *args, **kwargs):
-        if self.image:
-            img = Image.open(self.image)
-            output = BytesIO()
-
-            img = img.resize((480, 334), Image.Resampling.LANCZOS)
-            img.save(output, format='JPEG', quality=100)
-            output.seek(0)
-
-            self.image = InMemoryUploadedFile(output,
-                                              'ImageField',
-                                              "%s.jpg" % self.image.name.split('.')[0],
-                                              'image/jpeg', output.getbuffer().nbytes, None)
-
+        # Only a newly assigned photo is processed; a stored one is not re-encoded on every save.
+        if self.image and not self.image._committed:
+            self.image = resize_product_image(self.image, self.image.name)
         super().save(*args, **kwargs)
 
+    def get_attributes_display(self) -> List[Tuple[str, str]]:
+        """Returns the known technical specifications as (label, value) pairs for templates."""
+        specs = []
+        if self.attributes.get('capacity') is not None:
+            specs.append(('Ємність', f"{self.attributes['capacity']} Вт·год"))
+        if self.attributes.get('voltage') is not None:
+            specs.append(('Напруга', f"{self.attributes['voltage']} В"))
+        if self.attributes.get('chemistry'):
+            chemistry = dict(CHEMISTRY_CHOICES).get(self.attributes['chemistry'],
+                                                    self.attributes['chemistry'])
+            specs.append(('Тип акумулятора', chemistry))
+        return specs
+
     def get_youtube_id(self):
         """Extracts the YouTube video ID from the URL."""
         pattern = r'(?:https?:\/\/)?(?:www\.)?youtube\.com\/watch\?v=([a-zA-Z0-9_-]+)'
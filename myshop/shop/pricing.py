@@ -0,0 +1,149 @@
+import csv
+from decimal import Decimal, InvalidOperation
+from io import TextIOWrapper
+from typing import IO, Dict, List, Optional, Tuple
+
+from django.db import connection, transaction
+from django.db.models import F, QuerySet
+from django.db.models.functions import Round
+from django.utils import timezone
+
+from .catalog import bump_catalog_version, invalidate_category_nav
+from .importer import parse_bool
+from .models import Product
+
+# Rows of a price list written per UPDATE statement.
+PRICE_LIST_CHUNK_SIZE = 1000
+# Encodings tried in turn when reading an uploaded price list.
+PRICE_LIST_ENCODINGS = ['utf-8-sig', 'cp1251']
+
+PriceList = Dict[str, Tuple[Optional[Decimal], Optional[bool]]]
+
+
+def catalog_changed() -> None:
+    """Invalidate the catalog caches once after a bulk change that bypassed Product signals."""
+    bump_catalog_version()
+    invalidate_category_nav()
+
+
+def change_prices(products: QuerySet, percent: Decimal) -> int:
+    """
+    Raise or lower the prices of products by a percentage in one UPDATE statement.
+
+    Args:
+        products (QuerySet): The products to reprice, e.g. those of some categories.
+        percent (Decimal): The change in percent; negative for a discount.
+
+    Returns:
+        int: The number of repriced products.
+
+    """
+    count = products.update(price=Round(F('price') * (100 + percent) / 100, 2),
+                            updated=timezone.now())
+    catalog_changed()
+    return count
+
+
+def read_price_list(file: IO[bytes]) -> Tuple[PriceList, List[str]]:
+    """
+    Parse an uploaded CSV price list with the columns slug, price and optionally available.
+
+    The file is read as UTF-8 and, if it is not valid UTF-8, as Windows-1251, the encoding
+    Excel saves Cyrillic CSV files in.
+
+    Args:
+        file (IO[bytes]): The uploaded file.
+
+    Returns:
+        Tuple[PriceList, List[str]]: The new price and availability by slug, None where the
+            column is empty, and the errors of the rows that were skipped. The price list is empty
+            if the file could not be read at all.
+
+    """
+    for encoding in PRICE_LIST_ENCODINGS:
+        file.seek(0)
+        text = TextIOWrapper(file, encoding=encoding, newline='')
+        try:
+            return parse_price_list(csv.DictReader(text))
+        except UnicodeDecodeError:
+            continue
+        except csv.Error as e:
+            return {}, [f'Файл не є коректним CSV: {e}.']
+        finally:
+            # Keep the upload open for the next attempt.
+            text.detach()
+    return {}, ['Не вдалося прочитати файл: збережіть його як CSV у кодуванні UTF-8.']
+
+
+def parse_price_list(reader: csv.DictReader) -> Tuple[PriceList, List[str]]:
+    """Read the rows of a price list; see `read_price_list`."""
+    prices: PriceList = {}
+    errors = []
+    if 'slug' not in (reader.fieldnames or []):
+        return prices, ['У файлі немає стовпця slug.']
+    for row in reader:
+        slug = (row.get('slug') or '').strip()
+        price = (row.get('price') or '').strip()
+        available = (row.get('available') or '').strip()
+        if not slug:
+            errors.append(f'Рядок {reader.line_num}: не вказано slug.')
+            continue
+        try:
+            price = Decimal(price) if price else None
+            if price is not None and (not price.is_finite() or price < 0):
+                raise InvalidOperation
+        except InvalidOperation:
+            errors.append(f'Рядок {reader.line_num}: некоректна ціна «{row["price"]}».')
+            continue
+        try:
+            available = parse_bool(available) if available else None
+        except ValueError:
+            errors.append(f'Рядок {reader.line_num}: некоректне значення available '
+                          f'«{row["available"]}».')
+            continue
+        prices[slug] = (price, available)
+    return prices, errors
+
+
+def apply_price_list(prices: PriceList) -> Tuple[int, List[str]]:
+    """
+    Update the price and availability of products by slug with set-based UPDATE statements.
+
+    Each chunk of the list is joined to the products in a single ``UPDATE ... FROM (VALUES ...)``
+    statement, and the whole list is applied in one transaction. Only rows that change are
+    written, and their ``updated`` is bumped.
+
+    Args:
+        prices (PriceList): The new price and availability by slug, None to keep the current one.
+
+    Returns:
+        Tuple[int, List[str]]: The number of changed products and the slugs not in the catalog.
+
+    """
+    table = connection.ops.quote_name(Product._meta.db_table)
+    items = list(prices.items())
+    now = timezone.now()
+    changed = 0
+    unknown = []
+    with transaction.atomic():
+        for start in range(0, len(items), PRICE_LIST_CHUNK_SIZE):
+            chunk = items[start:start + PRICE_LIST_CHUNK_SIZE]
+            known = set(Product.objects.filter(slug__in=[slug for slug, _ in chunk])
+                        .values_list('slug', flat=True))
+            unknown += [slug for slug, _ in chunk if slug not in known]
+            values = ', '.join(['(%s, %s::numeric, %s::boolean)'] * len(chunk))
+            params = [value for slug, (price, available) in chunk
+                      for value in (slug, price, available)]
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'UPDATE {table} AS p '
+                    f'SET price = COALESCE(v.price, p.price), '
+                    f'available = COALESCE(v.available, p.available), updated = %s '
+                    f'FROM (VALUES {values}) AS v (slug, price, available) '
+                    f'WHERE p.slug = v.slug '
+                    f'AND (p.price <> COALESCE(v.price, p.price) '
+                    f'OR p.available <> COALESCE(v.available, p.available))',
+                    [now, *params])
+                changed += cursor.rowcount
+    catalog_changed()
+    return changed, unknown
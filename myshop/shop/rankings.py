@@ -0,0 +1,169 @@
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+
+from . import recommender
+from .catalog import aget_category_nav
+from .models import Category, Product
+
+# Trending counts the units sold in the last TRENDING_WINDOW seconds. Sales are added to hourly
+# buckets that expire on their own, and `refresh_trending` sums the buckets of the window into
+# one sorted set per scope, so reading a ranking is always a single ZRANGE.
+TRENDING_WINDOW = 60 * 60 * 24
+TRENDING_BUCKET = 60 * 60
+# Products kept in each trending sorted set.
+TRENDING_SIZE = 50
+# Products shown in each ranking on the catalog pages.
+RANKING_SIZE = 4
+
+BESTSELLERS = 'bestsellers'
+TRENDING = 'trending'
+
+r = recommender.get_redis()
+
+
+def get_ranking_key(name: str, category_id: Optional[int] = None) -> str:
+    """
+    Generate the Redis key of a ranking.
+
+    Args:
+        name (str): `BESTSELLERS`, `TRENDING` or a trending bucket.
+        category_id (Optional[int]): The category ranked, or None for the whole catalog.
+
+    Returns:
+        str: The key of the sorted set scoring products by units sold.
+
+    """
+    if category_id is None:
+        return f'rankings:{name}'
+    return f'rankings:{name}:category:{category_id}'
+
+
+def get_bucket_key(bucket: int, category_id: Optional[int] = None) -> str:
+    """Generate the Redis key of the sales in one trending bucket."""
+    return get_ranking_key(f'{TRENDING}:{bucket}', category_id)
+
+
+def record_sales(quantities: Dict[int, Tuple[int, int]], when: Optional[float] = None) -> None:
+    """
+    Add the units of a paid order to the rankings of the catalog and of their categories.
+
+    Args:
+        quantities (Dict[int, Tuple[int, int]]): The category ID and units sold by product ID.
+        when (Optional[float]): The time of the sale as a UNIX timestamp; defaults to now.
+
+    """
+    bucket = int((time.time() if when is None else when) // TRENDING_BUCKET)
+    expires = TRENDING_WINDOW + TRENDING_BUCKET
+    with r.pipeline(transaction=False) as pipe:
+        for product_id, (category_id, quantity) in quantities.items():
+            for scope in (None, category_id):
+                pipe.zincrby(get_ranking_key(BESTSELLERS, scope), quantity, product_id)
+                pipe.zincrby(get_bucket_key(bucket, scope), quantity, product_id)
+                pipe.expire(get_bucket_key(bucket, scope), expires)
+        pipe.execute()
+
+
+def refresh_trending(now: Optional[float] = None) -> int:
+    """
+    Recompute the trending rankings from the buckets of the current window.
+
+    Each ranking is rebuilt server-side with one ``ZUNIONSTORE`` and trimmed to `TRENDING_SIZE`,
+    and all of them are sent in a single pipeline.
+
+    Args:
+        now (Optional[float]): The end of the window as a UNIX timestamp; defaults to now.
+
+    Returns:
+        int: The number of refreshed rankings.
+
+    """
+    last = int((time.time() if now is None else now) // TRENDING_BUCKET)
+    buckets = range(last - TRENDING_WINDOW // TRENDING_BUCKET + 1, last + 1)
+    scopes = [None, *Category.objects.values_list('id', flat=True)]
+    with r.pipeline(transaction=False) as pipe:
+        for scope in scopes:
+            key = get_ranking_key(TRENDING, scope)
+            pipe.zunionstore(key, [get_bucket_key(bucket, scope) for bucket in buckets])
+            pipe.zremrangebyrank(key, 0, -TRENDING_SIZE - 1)
+        pipe.execute()
+    return len(scopes)
+
+
+def replace_bestsellers(rankings: Dict[Optional[int], Dict[int, int]]) -> None:
+    """
+    Overwrite the best-seller rankings, e.g. after recounting them from the sales history.
+
+    Args:
+        rankings (Dict[Optional[int], Dict[int, int]]): The units sold by product ID for each
+            category ID, with None for the whole catalog.
+
+    """
+    with r.pipeline() as pipe:
+        for key in r.scan_iter(match=get_ranking_key(BESTSELLERS, '*')):
+            pipe.unlink(key)
+        pipe.unlink(get_ranking_key(BESTSELLERS))
+        for scope, units in rankings.items():
+            if units:
+                pipe.zadd(get_ranking_key(BESTSELLERS, scope), units)
+        pipe.execute()
+
+
+async def aget_rankings(category_id: Optional[int] = None,
+                        count: int = RANKING_SIZE) -> Tuple[List[int], List[int]]:
+    """
+    Read the best-selling and trending products of a category in one round trip.
+
+    Twice `count` IDs are read, so products that are no longer for sale can be skipped.
+
+    Args:
+        category_id (Optional[int]): The category, or None for the whole catalog.
+        count (int, optional): The number of products to show.
+
+    Returns:
+        Tuple[List[int], List[int]]: The IDs of the best-selling and of the trending products,
+            best first.
+
+    """
+    async with recommender.get_async_redis().pipeline(transaction=False) as pipe:
+        pipe.zrange(get_ranking_key(BESTSELLERS, category_id), 0, count * 2 - 1, desc=True)
+        pipe.zrange(get_ranking_key(TRENDING, category_id), 0, count * 2 - 1, desc=True)
+        bestsellers, trending = await pipe.execute()
+    return [int(id) for id in bestsellers], [int(id) for id in trending]
+
+
+def pick_ranked(ids: Iterable[int], products: Dict[int, Product],
+                count: int = RANKING_SIZE) -> List[Product]:
+    """Return the first `count` ranked products that are for sale, in ranking order."""
+    ranked = [products[id] for id in ids if id in products and products[id].available]
+    return ranked[:count]
+
+
+def load_rankings(view: Callable) -> Callable:
+    """
+    Read the rankings of the listed category before an async catalog view runs.
+
+    It must wrap the conditional-response decorator: the rankings are left in
+    ``request.rankings`` for the ETag, so a browser revalidating the page gets it again once a
+    paid order or a trending refresh reorders them, and for the view, which shows them.
+
+    Args:
+        view (Callable): An async view taking an optional ``category_slug``.
+
+    Returns:
+        Callable: The wrapped view.
+
+    """
+    @wraps(view)
+    async def inner(request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        category_id = None
+        if kwargs.get('category_slug'):
+            nav = await aget_category_nav()
+            category = nav['by_slug'].get(kwargs['category_slug'])
+            category_id = category.id if category else None
+        request.rankings = await aget_rankings(category_id)
+        return await view(request, *args, **kwargs)
+    return inner
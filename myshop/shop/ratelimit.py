@@ -0,0 +1,151 @@
+import logging
+import time
+from functools import wraps
+from typing import Callable, Iterable, List, Optional
+
+import redis
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.http import HttpRequest, HttpResponse
+
+from .recommender import get_redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'ratelimit'
+
+r = get_redis()
+
+# KEYS: the counters of the current and the previous window for each identity, in pairs. ARGV:
+# the limit, the window in seconds and the weight of the previous window. Returns 0 after counting
+# the request, or the 1-based index of the first identity over its limit.
+HIT_SCRIPT = r.register_script('''
+local limit = tonumber(ARGV[1])
+local weight = tonumber(ARGV[3])
+for i = 1, #KEYS, 2 do
+    local current = tonumber(redis.call('GET', KEYS[i]) or '0')
+    local previous = tonumber(redis.call('GET', KEYS[i + 1]) or '0')
+    if previous * weight + current >= limit then
+        return (i + 1) / 2
+    end
+end
+for i = 1, #KEYS, 2 do
+    redis.call('INCR', KEYS[i])
+    redis.call('EXPIRE', KEYS[i], ARGV[2] * 2)
+end
+return 0
+''')
+
+
+def get_client_ip(request: HttpRequest) -> str:
+    """
+    Return the IP address of the client, looking behind ``RATE_LIMIT_PROXY_COUNT`` proxies.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        str: The IP address of the client.
+
+    """
+    proxies = settings.RATE_LIMIT_PROXY_COUNT
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if proxies and forwarded:
+        addresses = [address.strip() for address in forwarded.split(',')]
+        return addresses[-min(proxies, len(addresses))]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def get_identity(request: HttpRequest, kind: str) -> Optional[str]:
+    """
+    Return what a request is counted by, or None if it has no such identity.
+
+    Sessions are identified by their cookie, so checking them does not load the session. Users
+    are read from the session, which costs one session lookup but no user query.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        kind (str): ``ip``, ``session`` or ``user``.
+
+    Returns:
+        Optional[str]: The identity of the request.
+
+    """
+    if kind == 'ip':
+        return get_client_ip(request)
+    if kind == 'session':
+        return request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if kind == 'user':
+        return request.session.get(SESSION_KEY)
+    raise ValueError(f'Unknown rate limit key: {kind}')
+
+
+def hit(scope: str, identities: List[str], limit: int, window: int) -> Optional[int]:
+    """
+    Count a request against a sliding-window limit shared by all workers.
+
+    The window is approximated from the counters of the current and the previous fixed window,
+    weighted by how much of the previous one still overlaps. A check costs one Lua call with two
+    reads and two writes per identity, whatever the traffic.
+
+    Args:
+        scope (str): The name of the limit, e.g. the view.
+        identities (List[str]): The identities the request is counted by, e.g. ``ip:1.2.3.4``.
+        limit (int): The number of requests allowed per identity in a window.
+        window (int): The length of the window, in seconds.
+
+    Returns:
+        Optional[int]: None if the request is allowed, otherwise the seconds until it may retry.
+
+    """
+    now = time.time()
+    index, elapsed = divmod(now, window)
+    keys = []
+    for identity in identities:
+        keys += [f'{KEY_PREFIX}:{scope}:{identity}:{index:.0f}',
+                 f'{KEY_PREFIX}:{scope}:{identity}:{index - 1:.0f}']
+    if not HIT_SCRIPT(keys=keys, args=[limit, window, 1 - elapsed / window], client=r):
+        return None
+    return max(int(window - elapsed), 1)
+
+
+def rate_limit(scope: str, key: Iterable[str] = ('ip',)) -> Callable:
+    """
+    Decorator rejecting requests over the limit configured for `scope` in ``RATE_LIMITS``.
+
+    It should be the outermost decorator, so rejected requests never reach the session, the ORM
+    or the payment gateway. If Redis is unavailable, requests are let through.
+
+    Args:
+        scope (str): The name of the limit in ``RATE_LIMITS``.
+        key (Iterable[str], optional): What requests are counted by, each with its own limit:
+            ``ip``, ``session`` or ``user``.
+
+    Returns:
+        Callable: The decorator.
+
+    """
+    kinds = tuple(key)
+
+    def decorator(view: Callable) -> Callable:
+        @wraps(view)
+        def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            if not settings.RATE_LIMIT_ENABLED:
+                return view(request, *args, **kwargs)
+            limit, window = settings.RATE_LIMITS[scope]
+            identities = [f'{kind}:{identity}' for kind in kinds
+                          if (identity := get_identity(request, kind))]
+            try:
+                retry_after = hit(scope, identities, limit, window) if identities else None
+            except redis.RedisError:
+                logger.warning('Rate limit %s not checked, Redis is unavailable', scope,
+                               exc_info=True)
+                retry_after = None
+            if retry_after is None:
+                return view(request, *args, **kwargs)
+            response = HttpResponse('Забагато запитів. Спробуйте пізніше.', status=429,
+                                    content_type='text/plain; charset=utf-8')
+            response.headers['Retry-After'] = str(retry_after)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,132 @@
+import re
+import secrets
+from functools import wraps
+from typing import Any, Callable, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+
+from . import recommender
+from .models import Product
+
+# Products remembered per visitor. Each list is trimmed on every push, so a visitor costs at most
+# this many list entries in Redis whatever they browse. Lists are only written for signed-in users
+# and for visitors sending back the visitor cookie, so clients that drop cookies, such as crawlers,
+# never create one.
+MAX_RECENTLY_VIEWED = 8
+# Products shown in a recently viewed strip.
+RECENTLY_VIEWED_SHOWN = 4
+# Seconds a visitor's list is kept after their last product view.
+RECENTLY_VIEWED_TIMEOUT = 60 * 60 * 24 * 30
+VISITOR_COOKIE_AGE = 60 * 60 * 24 * 365
+
+VISITOR_ID = re.compile(r'[0-9a-f]{32}')
+
+
+def get_history_key(request: HttpRequest) -> Optional[str]:
+    """
+    Generate the Redis key of the products viewed by the visitor of a request.
+
+    Signed-in users keep one list across devices; other visitors are told apart by the visitor
+    cookie, so no session has to be created or saved for them.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        Optional[str]: The key, or None for a visitor without a visitor cookie yet.
+
+    """
+    if request.user.is_authenticated:
+        return f'recently_viewed:user:{request.user.pk}'
+    visitor_id = request.COOKIES.get(settings.RECENTLY_VIEWED_COOKIE, '')
+    if VISITOR_ID.fullmatch(visitor_id):
+        return f'recently_viewed:visitor:{visitor_id}'
+    return None
+
+
+async def apush(key: str, product_id: int) -> None:
+    """
+    Move a product to the front of a visitor's list.
+
+    ``LREM``, ``LPUSH``, ``LTRIM`` and ``EXPIRE`` are sent in one transaction, so a view costs a
+    single round trip and the list never holds a product twice.
+
+    Args:
+        key (str): The key of the visitor's list.
+        product_id (int): The ID of the viewed product.
+
+    """
+    async with recommender.get_async_redis().pipeline() as pipe:
+        pipe.lrem(key, 0, product_id)
+        pipe.lpush(key, product_id)
+        pipe.ltrim(key, 0, MAX_RECENTLY_VIEWED - 1)
+        pipe.expire(key, RECENTLY_VIEWED_TIMEOUT)
+        await pipe.execute()
+
+
+async def aget_ids(key: Optional[str]) -> List[int]:
+    """Return the IDs of the products a visitor viewed, most recent first."""
+    if key is None:
+        return []
+    product_ids = await recommender.get_async_redis().lrange(key, 0, MAX_RECENTLY_VIEWED - 1)
+    return [int(id) for id in product_ids]
+
+
+async def aget_products(product_ids: List[int], exclude: Optional[List[int]] = None,
+                        count: int = RECENTLY_VIEWED_SHOWN) -> List[Product]:
+    """
+    Load the recently viewed products that are still for sale with one query.
+
+    Args:
+        product_ids (List[int]): The IDs of the viewed products, most recent first.
+        exclude (Optional[List[int]]): IDs to leave out, e.g. the product on the page.
+        count (int, optional): The maximum number of products.
+
+    Returns:
+        List[Product]: The products, most recent first.
+
+    """
+    exclude = set(exclude or [])
+    product_ids = [id for id in product_ids if id not in exclude][:count]
+    if not product_ids:
+        return []
+    products = {product.id: product async for product in
+                Product.objects.filter(id__in=product_ids, available=True)}
+    return [products[id] for id in product_ids if id in products]
+
+
+def track_recently_viewed(view: Callable) -> Callable:
+    """
+    Record the product of an async detail view in the visitor's recently viewed list.
+
+    It must wrap the conditional-response decorator, so views answered with 304 Not Modified are
+    recorded too. The list as it will be after this view is left in ``request.recently_viewed``
+    for the ETag and the view, but the product is only pushed once the view has answered 200 or
+    304, so IDs of missing products are never recorded. Visitors without a visitor cookie are
+    given one and recorded from their next view on.
+
+    Args:
+        view (Callable): An async view taking the product ID as ``id``.
+
+    Returns:
+        Callable: The wrapped view.
+
+    """
+    @wraps(view)
+    async def inner(request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        # Loading the user in a worker thread also leaves it loaded for the view.
+        key = await sync_to_async(get_history_key)(request)
+        product_ids = await aget_ids(key)
+        if key is not None:
+            product_ids = [kwargs['id'], *(id for id in product_ids if id != kwargs['id'])]
+        request.recently_viewed = product_ids[:MAX_RECENTLY_VIEWED]
+        response = await view(request, *args, **kwargs)
+        if key is None:
+            response.set_cookie(settings.RECENTLY_VIEWED_COOKIE, secrets.token_hex(16),
+                                max_age=VISITOR_COOKIE_AGE, httponly=True, samesite='Lax')
+        elif response.status_code in (200, 304):
+            await apush(key, kwargs['id'])
+        return response
+    return inner
@@ -1,80 +1,512 @@
-from typing import List
+import asyncio
+import hashlib
+import time
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from weakref import WeakKeyDictionary
 
 import redis
+import redis.asyncio as aioredis
 from django.conf import settings
+from django.core.cache import cache
 
 from .models import Product
 
+# Each product keeps only its strongest co-purchases. Up to 128 members a sorted set stays in the
+# compact listpack encoding, so memory grows linearly with the catalog instead of with its square.
+MAX_RELATED_PRODUCTS = 50
+# A co-purchase counts half as much after this many seconds.
+HALF_LIFE = 60 * 60 * 24 * 30
+# Pairs whose decayed score falls below this are dropped by `decay_purchases`.
+MIN_SCORE = 0.05
+
+# Scores live in numbered generations, recommender:<generation>:...; GENERATION_KEY points at the
+# one being served. A rebuild fills a new generation, announced in BUILDING_KEY so purchases are
+# recorded in both, then swaps the pointer and reclaims the old keys.
+GENERATION_KEY = 'recommender:generation'
+BUILDING_KEY = 'recommender:building'
+GENERATION_COUNTER_KEY = 'recommender:generations'
+# Decay epoch of the sets stored before generations existed; see `adopt_legacy_keys`.
+LEGACY_EPOCH_KEY = 'recommender:epoch'
+# Seconds a process may keep using the generation pointers it read. Old generations are reclaimed
+# only after this grace period, so readers never see a half-deleted generation.
+GENERATION_CACHE_TTL = 5
+# Seconds the suggestions for a product or a cart are cached.
+SUGGESTIONS_CACHE_TIMEOUT = 60 * 5
+
+_generations: Tuple[float, int, Optional[int]] = (0.0, 0, None)
+
 r = redis.Redis(host=settings.REDIS_HOST,
                 port=settings.REDIS_PORT,
                 db=settings.REDIS_DB)
 
+_async_clients: 'WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[aioredis.Redis, AsyncIterator]]' \
+    = WeakKeyDictionary()
+
+
+def get_redis() -> redis.Redis:
+    """
+    Return the Redis client shared by every module of the shop.
+
+    Inventory, coupons, rate limits, rankings and the checkout queue all use this client, so a
+    worker keeps one connection pool instead of one per module.
+
+    Returns:
+        redis.Redis: The shared Redis client.
+
+    """
+    return r
+
+
+async def _close_with_loop(loop: asyncio.AbstractEventLoop,
+                           client: aioredis.Redis) -> AsyncIterator[None]:
+    """
+    Close a client's connections and forget it when its event loop shuts down.
+
+    ``asyncio.run`` finalizes the async generators still open on a loop before closing it, so
+    the ``finally`` block runs exactly when the loop ends.
+
+    """
+    try:
+        yield
+    finally:
+        _async_clients.pop(loop, None)
+        await client.aclose()
+
+
+def get_async_redis() -> aioredis.Redis:
+    """
+    Return an asyncio Redis client bound to the running event loop.
+
+    An ASGI worker keeps one loop for its lifetime, so the client and its connection pool are
+    shared by every request. Under WSGI each async view runs in its own loop and gets its own
+    client, because asyncio connections cannot be reused across loops; the client is closed when
+    that loop ends, so its connections are not leaked.
+
+    Returns:
+        aioredis.Redis: The Redis client for the current event loop.
+
+    """
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.get(loop)
+    if entry is None:
+        client = aioredis.Redis(host=settings.REDIS_HOST,
+                                port=settings.REDIS_PORT,
+                                db=settings.REDIS_DB)
+        closer = _close_with_loop(loop, client)
+        # Starting the generator registers it with the loop's shutdown hooks.
+        loop.create_task(closer.__anext__())
+        entry = _async_clients[loop] = (client, closer)
+    return entry[0]
+
+
+def _parse_generations(current: Optional[bytes],
+                       building: Optional[bytes]) -> Tuple[int, Optional[int]]:
+    """Store the generation pointers read from Redis in the process cache and return them."""
+    global _generations
+    current = int(current) if current else 0
+    building = int(building) if building else None
+    _generations = (time.monotonic() + GENERATION_CACHE_TTL, current, building)
+    return current, building
+
+
+def get_generations() -> Tuple[int, Optional[int]]:
+    """
+    Return the generation being served and the one being rebuilt, if any.
+
+    The pointers are cached in the process for `GENERATION_CACHE_TTL` seconds, so most calls do
+    not need a Redis round trip.
+
+    Returns:
+        Tuple[int, Optional[int]]: The current generation and the generation being built.
+
+    """
+    expires, current, building = _generations
+    if time.monotonic() < expires:
+        return current, building
+    return _parse_generations(*r.mget(GENERATION_KEY, BUILDING_KEY))
+
+
+async def aget_generations() -> Tuple[int, Optional[int]]:
+    """Asynchronous counterpart of `get_generations` for async views."""
+    expires, current, building = _generations
+    if time.monotonic() < expires:
+        return current, building
+    return _parse_generations(*await get_async_redis().mget(GENERATION_KEY, BUILDING_KEY))
+
 
 class Recommender:
-    def get_product_key(self, id: int) -> str:
+    def get_product_key(self, id: int, generation: Optional[int] = None) -> str:
         """
         Generate a Redis key for a product.
 
         Args:
             id (int): The ID of the product.
+            generation (Optional[int]): The generation of the key; defaults to the current one.
 
         Returns:
             str: The Redis key for the product.
 
         """
-        return f'product:{id}:purchased_with'
+        if generation is None:
+            generation = get_generations()[0]
+        return f'recommender:{generation}:product:{id}:purchased_with'
+
+    def get_epoch_key(self, generation: int) -> str:
+        """Generate the Redis key holding the decay epoch of a generation."""
+        return f'recommender:{generation}:epoch'
+
+    def get_epoch(self, generation: int) -> float:
+        """Return the time the scores of a generation are relative to, starting it if needed."""
+        key = self.get_epoch_key(generation)
+        epoch = r.get(key)
+        if epoch is None:
+            now = time.time()
+            r.set(key, now, nx=True)
+            epoch = r.get(key) or now
+        return float(epoch)
+
+    def get_increment(self, generation: int, now: Optional[float] = None) -> float:
+        """
+        Return the weight of a co-purchase made at the given time.
+
+        Instead of decaying every stored score, new purchases get weights that grow by a factor of
+        two every `HALF_LIFE` seconds after the epoch, which ranks pairs the same way.
+        `decay_purchases` rescales the stored scores and moves the epoch before the weights grow
+        large.
+
+        Args:
+            generation (int): The generation the purchase is recorded in.
+            now (Optional[float]): The purchase time as a UNIX timestamp; defaults to now.
+
+        Returns:
+            float: The score increment.
+
+        """
+        now = time.time() if now is None else now
+        return 2 ** ((now - self.get_epoch(generation)) / HALF_LIFE)
+
+    def record_purchase(self, product_ids: List[int], generation: int,
+                        when: Optional[float] = None) -> None:
+        """
+        Add one basket to the co-purchase scores of a generation.
+
+        Every set is trimmed to the `MAX_RELATED_PRODUCTS` best scores, and all updates are sent
+        in a single pipeline.
+
+        Args:
+            product_ids (List[int]): The IDs of the products bought together.
+            generation (int): The generation to update.
+            when (Optional[float]): The purchase time as a UNIX timestamp; defaults to now.
+
+        """
+        increment = self.get_increment(generation, when)
+        with r.pipeline(transaction=False) as pipe:
+            for product_id in product_ids:
+                key = self.get_product_key(product_id, generation)
+                for with_id in product_ids:
+                    if product_id != with_id:
+                        pipe.zincrby(key, increment, with_id)
+                pipe.zremrangebyrank(key, 0, -MAX_RELATED_PRODUCTS - 1)
+            pipe.execute()
 
     def products_bought(self, products: List[Product]) -> None:
         """
         Update the Redis sorted sets for products bought together. This method increments the score
         of products bought together in Redis.
 
+        While a rebuild is running, the purchase is also recorded in the generation being built,
+        so it is not lost when that generation is published.
+
         Args:
             products (List[object]): A list of product objects. Each product object must have an
             'id' attribute.
 
         """
         product_ids = [p.id for p in products]
+        current, building = get_generations()
+        self.record_purchase(product_ids, current)
+        if building is not None:
+            self.record_purchase(product_ids, building)
+
+    def decay_purchases(self, batch_size: int = 500) -> int:
+        """
+        Apply the decay accumulated since the epoch to all stored scores and restart the epoch.
+
+        Scores are multiplied server-side with a single-key ``ZUNIONSTORE`` and pairs that fell
+        below `MIN_SCORE` are removed. Keys are visited with ``SCAN`` and updated in pipelines of
+        `batch_size`, so Redis is never blocked for long.
+
+        Args:
+            batch_size (int, optional): The number of keys updated per pipeline.
+
+        Returns:
+            int: The number of sorted sets that were rescaled.
+
+        """
+        generation = get_generations()[0]
+        now = time.time()
+        factor = 1 / self.get_increment(generation, now)
+        r.set(self.get_epoch_key(generation), now)
+        rescaled = 0
+        with r.pipeline(transaction=False) as pipe:
+            for key in r.scan_iter(match=self.get_product_key('*', generation), count=batch_size):
+                pipe.zunionstore(key, {key: factor})
+                pipe.zremrangebyscore(key, '-inf', f'({MIN_SCORE}')
+                rescaled += 1
+                if rescaled % batch_size == 0:
+                    pipe.execute()
+            pipe.execute()
+        return rescaled
+
+    def get_suggestions_cache_key(self, product_ids: List[int], weights: Dict[int, int],
+                                  max_results: int, generation: int) -> str:
+        """
+        Generate the cache key of the suggestions for a set of products.
+
+        The key depends only on the products and their weights, not on their order, and includes
+        the generation, so a rebuild invalidates every cached suggestion.
+
+        Args:
+            product_ids (List[int]): The IDs of the products.
+            weights (Dict[int, int]): The weight of each product.
+            max_results (int): The maximum number of suggestions.
+            generation (int): The generation the suggestions are read from.
+
+        Returns:
+            str: The cache key.
+
+        """
+        signature = ','.join(f'{id}x{weights.get(id, 1)}' for id in sorted(set(product_ids)))
+        digest = hashlib.md5(signature.encode('ascii')).hexdigest()
+        return f'recommender:suggestions:{generation}:{max_results}:{digest}'
+
+    def merge_suggestions(self, product_ids: List[int], weights: Dict[int, int],
+                          related: List[List[Tuple[bytes, float]]], max_results: int) -> List[int]:
+        """
+        Combine the co-purchase lists of several products into one ranking.
+
+        Scores are summed like ``ZUNIONSTORE`` would, with each list multiplied by the weight of
+        its product, and the products themselves are left out.
+
+        Args:
+            product_ids (List[int]): The IDs of the products, in the order of `related`.
+            weights (Dict[int, int]): The weight of each product, e.g. its quantity in the cart.
+            related (List[List[Tuple[bytes, float]]]): The members and scores of each product's
+                sorted set.
+            max_results (int): The maximum number of suggestions.
+
+        Returns:
+            List[int]: The IDs of the suggested products, best first.
+
+        """
+        scores: Dict[int, float] = {}
+        for product_id, members in zip(product_ids, related):
+            weight = weights.get(product_id, 1)
+            for member, score in members:
+                member = int(member)
+                scores[member] = scores.get(member, 0) + score * weight
         for product_id in product_ids:
-            for with_id in product_ids:
-                if product_id != with_id:
-                    r.zincrby(self.get_product_key(product_id), 1, with_id)
+            scores.pop(product_id, None)
+        ranking = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [id for id, _ in ranking[:max_results]]
 
-    def suggest_products_for(self, products: List[Product], max_results: int = 6) -> List[Product]:
+    def suggest_products_for(self, products: List[Product], max_results: int = 6,
+                             weights: Optional[Dict[int, int]] = None) -> List[Product]:
         """
         Suggest products for a given list of products.
 
         This method takes a list of products and returns a list of suggested products with scores
         based on the input products.
 
+        The sorted sets are read with pipelined ``ZRANGE`` and merged in Python, so only read
+        commands are sent and the method works against a replica. Results are cached per set of
+        products for `SUGGESTIONS_CACHE_TIMEOUT` seconds.
+
         Args:
             products (list): A list of Product objects for which suggestions are to be made.
             max_results (int, optional): The maximum number of suggested products to return.
+            weights (Optional[Dict[int, int]]): Weights by product ID, e.g. cart quantities.
 
         Returns:
             list: A list of suggested Product objects.
 
         """
         product_ids = [p.id for p in products]
+        weights = weights or {}
+        generation = get_generations()[0]
+        cache_key = self.get_suggestions_cache_key(product_ids, weights, max_results, generation)
+
+        suggested_products_ids = cache.get(cache_key)
+        if suggested_products_ids is None:
+            with r.pipeline(transaction=False) as pipe:
+                for id in product_ids:
+                    pipe.zrange(self.get_product_key(id, generation), 0, MAX_RELATED_PRODUCTS - 1,
+                                desc=True, withscores=True)
+                related = pipe.execute()
+            suggested_products_ids = self.merge_suggestions(product_ids, weights, related,
+                                                            max_results)
+            cache.set(cache_key, suggested_products_ids, SUGGESTIONS_CACHE_TIMEOUT)
 
-        if len(products) == 1:
-            suggestions = r.zrange(
-                self.get_product_key(product_ids[0]), 0, -1, desc=True)[:max_results]
-        else:
-            flat_ids = ''.join([str(id) for id in product_ids])
-            tmp_key = f'tmp_{flat_ids}'
-            keys = [self.get_product_key(id) for id in product_ids]
-            r.zunionstore(tmp_key, keys)
-            r.zrem(tmp_key, *product_ids)
-            suggestions = r.zrange(tmp_key, 0, -1, desc=True)[:max_results]
-            r.delete(tmp_key)
-
-        suggested_products_ids = [int(id) for id in suggestions]
         suggested_products = list(Product.objects.filter(id__in=suggested_products_ids))
         suggested_products.sort(key=lambda x: suggested_products_ids.index(x.id))
         return suggested_products
 
+    async def asuggest_products_for(self, product_ids: List[int], max_results: int = 6,
+                                    weights: Optional[Dict[int, int]] = None) -> List[Product]:
+        """
+        Asynchronous counterpart of `suggest_products_for` for async views.
+
+        It takes product IDs rather than Product objects, so callers can start it before the
+        products themselves are loaded.
+
+        Args:
+            product_ids (List[int]): IDs of the products for which suggestions are to be made.
+            max_results (int, optional): The maximum number of suggested products to return.
+            weights (Optional[Dict[int, int]]): Weights by product ID, e.g. cart quantities.
+
+        Returns:
+            list: A list of suggested Product objects.
+
+        """
+        weights = weights or {}
+        generation = (await aget_generations())[0]
+        cache_key = self.get_suggestions_cache_key(product_ids, weights, max_results, generation)
+
+        suggested_products_ids = await cache.aget(cache_key)
+        if suggested_products_ids is None:
+            async with get_async_redis().pipeline(transaction=False) as pipe:
+                for id in product_ids:
+                    pipe.zrange(self.get_product_key(id, generation), 0, MAX_RELATED_PRODUCTS - 1,
+                                desc=True, withscores=True)
+                related = await pipe.execute()
+            suggested_products_ids = self.merge_suggestions(product_ids, weights, related,
+                                                            max_results)
+            await cache.aset(cache_key, suggested_products_ids, SUGGESTIONS_CACHE_TIMEOUT)
+
+        suggested_products = [
+            p async for p in Product.objects.filter(id__in=suggested_products_ids)]
+        suggested_products.sort(key=lambda x: suggested_products_ids.index(x.id))
+        return suggested_products
+
+    def start_generation(self) -> int:
+        """
+        Allocate an empty generation and announce it as being built.
+
+        Returns:
+            int: The new generation.
+
+        """
+        generation = r.incr(GENERATION_COUNTER_KEY)
+        r.set(self.get_epoch_key(generation), time.time())
+        r.set(BUILDING_KEY, generation)
+        return generation
+
+    def publish_generation(self, generation: int) -> int:
+        """
+        Atomically make a generation the one served to customers.
+
+        Args:
+            generation (int): The generation returned by `start_generation`.
+
+        Returns:
+            int: The generation that was served before.
+
+        """
+        with r.pipeline() as pipe:
+            pipe.getset(GENERATION_KEY, generation)
+            pipe.delete(BUILDING_KEY)
+            previous, _ = pipe.execute()
+        return int(previous) if previous else 0
+
+    def reclaim_generations(self, keep: Iterable[int], batch_size: int = 500) -> int:
+        """
+        Delete the keys of every older generation not in `keep`.
+
+        The generation being built and any generation newer than those kept are left alone, so a
+        rebuild running concurrently never loses its keys. Keys are found with ``SCAN`` and freed
+        with pipelined ``UNLINK``, which reclaims memory in a background thread, so Redis keeps
+        serving requests meanwhile.
+
+        Args:
+            keep (Iterable[int]): The generations to keep.
+            batch_size (int, optional): The number of keys unlinked per command.
+
+        Returns:
+            int: The number of deleted keys.
+
+        """
+        keep = {int(generation) for generation in keep}
+        building = r.get(BUILDING_KEY)
+        if building:
+            keep.add(int(building))
+        newest = max(keep)
+        batch = []
+        deleted = 0
+        with r.pipeline(transaction=False) as pipe:
+            for key in r.scan_iter(match='recommender:[0-9]*:*', count=batch_size):
+                generation = int(key.decode().split(':')[1])
+                if generation in keep or generation > newest:
+                    continue
+                batch.append(key)
+                if len(batch) == batch_size:
+                    pipe.unlink(*batch)
+                    deleted += len(batch)
+                    batch = []
+            if batch:
+                pipe.unlink(*batch)
+                deleted += len(batch)
+            pipe.execute()
+        return deleted
+
+    def adopt_legacy_keys(self, batch_size: int = 500) -> int:
+        """
+        Move the co-purchase sets stored before generations existed into generation 0.
+
+        The unversioned ``product:<id>:purchased_with`` sets and ``recommender:epoch`` are merged
+        into generation 0 while it is still served, so suggestions survive the upgrade; once a
+        rebuild replaced it, they are only deleted. Safe to run more than once.
+
+        Args:
+            batch_size (int, optional): The number of sets moved per pipeline.
+
+        Returns:
+            int: The number of legacy sets found.
+
+        """
+        current = r.get(GENERATION_KEY)
+        adopt = not current or int(current) == 0
+        # Legacy scores are relative to their own epoch; rescale them to the one of generation 0.
+        legacy_epoch = r.get(LEGACY_EPOCH_KEY)
+        factor = 1.0
+        if adopt and legacy_epoch is not None:
+            factor = 2 ** ((float(legacy_epoch) - self.get_epoch(0)) / HALF_LIFE)
+        moved = 0
+        with r.pipeline(transaction=False) as pipe:
+            for key in r.scan_iter(match='product:*:purchased_with', count=batch_size):
+                if adopt:
+                    new_key = self.get_product_key(int(key.decode().split(':')[1]), 0)
+                    pipe.zunionstore(new_key, {new_key: 1, key: factor})
+                    pipe.zremrangebyrank(new_key, 0, -MAX_RELATED_PRODUCTS - 1)
+                pipe.unlink(key)
+                moved += 1
+                if moved % batch_size == 0:
+                    pipe.execute()
+            pipe.execute()
+        r.unlink(LEGACY_EPOCH_KEY)
+        return moved
+
+    def retire_generation(self, generation: int) -> None:
+        """
+        Publish a generation and reclaim all others once no process can still be reading them.
+
+        Args:
+            generation (int): The generation to publish.
+
+        """
+        self.publish_generation(generation)
+        time.sleep(GENERATION_CACHE_TTL)
+        self.reclaim_generations(keep=[generation])
+
     def clear_purchases(self) -> None:
-        """Clear all purchase data from Redis."""
-        for id in Product.objects.values_list('id', flat=True):
-            r.delete(self.get_product_key(id))
+        """Clear all purchase data from Redis by serving an empty generation."""
+        self.retire_generation(self.start_generation())
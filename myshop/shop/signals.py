@@ -0,0 +1,65 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .catalog import bump_catalog_version, invalidate_category_nav
+from .inventory import set_stock
+from .models import Category, Product
+
+
+@receiver(post_init, sender=Product)
+def remember_product_nav_state(sender: type[Product], instance: Product, **kwargs: dict) -> None:
+    """
+    Signal to remember the loaded availability, category and stock of a product, so saving it can
+    tell whether the category navigation or the live stock counter need updating.
+
+    Args:
+        sender (type[Product]): The model class that sent the signal.
+        instance (Product): The instance that was initialized.
+        **kwargs (dict): Additional keyword arguments.
+
+    """
+    instance._nav_state = (instance.__dict__.get('available'),
+                           instance.__dict__.get('category_id'))
+    instance._stock = instance.__dict__.get('stock')
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender: type[Product], instance: Product, created: bool,
+                  **kwargs: dict) -> None:
+    """
+    Signal to bump the catalog version and invalidate the category navigation when a product is
+    created, or its availability or category changed. A stock edited by hand replaces the live
+    counter used for reservations.
+
+    Args:
+        sender (type[Product]): The model class that sent the signal.
+        instance (Product): The instance that was saved.
+        created (bool): A boolean indicating whether a new record was created.
+        **kwargs (dict): Additional keyword arguments.
+
+    """
+    bump_catalog_version()
+    nav_state = (instance.available, instance.category_id)
+    if created or nav_state != instance._nav_state:
+        invalidate_category_nav()
+    instance._nav_state = nav_state
+    if instance.stock != instance._stock or (created and instance.stock is not None):
+        set_stock(instance.id, instance.stock)
+        instance._stock = instance.stock
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender: type, **kwargs: dict) -> None:
+    """
+    Signal to bump the catalog version and invalidate the category navigation when a category
+    changes or a product is deleted.
+
+    Args:
+        sender (type): The model class that sent the signal.
+        **kwargs (dict): Additional keyword arguments.
+
+    """
+    bump_catalog_version()
+    invalidate_category_nav()
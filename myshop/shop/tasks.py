@@ -0,0 +1,52 @@
+from celery import shared_task
+
+from . import inventory, rankings
+from .recommender import Recommender
+
+
+@shared_task
+def decay_purchases() -> int:
+    """
+    Rescale the co-purchase scores of the recommender and drop the pairs that faded out.
+
+    Returns:
+        int: The number of product sorted sets that were rescaled.
+
+    """
+    return Recommender().decay_purchases()
+
+
+@shared_task
+def release_expired_reservations() -> int:
+    """
+    Give the stock reserved by orders that were not paid in time back for sale.
+
+    Returns:
+        int: The number of released orders.
+
+    """
+    return inventory.release_expired()
+
+
+@shared_task
+def sync_stock() -> int:
+    """
+    Write the live stock counters kept in Redis to the database in batches.
+
+    Returns:
+        int: The number of updated products.
+
+    """
+    return inventory.sync_stock()
+
+
+@shared_task
+def refresh_trending() -> int:
+    """
+    Recompute the trending rankings from the sales of the last day.
+
+    Returns:
+        int: The number of refreshed rankings.
+
+    """
+    return rankings.refresh_trending()
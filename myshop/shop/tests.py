@@ -1,3 +1,288 @@
-from django.test import TestCase
+import io
+import json
+import time
+from decimal import Decimal
+from typing import List, Tuple
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+from django.http import HttpRequest, HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from benchmarks.stubs import StandInTestCase
+from myshop.routers import ReplicaPin, ReplicaPinMiddleware, ReplicaRouter, current_pin
+from orders.models import Order, OrderItem
+
+from . import inventory
+from .catalog import CATALOG_VERSION_CACHE_KEY
+from .importer import ProductImporter, read_feed
+from .models import Category, Product
+from .pricing import apply_price_list, read_price_list
+
+
+def create_order(product: Product, quantity: int, paid: bool = False) -> Order:
+    """Create an order of a single product for a new customer."""
+    user = User.objects.create_user(f'customer{time.time_ns()}', password='secret')
+    order = Order.objects.create(profile=user.profile, first_name='Іван', last_name='Петренко',
+                                 email='ivan@example.com', address='вул. Хрещатик, 1',
+                                 postal_code='01001', city='Київ', paid=paid)
+    OrderItem.objects.create(order=order, product=product, price=product.price,
+                             quantity=quantity)
+    return order
+
+
+class InventoryTests(StandInTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.category = Category.objects.create(name='Акумулятори', slug='batteries')
+        self.product = Product.objects.create(category=self.category, name='LiFePO4 12V',
+                                              slug='lifepo4-12v', price=Decimal('100'), stock=5)
+
+    def get_stock(self) -> int:
+        return int(self.redis.get(inventory.get_stock_key(self.product.id)))
+
+    def test_reserve_takes_units(self) -> None:
+        order = create_order(self.product, 3)
+        inventory.reserve(order.id, {self.product.id: 3})
+        self.assertEqual(self.get_stock(), 2)
+        self.assertTrue(self.redis.exists(inventory.get_reservation_key(order.id)))
+
+    def test_reserve_without_enough_stock_reserves_nothing(self) -> None:
+        other = Product.objects.create(category=self.category, name='AGM 12V', slug='agm-12v',
+                                       price=Decimal('50'), stock=10)
+        order = create_order(self.product, 6)
+        with self.assertRaises(inventory.OutOfStock) as raised:
+            inventory.reserve(order.id, {other.id: 1, self.product.id: 6})
+        self.assertEqual(raised.exception.product_id, self.product.id)
+        self.assertEqual(self.get_stock(), 5)
+        self.assertEqual(int(self.redis.get(inventory.get_stock_key(other.id))), 10)
+        self.assertFalse(self.redis.exists(inventory.get_reservation_key(order.id)))
+
+    def test_reserve_seeds_missing_counters_from_the_database(self) -> None:
+        self.redis.delete(inventory.get_stock_key(self.product.id))
+        inventory.reserve(create_order(self.product, 2).id, {self.product.id: 2})
+        self.assertEqual(self.get_stock(), 3)
+
+    def test_release_gives_units_back(self) -> None:
+        order = create_order(self.product, 3)
+        inventory.reserve(order.id, {self.product.id: 3})
+        self.assertEqual(inventory.release(order.id), 1)
+        self.assertEqual(self.get_stock(), 5)
+        self.assertEqual(inventory.release(order.id), 0)
+        self.assertEqual(self.get_stock(), 5)
+
+    def test_release_expired_releases_only_unpaid_orders(self) -> None:
+        unpaid = create_order(self.product, 1)
+        paid = create_order(self.product, 2, paid=True)
+        inventory.reserve(unpaid.id, {self.product.id: 1})
+        inventory.reserve(paid.id, {self.product.id: 2})
+        self.redis.zadd(inventory.RESERVATIONS_KEY, {unpaid.id: 0, paid.id: 0})
+        self.assertEqual(inventory.release_expired(), 1)
+        self.assertEqual(self.get_stock(), 3)
+        self.assertEqual(self.redis.zcard(inventory.RESERVATIONS_KEY), 0)
+
+    def test_confirm_keeps_reserved_units_sold(self) -> None:
+        order = create_order(self.product, 2)
+        inventory.reserve(order.id, {self.product.id: 2})
+        self.assertTrue(inventory.confirm(order.id))
+        self.assertTrue(inventory.confirm(order.id))
+        self.assertEqual(inventory.release(order.id), 0)
+        self.assertEqual(self.get_stock(), 3)
+
+    def test_late_payment_takes_released_units_again(self) -> None:
+        order = create_order(self.product, 2)
+        inventory.reserve(order.id, {self.product.id: 2})
+        inventory.release(order.id)
+        self.assertTrue(inventory.confirm(order.id))
+        self.assertEqual(self.get_stock(), 3)
+        self.assertTrue(inventory.confirm(order.id))
+        self.assertEqual(self.get_stock(), 3)
+
+    def test_late_payment_after_units_were_sold_is_not_confirmed(self) -> None:
+        late = create_order(self.product, 2)
+        inventory.reserve(late.id, {self.product.id: 2})
+        inventory.release(late.id)
+        inventory.reserve(create_order(self.product, 4).id, {self.product.id: 4})
+        self.assertFalse(inventory.confirm(late.id))
+        self.assertEqual(self.get_stock(), 1)
+
+    def test_sync_stock_writes_live_counters(self) -> None:
+        inventory.reserve(create_order(self.product, 4).id, {self.product.id: 4})
+        self.assertEqual(inventory.sync_stock(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+                   REPLICA_READ_APPS={'shop'}, REPLICA_PIN_SECONDS=10)
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self) -> None:
+        self.router = ReplicaRouter()
+        patcher = mock.patch('myshop.routers.get_replica_aliases', return_value=['replica0'])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.set(CATALOG_VERSION_CACHE_KEY, time.time() - 60, None)
+
+    def read(self, pin: ReplicaPin, model: type = Product) -> str:
+        token = current_pin.set(pin)
+        try:
+            return self.router.db_for_read(model)
+        finally:
+            current_pin.reset(token)
+
+    def test_catalog_reads_go_to_a_replica(self) -> None:
+        self.assertEqual(self.read(ReplicaPin(pinned=False)), 'replica0')
+
+    def test_reads_outside_requests_go_to_the_primary(self) -> None:
+        self.assertEqual(self.router.db_for_read(Product), DEFAULT_DB_ALIAS)
+
+    def test_other_apps_read_from_the_primary(self) -> None:
+        self.assertEqual(self.read(ReplicaPin(pinned=False), Order), DEFAULT_DB_ALIAS)
+
+    def test_pinned_clients_read_from_the_primary(self) -> None:
+        self.assertEqual(self.read(ReplicaPin(pinned=True)), DEFAULT_DB_ALIAS)
+
+    def test_clients_read_their_writes_from_the_primary(self) -> None:
+        pin = ReplicaPin(pinned=False)
+        token = current_pin.set(pin)
+        try:
+            self.assertEqual(self.router.db_for_write(Product), DEFAULT_DB_ALIAS)
+        finally:
+            current_pin.reset(token)
+        self.assertTrue(pin.wrote)
+        self.assertEqual(self.read(pin), DEFAULT_DB_ALIAS)
+
+    def test_reads_right_after_a_catalog_change_go_to_the_primary(self) -> None:
+        cache.set(CATALOG_VERSION_CACHE_KEY, time.time() - 1, None)
+        self.assertEqual(self.read(ReplicaPin(pinned=False)), DEFAULT_DB_ALIAS)
+
+    def test_pin_middleware_sets_the_cookie_after_a_write(self) -> None:
+        def view(request: HttpRequest) -> HttpResponse:
+            ReplicaRouter().db_for_write(Product)
+            return HttpResponse()
+
+        response = ReplicaPinMiddleware(view)(RequestFactory().post('/'))
+        self.assertIn('db_pin', response.cookies)
+        response = ReplicaPinMiddleware(lambda request: HttpResponse())(RequestFactory().get('/'))
+        self.assertNotIn('db_pin', response.cookies)
+
+
+class FailingImporter(ProductImporter):
+    """Importer whose statements fail whenever a given slug is among the rows."""
+    def __init__(self, failing_slug: str, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.failing_slug = failing_slug
+
+    def upsert(self, products: List[Product], fields: Tuple[str, ...]) -> None:
+        if any(product.slug == self.failing_slug for product in products):
+            raise DatabaseError('value violates a constraint')
+        super().upsert(products, fields)
+
+
+class ImporterTests(StandInTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.category = Category.objects.create(name='Акумулятори', slug='batteries')
+        self.errors: List[Tuple[int, str, str]] = []
+
+    def run_import(self, feed: str, format: str = 'csv',
+                   importer_class: type = ProductImporter, **kwargs) -> ProductImporter:
+        importer = importer_class(on_error=lambda *error: self.errors.append(error), **kwargs)
+        for line, row in read_feed(io.StringIO(feed), format):
+            importer.add(line, row)
+        importer.finish()
+        return importer
+
+    def test_upserts_new_and_existing_products_by_slug(self) -> None:
+        Product.objects.create(category=self.category, name='Old name', slug='agm-12v',
+                               price=Decimal('10'), description='Kept')
+        importer = self.run_import('slug,name,category,price,stock\n'
+                                   'agm-12v,AGM 12V,batteries,55.50,4\n'
+                                   'gel-12v,GEL 12V,gel,70,\n')
+        self.assertEqual(importer.stats.upserted, 2)
+        self.assertEqual(self.errors, [])
+        updated = Product.objects.get(slug='agm-12v')
+        self.assertEqual((updated.name, updated.price, updated.stock, updated.description),
+                         ('AGM 12V', Decimal('55.50'), 4, 'Kept'))
+        self.assertEqual(int(self.redis.get(inventory.get_stock_key(updated.id))), 4)
+        created = Product.objects.get(slug='gel-12v')
+        self.assertEqual(created.category.slug, 'gel')
+        self.assertIsNone(created.stock)
+
+    def test_empty_cells_keep_current_values(self) -> None:
+        Product.objects.create(category=self.category, name='AGM 12V', slug='agm-12v',
+                               price=Decimal('10'), available=False, stock=7,
+                               description='Kept', attributes={'voltage': 12})
+        self.run_import('slug,name,category,price,description,available,stock,attributes\n'
+                        'agm-12v,AGM 12V,batteries,11,,,,\n')
+        product = Product.objects.get(slug='agm-12v')
+        self.assertEqual(product.price, Decimal('11'))
+        self.assertEqual((product.description, product.available, product.stock,
+                          product.attributes), ('Kept', False, 7, {'voltage': 12}))
+
+    def test_json_lines_update_only_their_keys(self) -> None:
+        Product.objects.create(category=self.category, name='AGM 12V', slug='agm-12v',
+                               price=Decimal('10'), available=False)
+        rows = [{'slug': 'agm-12v', 'name': 'AGM 12V', 'category': 'batteries', 'price': 12,
+                 'available': None, 'attributes': {'voltage': 12}},
+                {'slug': 'gel-12v', 'name': 'GEL 12V', 'category': 'batteries', 'price': 70,
+                 'available': 'ні'}]
+        self.run_import(''.join(json.dumps(row) + '\n' for row in rows), format='jsonl')
+        agm = Product.objects.get(slug='agm-12v')
+        self.assertEqual((agm.price, agm.available, agm.attributes),
+                         (Decimal('12'), False, {'voltage': 12}))
+        self.assertFalse(Product.objects.get(slug='gel-12v').available)
+
+    def test_invalid_rows_are_reported_and_skipped(self) -> None:
+        importer = self.run_import('slug,name,category,price\n'
+                                   'agm-12v,AGM 12V,batteries,abc\n'
+                                   'gel-12v,,batteries,70\n'
+                                   'lfp-12v,LFP 12V,batteries,200\n')
+        self.assertEqual(importer.stats.upserted, 1)
+        self.assertEqual([(line, slug) for line, slug, _ in self.errors],
+                         [(2, 'agm-12v'), (3, 'gel-12v')])
+
+    def test_failed_batch_is_retried_row_by_row(self) -> None:
+        importer = self.run_import('slug,name,category,price\n'
+                                   'agm-12v,AGM 12V,batteries,55\n'
+                                   'bad-12v,Bad 12V,batteries,60\n'
+                                   'gel-12v,GEL 12V,batteries,70\n',
+                                   importer_class=FailingImporter, failing_slug='bad-12v')
+        self.assertEqual(importer.stats.upserted, 2)
+        self.assertEqual(set(Product.objects.values_list('slug', flat=True)),
+                         {'agm-12v', 'gel-12v'})
+        self.assertEqual([(line, slug) for line, slug, _ in self.errors], [(3, 'bad-12v')])
+
+
+class PriceListTests(StandInTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        category = Category.objects.create(name='Акумулятори', slug='batteries')
+        self.agm = Product.objects.create(category=category, name='AGM 12V', slug='agm-12v',
+                                          price=Decimal('50'))
+        self.gel = Product.objects.create(category=category, name='GEL 12V', slug='gel-12v',
+                                          price=Decimal('70'))
+
+    def test_applies_changed_prices_and_reports_unknown_slugs(self) -> None:
+        changed, unknown = apply_price_list({'agm-12v': (Decimal('55'), None),
+                                             'gel-12v': (Decimal('70'), None),
+                                             'missing': (Decimal('1'), True)})
+        self.assertEqual((changed, unknown), (1, ['missing']))
+        self.agm.refresh_from_db()
+        self.assertEqual((self.agm.price, self.agm.available), (Decimal('55'), True))
+
+    def test_empty_values_keep_current_ones(self) -> None:
+        changed, _ = apply_price_list({'agm-12v': (None, False)})
+        self.assertEqual(changed, 1)
+        self.agm.refresh_from_db()
+        self.assertEqual((self.agm.price, self.agm.available), (Decimal('50'), False))
+
+    def test_reads_utf8_and_cp1251_files(self) -> None:
+        text = 'slug,price,available\nagm-12v,55.50,так\n'
+        for encoding in ('utf-8-sig', 'cp1251'):
+            with self.subTest(encoding=encoding):
+                prices, errors = read_price_list(io.BytesIO(text.encode(encoding)))
+                self.assertEqual(errors, [])
+                self.assertEqual(prices, {'agm-12v': (Decimal('55.50'), True)})
@@ -1,41 +1,169 @@
-from typing import Optional
+import asyncio
+import hashlib
+import json
+from typing import Any, Dict, Optional
 
+from asgiref.sync import sync_to_async
 from cart.forms import CartAddProductForm
-from django.http import HttpRequest, HttpResponse
-from django.shortcuts import get_object_or_404, render
+from django.conf import settings
+from django.db.models import QuerySet
+from django.http import Http404, HttpRequest, HttpResponse
+from django.template.response import TemplateResponse
+from django.views.decorators.cache import cache_control
 
-from .models import Category, Product
+from . import rankings
+from .catalog import (aget_category_nav, get_catalog_version, get_category_or_404,
+                      get_facet_counts)
+from .decorators import async_condition
+from .forms import (AVAILABILITY_ALL, AVAILABILITY_IN_STOCK, AVAILABILITY_OUT_OF_STOCK,
+                    SORT_ORDERING, ProductFilterForm)
+from .models import Product
+from .recently_viewed import aget_products, track_recently_viewed
 from .recommender import Recommender
 
 
-def product_list(request: HttpRequest, category_slug: Optional[str] = None) -> HttpResponse:
+def catalog_etag(request: HttpRequest, *args: Any, **kwargs: Any) -> str:
     """
-    Display a list of products, optionally filtered by a given category.
+    Compute the ETag of a catalog page without touching the catalog tables.
+
+    Pages embed the visitor's cart summary, account link, recently viewed products and product
+    rankings, so the validator combines the cached catalog version with the user, the cart stored
+    in the session and the lists left by `track_recently_viewed` and `load_rankings`.
+
+    Args:
+        request: HttpRequest object.
+
+    Returns:
+        str: The ETag for the requested page.
+
+    """
+    variance = json.dumps([get_catalog_version(),
+                           request.user.pk,
+                           request.session.get(settings.CART_SESSION_ID) or {},
+                           request.session.get('coupon_id'),
+                           getattr(request, 'recently_viewed', None),
+                           getattr(request, 'rankings', None)], sort_keys=True, default=str)
+    return hashlib.md5(variance.encode('utf-8')).hexdigest()
+
+
+def no_last_modified(request: HttpRequest, *args: Any, **kwargs: Any) -> None:
+    """Leave out Last-Modified for pages whose content can change without a catalog change."""
+    return None
+
+
+def filter_by_attributes(products: QuerySet, filters: Dict[str, Any]) -> QuerySet:
+    """
+    Filter products by their technical specifications.
+
+    Exact-match specifications are combined into one JSONB containment lookup served by the GIN
+    index, while capacity ranges use the expression index on ``attributes -> 'capacity'``.
+
+    Args:
+        products (QuerySet): Product queryset to filter.
+        filters (Dict[str, Any]): Cleaned data of ProductFilterForm.
+
+    Returns:
+        QuerySet: The filtered product queryset.
+
+    """
+    contains = {}
+    if filters.get('chemistry'):
+        contains['chemistry'] = filters['chemistry']
+    if filters.get('voltage') is not None:
+        contains['voltage'] = float(filters['voltage'])
+    if contains:
+        products = products.filter(attributes__contains=contains)
+    if filters.get('min_capacity') is not None:
+        products = products.filter(attributes__capacity__gte=filters['min_capacity'])
+    if filters.get('max_capacity') is not None:
+        products = products.filter(attributes__capacity__lte=filters['max_capacity'])
+    return products
+
+
+@cache_control(private=True, no_cache=True)
+@rankings.load_rankings
+@async_condition(etag_func=catalog_etag, last_modified_func=no_last_modified)
+async def product_list(request: HttpRequest, category_slug: Optional[str] = None) -> HttpResponse:
+    """
+    Display a list of products, optionally filtered by a given category, price range and
+    availability, and sorted by the requested order.
+
+    The best-selling and trending products of the category, read by `load_rankings` in one round
+    trip, are taken from the listed products, so the database is only queried for those filtered
+    out. Rankings have no modification time, so the page is validated by its ETag alone.
 
     Args:
         request: HttpRequest object.
         category_slug (str, optional): Slug of the category to filter products by. Defaults to None.
 
     Returns:
-        HttpResponse: Rendered HTML page with the list of products, along with the current category
-            and all categories.
+        HttpResponse: Rendered HTML page with the list of products, along with the current category,
+            all categories, the filter form and facet counts.
 
     """
     category = None
-    categories = Category.objects.all()
-    products = Product.objects.filter(available=True)
+    nav = await aget_category_nav()
+    categories = nav['categories']
+    filter_form = ProductFilterForm(request.GET)
+    filter_form.is_valid()
+    filters: Dict[str, Any] = filter_form.cleaned_data
+    availability = filters.get('availability', AVAILABILITY_IN_STOCK)
+
+    products = Product.objects.all()
+    if filters.get('min_price') is not None:
+        products = products.filter(price__gte=filters['min_price'])
+    if filters.get('max_price') is not None:
+        products = products.filter(price__lte=filters['max_price'])
+    products = filter_by_attributes(products, filters)
+    if products.query.has_filters():
+        facet_counts = await sync_to_async(get_facet_counts)(products)
+    else:
+        facet_counts = nav['facets']
+
     if category_slug:
-        category = get_object_or_404(Category, slug=category_slug)
+        category = get_category_or_404(nav, category_slug)
         products = products.filter(category=category)
-    return render(request, 'shop/product/list.html', {'category': category,
-                                                      'categories': categories,
-                                                      'products': products})
+    if availability == AVAILABILITY_IN_STOCK:
+        products = products.filter(available=True)
+    elif availability == AVAILABILITY_OUT_OF_STOCK:
+        products = products.filter(available=False)
+    products = products.order_by(*SORT_ORDERING[filters.get('sort', 'name')])
+    products = [product async for product in products]
+
+    bestseller_ids, trending_ids = request.rankings
+    ranked = {product.id: product for product in products}
+    missing = [id for id in {*bestseller_ids, *trending_ids} if id not in ranked]
+    if missing:
+        ranked.update({product.id: product async for product in
+                       Product.objects.filter(id__in=missing, available=True)})
+
+    empty_facet = {AVAILABILITY_IN_STOCK: 0, AVAILABILITY_OUT_OF_STOCK: 0, AVAILABILITY_ALL: 0}
+    for c in categories:
+        c.product_count = facet_counts.get(c.id, empty_facet)[availability]
+    category_facet = facet_counts.get(category.id if category else None, empty_facet)
 
+    return TemplateResponse(request, 'shop/product/list.html', {
+        'category': category,
+        'categories': categories,
+        'products': products,
+        'filter_form': filter_form,
+        'filter_query': request.GET.urlencode(),
+        'bestsellers': rankings.pick_ranked(bestseller_ids, ranked),
+        'trending': rankings.pick_ranked(trending_ids, ranked),
+        'total_count': facet_counts[None][availability],
+        'availability_counts': category_facet})
 
-def product_detail(request: HttpRequest, id: int, slug: str) -> HttpResponse:
+
+@cache_control(private=True, no_cache=True)
+@track_recently_viewed
+@async_condition(etag_func=catalog_etag, last_modified_func=no_last_modified)
+async def product_detail(request: HttpRequest, id: int, slug: str) -> HttpResponse:
     """
     Display the detail page for a single product.
 
+    The product, its recommendations and the other products the visitor viewed recently are
+    fetched concurrently from PostgreSQL and Redis.
+
     Args:
         request: HttpRequest object.
         id (int): The ID of the product to retrieve.
@@ -45,12 +173,21 @@ def product_detail(request: HttpRequest, id: int, slug: str) -> HttpResponse:
         HttpResponse: Rendered HTML page for the product detail, including the product instance.
 
     """
-    product = get_object_or_404(Product, id=id, slug=slug, available=True)
-    cart_product_form = CartAddProductForm
     r = Recommender()
-    recommended_products = r.suggest_products_for([product], 2)
-    return render(request,
-                  'shop/product/detail.html',
-                  {'product': product,
-                   'cart_product_form': cart_product_form,
-                   'recommended_products': recommended_products})
+    product, recommended_products, recently_viewed = await asyncio.gather(
+        Product.objects.select_related('category').aget(id=id, slug=slug, available=True),
+        r.asuggest_products_for([id], 2),
+        aget_products(request.recently_viewed, exclude=[id]),
+        return_exceptions=True)
+    if isinstance(product, Product.DoesNotExist):
+        raise Http404('No Product matches the given query.')
+    for result in (product, recommended_products, recently_viewed):
+        if isinstance(result, BaseException):
+            raise result
+    cart_product_form = CartAddProductForm
+    return TemplateResponse(request,
+                            'shop/product/detail.html',
+                            {'product': product,
+                             'cart_product_form': cart_product_form,
+                             'recommended_products': recommended_products,
+                             'recently_viewed': recently_viewed})
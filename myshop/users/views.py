@@ -1,12 +1,84 @@
-from django.shortcuts import render
+import base64
+import binascii
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional, Tuple
+
 from django.contrib.auth.decorators import login_required
+from django.db.models import DecimalField, ExpressionWrapper, F, Q, Sum
+from django.http import HttpRequest, HttpResponse
+from django.shortcuts import render
 
 from orders.models import Order
 from .models import Profile
 
+ORDERS_PER_PAGE = 20
+
+
+def encode_order_cursor(order: Order) -> str:
+    """Encode the creation time and ID of the last order on a page as an opaque cursor."""
+    value = f'{order.created.isoformat()}|{order.id}'
+    return base64.urlsafe_b64encode(value.encode('utf-8')).decode('ascii')
+
+
+def decode_order_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """
+    Decode a cursor produced by `encode_order_cursor`.
+
+    Args:
+        cursor (Optional[str]): The cursor from the ``before`` query parameter.
+
+    Returns:
+        Optional[Tuple[datetime, int]]: The creation time and ID of the last order of the previous
+            page, or None if the cursor is missing or malformed.
+
+    """
+    if not cursor:
+        return None
+    try:
+        created, id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+        return datetime.fromisoformat(created), int(id)
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+
 
 @login_required
-def profile(request):
+def profile(request: HttpRequest) -> HttpResponse:
+    """
+    Display the user's profile with a page of their order history.
+
+    Orders are paginated with a keyset on (created, id) served by the (profile, -created) index.
+    Totals and item counts are aggregated in the same query, so a page costs one query no matter
+    how many orders or items the customer has.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        HttpResponse: The rendered profile page.
+
+    """
     profile = Profile.objects.get(user=request.user)
-    orders = Order.objects.filter(profile=profile)
-    return render(request, 'users/profile.html', {'orders': orders, 'profile': profile})
+    line_cost = F('items__price') * F('items__quantity')
+    orders = Order.objects.filter(profile=profile).annotate(
+        item_count=Sum('items__quantity'),
+        total_cost=ExpressionWrapper(
+            Sum(line_cost) * (Decimal(100) - F('discount')) / Decimal(100),
+            output_field=DecimalField(max_digits=12, decimal_places=2)),
+    ).order_by('-created', '-id')
+
+    cursor = decode_order_cursor(request.GET.get('before'))
+    if cursor:
+        created, id = cursor
+        orders = orders.filter(Q(created__lt=created) | Q(created=created, id__lt=id))
+
+    orders = list(orders[:ORDERS_PER_PAGE + 1])
+    next_cursor = None
+    if len(orders) > ORDERS_PER_PAGE:
+        orders = orders[:ORDERS_PER_PAGE]
+        next_cursor = encode_order_cursor(orders[-1])
+
+    return render(request, 'users/profile.html', {'orders': orders,
+                                                  'profile': profile,
+                                                  'next_cursor': next_cursor,
+                                                  'is_first_page': cursor is None})
@@ -1,12 +1,28 @@
 #!/bin/bash
 
+if [ "$DJANGO_ENV" = "production" ]; then
+    export DJANGO_SETTINGS_MODULE=myshop.settings_production
+    # Each gunicorn worker writes its metrics here; /metrics/ merges them.
+    export PROMETHEUS_MULTIPROC_DIR=/tmp/prometheus
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR" && mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+
 cd myshop && \
 python manage.py migrate
+python manage.py upgrade_recommender_keys
 python manage.py loaddata shop/fixtures/shop.json
 python manage.py loaddata myshop/fixtures/users.json
 python manage.py clearcache | python manage.py shell
 python manage.py collectstatic --noinput
-celery -A myshop worker -l info &
+POSTGRES_CONN_MAX_AGE=60 celery -A myshop worker -l info &
+celery -A myshop beat -l info --schedule /tmp/celerybeat-schedule &
 celery -A myshop flower --port=5555 &
-python manage.py livereload --host=0.0.0.0 --port=35729 &
-python manage.py runserver 0.0.0.0:8000
+if [ "$DJANGO_ENV" = "production" ]; then
+    gunicorn myshop.asgi:application \
+        --worker-class uvicorn.workers.UvicornWorker \
+        --workers "${WEB_CONCURRENCY:-4}" \
+        --bind 0.0.0.0:8000
+else
+    python manage.py livereload --host=0.0.0.0 --port=35729 &
+    python manage.py runserver 0.0.0.0:8000
+fi